@@ -1,64 +1,227 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from typing import List, Optional
 
-from app.data.json_store import JSONStore, get_json_store
-from app.schemas.deal import AllocationCreate, AllocationUpdate, AllocationResponse
+from app.api.caching import cached_response
+from app.api.export import EXPORT_FORMAT_PATTERN, export_response
+from app.api.pagination import decode_cursor, set_next_cursor
+from app.api.responses import FastJSONResponse
+from app.data.allocation_engine import allocate
+from app.data.async_store import AsyncRepository, get_async_store
+from app.data.repository import BulkError
+from app.schemas.deal import (
+    AllocationBulkUpdate,
+    AllocationCreate,
+    AllocationPlan,
+    AllocationPlanRequest,
+    AllocationUpdate,
+    AllocationResponse,
+)
 
 router = APIRouter(prefix="/allocations", tags=["allocations"])
 
 
 @router.get("/", response_model=List[AllocationResponse])
-def get_allocations(
-    skip: int = 0,
-    limit: int = 100,
-    store: JSONStore = Depends(get_json_store)
+async def get_allocations(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    store: AsyncRepository = Depends(get_async_store)
 ):
-    """Get all allocations."""
-    allocations = store.get_allocations()
-    # Apply pagination
-    paginated_allocations = allocations[skip : skip + limit]
-    return [AllocationResponse(**allocation) for allocation in paginated_allocations]
+    """Get all allocations, paged by offset or by keyset cursor."""
+    async def build():
+        page = await store.query_allocations(skip=skip, limit=limit, after=decode_cursor(cursor))
+        response = FastJSONResponse(
+            [AllocationResponse(**allocation).model_dump(mode="json") for allocation in page.items]
+        )
+        set_next_cursor(response, page.next_position)
+        return response
+
+    return await cached_response(request, await store.version("allocations"), build)
+
+
+@router.get("/export")
+async def export_allocations(
+    export_format: str = Query("ndjson", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Stream every allocation as NDJSON or CSV."""
+    return export_response(
+        "allocations",
+        export_format,
+        lambda limit, after: store.repository.query_allocations(limit=limit, after=after),
+        lambda allocation: AllocationResponse(**allocation).model_dump(mode="json"),
+        list(AllocationResponse.model_fields),
+    )
 
 
 @router.get("/{allocation_id}", response_model=AllocationResponse)
-def get_allocation(allocation_id: int, store: JSONStore = Depends(get_json_store)):
+async def get_allocation(
+    allocation_id: int,
+    request: Request,
+    store: AsyncRepository = Depends(get_async_store),
+):
     """Get a specific allocation by ID."""
-    allocation = store.get_allocation(allocation_id)
-    if not allocation:
-        raise HTTPException(status_code=404, detail="Allocation not found")
-    return AllocationResponse(**allocation)
+    async def build():
+        allocation = await store.get_allocation(allocation_id)
+        if not allocation:
+            raise HTTPException(status_code=404, detail="Allocation not found")
+        return FastJSONResponse(AllocationResponse(**allocation).model_dump(mode="json"))
+
+    return await cached_response(request, await store.version("allocations"), build)
 
 
 @router.post("/", response_model=AllocationResponse, status_code=status.HTTP_201_CREATED)
-def create_allocation(allocation: AllocationCreate, store: JSONStore = Depends(get_json_store)):
+async def create_allocation(
+    allocation: AllocationCreate,
+    store: AsyncRepository = Depends(get_async_store),
+):
     """Create a new allocation."""
-    allocation_data = allocation.model_dump()
-    created_allocation = store.create_allocation(allocation_data)
+    allocation_data = allocation.model_dump(mode="json")
+    created_allocation = await store.create_allocation(allocation_data)
     return AllocationResponse(**created_allocation)
 
 
 @router.put("/{allocation_id}", response_model=AllocationResponse)
-def update_allocation(
+async def update_allocation(
     allocation_id: int,
     allocation: AllocationUpdate,
-    store: JSONStore = Depends(get_json_store)
+    store: AsyncRepository = Depends(get_async_store)
 ):
     """Update an allocation."""
-    existing_allocation = store.get_allocation(allocation_id)
+    existing_allocation = await store.get_allocation(allocation_id)
     if not existing_allocation:
         raise HTTPException(status_code=404, detail="Allocation not found")
 
     # Merge existing data with updates
-    update_data = allocation.model_dump(exclude_unset=True)
+    update_data = allocation.model_dump(mode="json", exclude_unset=True)
     updated_data = {**existing_allocation, **update_data}
 
-    updated_allocation = store.update_allocation(allocation_id, updated_data)
+    updated_allocation = await store.update_allocation(allocation_id, updated_data)
+    if updated_allocation is None:
+        # Deleted meanwhile
+        raise HTTPException(status_code=404, detail="Allocation not found")
     return AllocationResponse(**updated_allocation)
 
 
 @router.delete("/{allocation_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_allocation(allocation_id: int, store: JSONStore = Depends(get_json_store)):
+async def delete_allocation(allocation_id: int, store: AsyncRepository = Depends(get_async_store)):
     """Delete an allocation."""
-    if not store.delete_allocation(allocation_id):
+    if not await store.delete_allocation(allocation_id):
         raise HTTPException(status_code=404, detail="Allocation not found")
     return None
+
+
+@router.post("/bulk", response_model=List[AllocationResponse], status_code=status.HTTP_201_CREATED)
+async def bulk_create_allocations(
+    allocations: List[AllocationCreate],
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Create many allocations in one all-or-nothing batch."""
+    records = [allocation.model_dump(mode="json") for allocation in allocations]
+    try:
+        created = await store.bulk_create_allocations(records)
+    except BulkError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+    return [AllocationResponse(**allocation) for allocation in created]
+
+
+@router.patch("/bulk", response_model=List[AllocationResponse])
+async def bulk_update_allocations(
+    allocations: List[AllocationBulkUpdate],
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Apply partial updates to many allocations in one all-or-nothing batch."""
+    changes = [allocation.model_dump(mode="json", exclude_unset=True) for allocation in allocations]
+    try:
+        updated = await store.bulk_update_allocations(changes)
+    except BulkError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+    return [AllocationResponse(**allocation) for allocation in updated]
+
+
+@router.post("/bulk/delete", status_code=status.HTTP_204_NO_CONTENT)
+async def bulk_delete_allocations(
+    allocation_ids: List[int] = Body(...),
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Delete many allocations in one all-or-nothing batch."""
+    try:
+        await store.bulk_delete_allocations(allocation_ids)
+    except BulkError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+    return None
+
+
+@router.post("/compute", response_model=AllocationPlan)
+async def compute_allocations(
+    plan: AllocationPlanRequest,
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Split a deal circle across portfolio demands, optionally saving the result.
+
+    With ``persist`` set, every non-zero share is stored as one allocation
+    in a single all-or-nothing batch and the response status is 201.
+    """
+    demands = [d.demand for d in plan.demands]
+    weights: Optional[List[float]] = None
+    priorities: Optional[List[int]] = None
+    # The plan validator requires the field on every demand, so the filters
+    # only narrow the types and never drop a demand
+    if plan.allocation_type == "Tiered":
+        weights = [plan.tier_weights[d.tier] for d in plan.demands if d.tier is not None]
+    elif plan.allocation_type == "Custom":
+        weights = [d.weight for d in plan.demands if d.weight is not None]
+    elif plan.allocation_type == "Priority":
+        priorities = [d.priority for d in plan.demands if d.priority is not None]
+    result = allocate(
+        plan.allocation_type, plan.circle_size, demands,
+        plan.allocation_rounding, weights, priorities,
+    )
+    amounts = result.amounts.tolist()
+
+    created = []
+    if plan.persist:
+        # Every record goes through AllocationCreate, so fields the template
+        # leaves out get the same defaults as POST /allocations/
+        template = plan.template or AllocationCreate()
+        shared = template.model_copy(update={
+            "deal_circle": plan.deal_circle,
+            "allocation_type": plan.allocation_type,
+            "allocation_rounding": plan.allocation_rounding,
+        })
+        records = [
+            shared.model_copy(
+                update={"portfolio_id": d.portfolio_id, "deal_allocation": amount}
+            ).model_dump(mode="json")
+            for d, amount in zip(plan.demands, amounts)
+            if amount > 0
+        ]
+        try:
+            created = await store.bulk_create_allocations(records)
+        except BulkError as exc:
+            raise HTTPException(status_code=400, detail=exc.errors)
+
+    return FastJSONResponse(
+        {
+            "deal_circle": plan.deal_circle,
+            "allocation_type": plan.allocation_type,
+            "circle_size": plan.circle_size,
+            "allocation_rounding": plan.allocation_rounding,
+            "allocated": result.allocated,
+            "unallocated": result.unallocated,
+            "allocations": [
+                {
+                    "portfolio_id": d.portfolio_id,
+                    "demand": d.demand,
+                    "allocation": amount,
+                    "fill_rate": rate,
+                }
+                for d, amount, rate in zip(plan.demands, amounts, result.fill_rates.tolist())
+            ],
+            "created": [
+                AllocationResponse(**allocation).model_dump(mode="json") for allocation in created
+            ],
+        },
+        status_code=status.HTTP_201_CREATED if plan.persist else status.HTTP_200_OK,
+    )
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Query, Request
+from typing import List
+
+from app.api.caching import cached_response
+from app.api.responses import FastJSONResponse
+from app.data.async_store import AsyncRepository, get_async_store
+from app.data.repository import ANALYTICS_FIELDS
+from app.schemas.deal import GroupTotal
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+def _by_pattern(collection: str) -> str:
+    return "^(" + "|".join(ANALYTICS_FIELDS[collection][0]) + ")$"
+
+
+async def _group_totals(request: Request, store: AsyncRepository, collection: str, by: str):
+    """Breakdown of ``collection`` by ``by``, recomputed only when the collection changes."""
+    _, value, weight = ANALYTICS_FIELDS[collection]
+
+    async def build():
+        return FastJSONResponse(await store.aggregate(collection, by, value, weight))
+
+    return await cached_response(request, await store.version(collection), build)
+
+
+@router.get("/deals", response_model=List[GroupTotal])
+async def deal_totals(
+    request: Request,
+    by: str = Query("status", pattern=_by_pattern("deals")),
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Deal count and total ``amount`` per status, client or owner."""
+    return await _group_totals(request, store, "deals", by)
+
+
+@router.get("/allocations", response_model=List[GroupTotal])
+async def allocation_totals(
+    request: Request,
+    by: str = Query("broker", pattern=_by_pattern("allocations")),
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Allocation count and total ``deal_allocation`` per broker, trader, type or circle."""
+    return await _group_totals(request, store, "allocations", by)
+
+
+@router.get("/portfolios", response_model=List[GroupTotal])
+async def portfolio_totals(
+    request: Request,
+    by: str = Query("risk_profile", pattern=_by_pattern("portfolios")),
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """AUM-weighted ``performance`` per risk profile, manager or strategy.
+
+    ``weight`` is the group's total AUM and ``mean`` its AUM-weighted performance.
+    """
+    return await _group_totals(request, store, "portfolios", by)
@@ -1,69 +1,129 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from typing import List, Optional
 
-from app.data.json_store import JSONStore, get_json_store
-from app.schemas.deal import BrokerCreate, BrokerUpdate, BrokerResponse
+from app.api.caching import cached_response
+from app.api.pagination import decode_cursor, set_next_cursor
+from app.api.responses import FastJSONResponse
+from app.data.async_store import AsyncRepository, get_async_store
+from app.data.repository import BulkError, DuplicateKeyError
+from app.schemas.deal import BrokerBulkUpdate, BrokerCreate, BrokerUpdate, BrokerResponse
 
 router = APIRouter(prefix="/brokers", tags=["brokers"])
 
 
 @router.get("/", response_model=List[BrokerResponse])
-def get_brokers(
-    skip: int = 0,
-    limit: int = 100,
-    store: JSONStore = Depends(get_json_store)
+async def get_brokers(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    store: AsyncRepository = Depends(get_async_store)
 ):
-    """Get all brokers."""
-    brokers = store.get_brokers()
-    # Apply pagination
-    paginated_brokers = brokers[skip : skip + limit]
-    return [BrokerResponse(**broker) for broker in paginated_brokers]
+    """Get all brokers, paged by offset or by keyset cursor."""
+    async def build():
+        page = await store.query_brokers(skip=skip, limit=limit, after=decode_cursor(cursor))
+        response = FastJSONResponse(
+            [BrokerResponse(**broker).model_dump(mode="json") for broker in page.items]
+        )
+        set_next_cursor(response, page.next_position)
+        return response
+
+    return await cached_response(request, await store.version("brokers"), build)
 
 
 @router.get("/{broker_id}", response_model=BrokerResponse)
-def get_broker(broker_id: str, store: JSONStore = Depends(get_json_store)):
+async def get_broker(
+    broker_id: str,
+    request: Request,
+    store: AsyncRepository = Depends(get_async_store),
+):
     """Get a specific broker by broker_id."""
-    broker = store.get_broker(broker_id)
-    if not broker:
-        raise HTTPException(status_code=404, detail="Broker not found")
-    return BrokerResponse(**broker)
+    async def build():
+        broker = await store.get_broker(broker_id)
+        if not broker:
+            raise HTTPException(status_code=404, detail="Broker not found")
+        return FastJSONResponse(BrokerResponse(**broker).model_dump(mode="json"))
+
+    return await cached_response(request, await store.version("brokers"), build)
 
 
 @router.post("/", response_model=BrokerResponse, status_code=status.HTTP_201_CREATED)
-def create_broker(broker: BrokerCreate, store: JSONStore = Depends(get_json_store)):
+async def create_broker(broker: BrokerCreate, store: AsyncRepository = Depends(get_async_store)):
     """Create a new broker."""
-    # Check if broker_id already exists
-    existing_broker = store.get_broker(broker.broker_id)
-    if existing_broker:
+    broker_data = broker.model_dump(mode="json")
+    try:
+        created_broker = await store.create_broker(broker_data)
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Broker ID already exists")
-
-    broker_data = broker.model_dump()
-    created_broker = store.create_broker(broker_data)
     return BrokerResponse(**created_broker)
 
 
 @router.put("/{broker_id}", response_model=BrokerResponse)
-def update_broker(
+async def update_broker(
     broker_id: str,
     broker: BrokerUpdate,
-    store: JSONStore = Depends(get_json_store)
+    store: AsyncRepository = Depends(get_async_store)
 ):
     """Update a broker."""
-    existing_broker = store.get_broker(broker_id)
+    existing_broker = await store.get_broker(broker_id)
     if not existing_broker:
         raise HTTPException(status_code=404, detail="Broker not found")
 
     # Merge existing data with updates
-    update_data = broker.model_dump(exclude_unset=True)
+    update_data = broker.model_dump(mode="json", exclude_unset=True)
     updated_data = {**existing_broker, **update_data}
 
-    updated_broker = store.update_broker(broker_id, updated_data)
+    updated_broker = await store.update_broker(broker_id, updated_data)
+    if updated_broker is None:
+        # Deleted meanwhile
+        raise HTTPException(status_code=404, detail="Broker not found")
     return BrokerResponse(**updated_broker)
 
 
 @router.delete("/{broker_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_broker(broker_id: str, store: JSONStore = Depends(get_json_store)):
+async def delete_broker(broker_id: str, store: AsyncRepository = Depends(get_async_store)):
     """Delete a broker."""
-    if not store.delete_broker(broker_id):
+    if not await store.delete_broker(broker_id):
         raise HTTPException(status_code=404, detail="Broker not found")
     return None
+
+
+@router.post("/bulk", response_model=List[BrokerResponse], status_code=status.HTTP_201_CREATED)
+async def bulk_create_brokers(
+    brokers: List[BrokerCreate],
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Create many brokers in one all-or-nothing batch."""
+    records = [broker.model_dump(mode="json") for broker in brokers]
+    try:
+        created = await store.bulk_create_brokers(records)
+    except BulkError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+    return [BrokerResponse(**broker) for broker in created]
+
+
+@router.patch("/bulk", response_model=List[BrokerResponse])
+async def bulk_update_brokers(
+    brokers: List[BrokerBulkUpdate],
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Apply partial updates to many brokers in one all-or-nothing batch."""
+    changes = [broker.model_dump(mode="json", exclude_unset=True) for broker in brokers]
+    try:
+        updated = await store.bulk_update_brokers(changes)
+    except BulkError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+    return [BrokerResponse(**broker) for broker in updated]
+
+
+@router.post("/bulk/delete", status_code=status.HTTP_204_NO_CONTENT)
+async def bulk_delete_brokers(
+    broker_ids: List[str] = Body(...),
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Delete many brokers in one all-or-nothing batch."""
+    try:
+        await store.bulk_delete_brokers(broker_ids)
+    except BulkError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+    return None
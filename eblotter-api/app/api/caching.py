@@ -0,0 +1,109 @@
+"""
+Conditional GETs and a cache of encoded responses for read endpoints.
+
+Each collection exposes a version token that changes on every mutation.
+Read routes hand :func:`cached_response` that version and a callback that
+builds the response. The encoded body is kept, keyed by path, query string
+and version, so repeat reads skip both the store lookup and JSON encoding.
+Clients that send back the strong ``ETag`` get a bodiless ``304``.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+
+# Headers recomputed for every response rather than replayed from the cache
+_SKIPPED_HEADERS = {"content-length", "content-type", "etag"}
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+    media_type: str
+    headers: Dict[str, str]
+
+
+class ResponseCache:
+    """LRU of encoded responses bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, entry: CachedBody):
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old.body)
+            self._entries[key] = entry
+            self._size += len(entry.body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES)
+
+
+def make_etag(body: bytes) -> str:
+    """Strong entity tag derived from the response bytes."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header names ``etag`` (weak comparison, per RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
+
+
+async def cached_response(
+    request: Request, version: Hashable, build: Callable[[], Awaitable[Response]]
+) -> Response:
+    """Serve ``await build()``'s response from the cache while ``version`` is unchanged.
+
+    Only successful responses are cached; exceptions raised by ``build``
+    (404s, invalid cursors) propagate untouched.
+    """
+    key: Tuple[Hashable, ...] = (request.url.path, request.url.query, version)
+    entry = response_cache.get(key)
+    if entry is None:
+        response = await build()
+        if response.status_code != 200:
+            return response
+        body = bytes(response.body)
+        entry = CachedBody(
+            body,
+            make_etag(body),
+            response.media_type or "application/json",
+            {k: v for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS},
+        )
+        response_cache.put(key, entry)
+    headers = {**entry.headers, "ETag": entry.etag}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type=entry.media_type, headers=headers)
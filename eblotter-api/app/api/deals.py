@@ -1,126 +1,199 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from typing import List, Optional
+from datetime import date
 
-from app.data.json_store import JSONStore, get_json_store
-from app.schemas.deal import DealCreate, DealUpdate, DealResponse
+from app.api.caching import cached_response
+from app.api.export import EXPORT_FORMAT_PATTERN, export_response
+from app.api.pagination import decode_cursor, set_next_cursor
+from app.api.responses import FastJSONResponse
+from app.data.async_store import AsyncRepository, get_async_store
+from app.data.repository import ArchivedError, BulkError, DuplicateKeyError
+from app.schemas.deal import (
+    DealBulkUpdate,
+    DealCreate,
+    DealUpdate,
+    DealResponse,
+    deal_response_dict,
+)
+
+# Archived deals can still be read, but never changed
+ARCHIVED_DETAIL = "Deal is archived and read-only"
 
 router = APIRouter(prefix="/deals", tags=["deals"])
 
 
 @router.get("/", response_model=List[DealResponse])
-def get_deals(
-    skip: int = 0,
-    limit: int = 100,
-    store: JSONStore = Depends(get_json_store),
+async def get_deals(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    deal_status: Optional[str] = Query(None, alias="status"),
+    client: Optional[str] = None,
+    owner: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    start_date_from: Optional[date] = None,
+    start_date_to: Optional[date] = None,
+    end_date_from: Optional[date] = None,
+    end_date_to: Optional[date] = None,
+    sort: Optional[str] = Query(
+        None,
+        pattern=r"^-?(amount|start_date|end_date|deal_name)$",
+        description="Sort field, prefixed with '-' for descending order",
+    ),
+    store: AsyncRepository = Depends(get_async_store),
 ):
-    """Get all deals."""
-    deals = store.get_deals()
-    # Apply pagination
-    paginated_deals = deals[skip : skip + limit]
-    # Convert to frontend-friendly format
-    return [
-        DealResponse(
-            id=deal["deal_id"],
-            dealName=deal["deal_name"],
-            client=deal.get("client", ""),
-            amount=deal.get("amount", 0),
-            currency="USD",
-            status=deal.get("status", "Pending"),
-            startDate=deal["start_date"] if "start_date" in deal else "",
-            endDate=deal["end_date"] if "end_date" in deal else "",
-            owner=deal.get("owner", ""),
-            region="North America",
+    """Get deals, optionally filtered and sorted on indexed fields."""
+
+    async def build():
+        page = await store.query_deals(
+            status=deal_status,
+            client=client,
+            owner=owner,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            start_date_from=start_date_from,
+            start_date_to=start_date_to,
+            end_date_from=end_date_from,
+            end_date_to=end_date_to,
+            sort=sort,
+            skip=skip,
+            limit=limit,
+            after=decode_cursor(cursor, sort),
         )
-        for deal in paginated_deals
-    ]
+        # Convert to frontend-friendly format
+        response = FastJSONResponse([deal_response_dict(deal) for deal in page.items])
+        set_next_cursor(response, page.next_position, sort)
+        return response
+
+    return await cached_response(request, await store.version("deals"), build)
+
+
+@router.get("/export")
+async def export_deals(
+    export_format: str = Query("ndjson", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Stream every deal as NDJSON or CSV."""
+    return export_response(
+        "deals",
+        export_format,
+        lambda limit, after: store.repository.query_deals(limit=limit, after=after),
+        deal_response_dict,
+        list(DealResponse.model_fields),
+    )
 
 
 @router.get("/{deal_id}", response_model=DealResponse)
-def get_deal(
+async def get_deal(
     deal_id: str,
-    store: JSONStore = Depends(get_json_store),
+    request: Request,
+    store: AsyncRepository = Depends(get_async_store),
 ):
     """Get a specific deal by deal_id."""
-    deal = store.get_deal(deal_id)
-    if not deal:
-        raise HTTPException(status_code=404, detail="Deal not found")
-    return DealResponse(
-        id=deal["deal_id"],
-        dealName=deal["deal_name"],
-        client=deal.get("client", ""),
-        amount=deal.get("amount", 0),
-        currency="USD",
-        status=deal.get("status", "Pending"),
-        startDate=deal["start_date"] if "start_date" in deal else "",
-        endDate=deal["end_date"] if "end_date" in deal else "",
-        owner=deal.get("owner", ""),
-        region="North America",
-    )
+
+    async def build():
+        deal = await store.get_deal(deal_id)
+        if not deal:
+            raise HTTPException(status_code=404, detail="Deal not found")
+        return FastJSONResponse(deal_response_dict(deal))
+
+    return await cached_response(request, await store.version("deals"), build)
 
 
 @router.post("/", response_model=DealResponse, status_code=status.HTTP_201_CREATED)
-def create_deal(
+async def create_deal(
     deal: DealCreate,
-    store: JSONStore = Depends(get_json_store),
+    store: AsyncRepository = Depends(get_async_store),
 ):
     """Create a new deal."""
-    # Check if deal_id already exists
-    existing_deal = store.get_deal(deal.deal_id)
-    if existing_deal:
+    deal_data = deal.model_dump(mode="json")
+    try:
+        created_deal = await store.create_deal(deal_data)
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Deal ID already exists")
-
-    deal_data = deal.model_dump()
-    created_deal = store.create_deal(deal_data)
-    return DealResponse(
-        id=created_deal["deal_id"],
-        dealName=created_deal["deal_name"],
-        client=created_deal.get("client", ""),
-        amount=created_deal.get("amount", 0),
-        currency="USD",
-        status=created_deal.get("status", "Pending"),
-        startDate=created_deal["start_date"] if "start_date" in created_deal else "",
-        endDate=created_deal["end_date"] if "end_date" in created_deal else "",
-        owner=created_deal.get("owner", ""),
-        region="North America",
-    )
+    return FastJSONResponse(deal_response_dict(created_deal), status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/{deal_id}", response_model=DealResponse)
-def update_deal(
+async def update_deal(
     deal_id: str,
     deal: DealUpdate,
-    store: JSONStore = Depends(get_json_store),
+    store: AsyncRepository = Depends(get_async_store),
 ):
     """Update a deal."""
-    existing_deal = store.get_deal(deal_id)
+    existing_deal = await store.get_deal(deal_id)
     if not existing_deal:
         raise HTTPException(status_code=404, detail="Deal not found")
 
     # Merge existing data with updates
-    update_data = deal.model_dump(exclude_unset=True)
+    update_data = deal.model_dump(mode="json", exclude_unset=True)
     updated_data = {**existing_deal, **update_data}
 
-    updated_deal = store.update_deal(deal_id, updated_data)
-    return DealResponse(
-        id=updated_deal["deal_id"],
-        dealName=updated_deal["deal_name"],
-        client=updated_deal.get("client", ""),
-        amount=updated_deal.get("amount", 0),
-        currency="USD",
-        status=updated_deal.get("status", "Pending"),
-        startDate=updated_deal["start_date"] if "start_date" in updated_deal else "",
-        endDate=updated_deal["end_date"] if "end_date" in updated_deal else "",
-        owner=updated_deal.get("owner", ""),
-        region="North America",
-    )
+    try:
+        updated_deal = await store.update_deal(deal_id, updated_data)
+    except ArchivedError:
+        raise HTTPException(status_code=409, detail=ARCHIVED_DETAIL)
+    if updated_deal is None:
+        # Deleted meanwhile
+        raise HTTPException(status_code=404, detail="Deal not found")
+    return FastJSONResponse(deal_response_dict(updated_deal))
 
 
 @router.delete("/{deal_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_deal(
+async def delete_deal(
     deal_id: str,
-    store: JSONStore = Depends(get_json_store),
+    store: AsyncRepository = Depends(get_async_store),
 ):
     """Delete a deal."""
-    if not store.delete_deal(deal_id):
+    try:
+        deleted = await store.delete_deal(deal_id)
+    except ArchivedError:
+        raise HTTPException(status_code=409, detail=ARCHIVED_DETAIL)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Deal not found")
     return None
+
+
+@router.post("/bulk", response_model=List[DealResponse], status_code=status.HTTP_201_CREATED)
+async def bulk_create_deals(
+    deals: List[DealCreate],
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Create many deals in one all-or-nothing batch."""
+    records = [deal.model_dump(mode="json") for deal in deals]
+    try:
+        created = await store.bulk_create_deals(records)
+    except BulkError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+    return FastJSONResponse(
+        [deal_response_dict(deal) for deal in created], status_code=status.HTTP_201_CREATED
+    )
+
+
+@router.patch("/bulk", response_model=List[DealResponse])
+async def bulk_update_deals(
+    deals: List[DealBulkUpdate],
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Apply partial updates to many deals in one all-or-nothing batch."""
+    changes = [deal.model_dump(mode="json", exclude_unset=True) for deal in deals]
+    try:
+        updated = await store.bulk_update_deals(changes)
+    except BulkError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+    return FastJSONResponse([deal_response_dict(deal) for deal in updated])
+
+
+@router.post("/bulk/delete", status_code=status.HTTP_204_NO_CONTENT)
+async def bulk_delete_deals(
+    deal_ids: List[str] = Body(...),
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Delete many deals in one all-or-nothing batch."""
+    try:
+        await store.bulk_delete_deals(deal_ids)
+    except BulkError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+    return None
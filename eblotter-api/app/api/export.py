@@ -0,0 +1,73 @@
+"""
+Streaming full-table exports shared by the export endpoints.
+
+Rows are pulled from the store one keyset page at a time and encoded as
+NDJSON or CSV while the response is being sent, so memory stays flat no
+matter how large the collection is.
+"""
+
+import csv
+import io
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+from app.api.responses import dumps
+from app.data.indexes import Position
+from app.data.repository import Page
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FORMAT_PATTERN = r"^(ndjson|csv)$"
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _iter_pages(
+    fetch_page: Callable[[int, Optional[Position]], Page],
+    to_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield converted rows one page at a time until the collection is exhausted."""
+    after = None
+    while True:
+        page = fetch_page(EXPORT_CHUNK_SIZE, after)
+        if page.items:
+            yield [to_row(record) for record in page.items]
+        if page.next_position is None:
+            return
+        after = page.next_position
+
+
+def _ndjson(pages: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for rows in pages:
+        yield b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def _csv(pages: Iterator[List[Dict[str, Any]]], fieldnames: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    for rows in pages:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(
+    name: str,
+    export_format: str,
+    fetch_page: Callable[[int, Optional[Position]], Page],
+    to_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+    fieldnames: List[str],
+) -> StreamingResponse:
+    """Build a streaming download of every row returned by ``fetch_page``."""
+    pages = _iter_pages(fetch_page, to_row)
+    body = _csv(pages, fieldnames) if export_format == "csv" else _ndjson(pages)
+    extension = "csv" if export_format == "csv" else "ndjson"
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'},
+    )
@@ -0,0 +1,188 @@
+"""
+Idempotency keys for write requests.
+
+A client that sends ``Idempotency-Key: <unique value>`` with a POST, PUT,
+PATCH or DELETE can retry it safely: the first response is kept for
+``IDEMPOTENCY_TTL_SECONDS`` and replayed, marked ``Idempotent-Replayed:
+true``, to every retry carrying the same key and an identical request.
+Retries skip validation, the store mutation and the write to disk. Reusing
+a key for a different request is rejected with ``422``; retrying while the
+first attempt is still running gets ``409``. Server errors are not kept, so
+those requests can be retried for real.
+
+Keys are remembered per process, so with several workers a retry only
+replays when it reaches the worker that served the original.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class StoredResponse(NamedTuple):
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    route: Any = None  # the original's scope["route"], so replays keep their metrics label
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "expires", "response")
+
+    def __init__(self, fingerprint: bytes, expires: float):
+        self.fingerprint = fingerprint
+        self.expires = expires
+        self.response: Optional[StoredResponse] = None
+
+
+class IdempotencyStore:
+    """Responses by idempotency key, dropped after ``ttl`` seconds or when full.
+
+    Only used from the event loop, so it needs no lock.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def begin(self, key: Hashable, fingerprint: bytes):
+        """Claim ``key`` for a request that is about to run."""
+        self._entries[key] = _Entry(fingerprint, time.monotonic() + self.ttl)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def complete(self, key: Hashable, response: StoredResponse):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.response = response
+
+    def discard(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+idempotency_store = IdempotencyStore(
+    settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_MAX_ENTRIES
+)
+
+
+def _fingerprint(scope, body: bytes) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (scope["method"].encode(), scope["path"].encode(), scope["query_string"], body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.digest()
+
+
+async def _send_error(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", b"%d" % len(body))]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware applying :data:`idempotency_store` to keyed write requests."""
+
+    def __init__(self, app, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store or idempotency_store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in _METHODS:
+            return await self.app(scope, receive, send)
+        idempotency_key = next(
+            (value for name, value in scope["headers"] if name == IDEMPOTENCY_HEADER), None
+        )
+        if idempotency_key is None:
+            return await self.app(scope, receive, send)
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        fingerprint = _fingerprint(scope, body)
+        key = (scope["method"], scope["path"], idempotency_key)
+
+        entry = self.store.get(key)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                return await _send_error(
+                    send, 422, "Idempotency-Key was already used for a different request"
+                )
+            if entry.response is None:
+                return await _send_error(
+                    send, 409, "A request with this Idempotency-Key is still in progress"
+                )
+            return await self._replay(entry.response, scope, send)
+
+        self.store.begin(key, fingerprint)
+        received = False
+
+        async def replay_body():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status = 500
+        headers: List[Tuple[bytes, bytes]] = []
+        parts = []
+
+        async def capture(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                parts.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, capture)
+        except BaseException:
+            self.store.discard(key)
+            raise
+        if status < 500:
+            response = StoredResponse(status, headers, b"".join(parts), scope.get("route"))
+            self.store.complete(key, response)
+        else:
+            self.store.discard(key)
+
+    @staticmethod
+    async def _replay(response: StoredResponse, scope, send):
+        if response.route is not None:
+            scope["route"] = response.route
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status,
+                "headers": [*response.headers, (REPLAYED_HEADER.lower().encode(), b"true")],
+            }
+        )
+        await send({"type": "http.response.body", "body": response.body})
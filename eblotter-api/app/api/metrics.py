@@ -0,0 +1,82 @@
+"""
+Request metrics and the Prometheus scrape endpoint.
+
+:class:`MetricsMiddleware` times every HTTP request and labels it with the
+route template (``/api/v1/deals/{deal_id}``) rather than the raw path, so
+the number of series stays bounded. ``GET /metrics`` renders everything in
+:mod:`app.core.metrics` in the Prometheus text format. Requests that never
+reach a route (unknown paths, idempotency conflicts) are labelled
+``unmatched``.
+"""
+
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import (
+    http_request_duration,
+    http_requests_in_flight,
+    registry,
+    store_collection_records,
+)
+from app.data.async_store import AsyncRepository, get_async_store
+
+UNMATCHED_ROUTE = "unmatched"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter(tags=["metrics"])
+
+
+def _route_template(scope) -> str:
+    # Routing sets it; idempotent replays restore the original request's
+    template: Optional[str] = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    # Routes of an included router may carry only their own path; take the
+    # prefix from the request, since path parameters never span segments
+    path = scope["path"]
+    depth = path.count("/") - template.count("/")
+    if depth > 0:
+        template = "/".join(path.split("/")[: depth + 1]) + template
+    return template
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and in-flight counts for HTTP requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        status = 500
+
+        async def capture(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = http_requests_in_flight.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            http_request_duration.labels(method, _route_template(scope), str(status)).observe(
+                elapsed
+            )
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(store: AsyncRepository = Depends(get_async_store)):
+    """Current metrics in the Prometheus text exposition format."""
+    for collection, count in (await store.collection_sizes()).items():
+        store_collection_records.labels(collection).set(count)
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,66 @@
+"""
+Opaque keyset cursors shared by the list endpoints.
+
+A cursor wraps the sort position of the last row of a page together with the
+sort it belongs to. List routes return it in the ``X-Next-Cursor`` header and
+accept it back through the ``cursor`` query parameter.
+"""
+
+import base64
+import json
+from typing import Any, Optional
+
+from fastapi import HTTPException, Response
+
+from app.data.indexes import Position
+from app.data.repository import SORT_DEFAULTS
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: Position, sort: Optional[str] = None) -> str:
+    """Serialize a sort position into a URL-safe token."""
+    payload = json.dumps([sort, *position], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], sort: Optional[str] = None) -> Optional[Position]:
+    """Parse a token from :func:`encode_cursor`, rejecting ones minted for another sort."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, missing, value, record_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort:
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+    # The position is compared against index entries, so its types must match them
+    default = SORT_DEFAULTS.get((sort or "id").lstrip("-"))
+    if not (
+        isinstance(missing, bool)
+        and _is_int(record_id)
+        and ((missing and value is None) or _same_kind(value, default))
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Rows missing the field all sort by its default
+    return (True, default, record_id) if missing else (False, value, record_id)
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _same_kind(value: Any, default: Any) -> bool:
+    """Whether ``value`` can be compared with the sort field's values."""
+    if isinstance(default, float):
+        return _is_int(value) or isinstance(value, float)
+    if isinstance(default, int):
+        return _is_int(value)
+    return isinstance(default, str) and isinstance(value, str)
+
+
+def set_next_cursor(response: Response, position: Optional[Position], sort: Optional[str] = None):
+    """Expose the cursor for the following page, if there is one."""
+    if position is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(position, sort)
@@ -1,69 +1,137 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from typing import List, Optional
 
-from app.data.json_store import JSONStore, get_json_store
-from app.schemas.deal import PortfolioCreate, PortfolioUpdate, PortfolioResponse
+from app.api.caching import cached_response
+from app.api.pagination import decode_cursor, set_next_cursor
+from app.api.responses import FastJSONResponse
+from app.data.async_store import AsyncRepository, get_async_store
+from app.data.repository import BulkError, DuplicateKeyError
+from app.schemas.deal import (
+    PortfolioBulkUpdate,
+    PortfolioCreate,
+    PortfolioUpdate,
+    PortfolioResponse,
+)
 
 router = APIRouter(prefix="/portfolios", tags=["portfolios"])
 
 
 @router.get("/", response_model=List[PortfolioResponse])
-def get_portfolios(
-    skip: int = 0,
-    limit: int = 100,
-    store: JSONStore = Depends(get_json_store)
+async def get_portfolios(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    store: AsyncRepository = Depends(get_async_store)
 ):
-    """Get all portfolios."""
-    portfolios = store.get_portfolios()
-    # Apply pagination
-    paginated_portfolios = portfolios[skip : skip + limit]
-    return [PortfolioResponse(**portfolio) for portfolio in paginated_portfolios]
+    """Get all portfolios, paged by offset or by keyset cursor."""
+    async def build():
+        page = await store.query_portfolios(skip=skip, limit=limit, after=decode_cursor(cursor))
+        response = FastJSONResponse(
+            [PortfolioResponse(**portfolio).model_dump(mode="json") for portfolio in page.items]
+        )
+        set_next_cursor(response, page.next_position)
+        return response
+
+    return await cached_response(request, await store.version("portfolios"), build)
 
 
 @router.get("/{portfolio_id}", response_model=PortfolioResponse)
-def get_portfolio(portfolio_id: str, store: JSONStore = Depends(get_json_store)):
+async def get_portfolio(
+    portfolio_id: str,
+    request: Request,
+    store: AsyncRepository = Depends(get_async_store),
+):
     """Get a specific portfolio by portfolio_id."""
-    portfolio = store.get_portfolio(portfolio_id)
-    if not portfolio:
-        raise HTTPException(status_code=404, detail="Portfolio not found")
-    return PortfolioResponse(**portfolio)
+    async def build():
+        portfolio = await store.get_portfolio(portfolio_id)
+        if not portfolio:
+            raise HTTPException(status_code=404, detail="Portfolio not found")
+        return FastJSONResponse(PortfolioResponse(**portfolio).model_dump(mode="json"))
+
+    return await cached_response(request, await store.version("portfolios"), build)
 
 
 @router.post("/", response_model=PortfolioResponse, status_code=status.HTTP_201_CREATED)
-def create_portfolio(portfolio: PortfolioCreate, store: JSONStore = Depends(get_json_store)):
+async def create_portfolio(
+    portfolio: PortfolioCreate,
+    store: AsyncRepository = Depends(get_async_store),
+):
     """Create a new portfolio."""
-    # Check if portfolio_id already exists
-    existing_portfolio = store.get_portfolio(portfolio.portfolio_id)
-    if existing_portfolio:
+    portfolio_data = portfolio.model_dump(mode="json")
+    try:
+        created_portfolio = await store.create_portfolio(portfolio_data)
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Portfolio ID already exists")
-
-    portfolio_data = portfolio.model_dump()
-    created_portfolio = store.create_portfolio(portfolio_data)
     return PortfolioResponse(**created_portfolio)
 
 
 @router.put("/{portfolio_id}", response_model=PortfolioResponse)
-def update_portfolio(
+async def update_portfolio(
     portfolio_id: str,
     portfolio: PortfolioUpdate,
-    store: JSONStore = Depends(get_json_store)
+    store: AsyncRepository = Depends(get_async_store)
 ):
     """Update a portfolio."""
-    existing_portfolio = store.get_portfolio(portfolio_id)
+    existing_portfolio = await store.get_portfolio(portfolio_id)
     if not existing_portfolio:
         raise HTTPException(status_code=404, detail="Portfolio not found")
 
     # Merge existing data with updates
-    update_data = portfolio.model_dump(exclude_unset=True)
+    update_data = portfolio.model_dump(mode="json", exclude_unset=True)
     updated_data = {**existing_portfolio, **update_data}
 
-    updated_portfolio = store.update_portfolio(portfolio_id, updated_data)
+    updated_portfolio = await store.update_portfolio(portfolio_id, updated_data)
+    if updated_portfolio is None:
+        # Deleted meanwhile
+        raise HTTPException(status_code=404, detail="Portfolio not found")
     return PortfolioResponse(**updated_portfolio)
 
 
 @router.delete("/{portfolio_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_portfolio(portfolio_id: str, store: JSONStore = Depends(get_json_store)):
+async def delete_portfolio(portfolio_id: str, store: AsyncRepository = Depends(get_async_store)):
     """Delete a portfolio."""
-    if not store.delete_portfolio(portfolio_id):
+    if not await store.delete_portfolio(portfolio_id):
         raise HTTPException(status_code=404, detail="Portfolio not found")
     return None
+
+
+@router.post("/bulk", response_model=List[PortfolioResponse], status_code=status.HTTP_201_CREATED)
+async def bulk_create_portfolios(
+    portfolios: List[PortfolioCreate],
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Create many portfolios in one all-or-nothing batch."""
+    records = [portfolio.model_dump(mode="json") for portfolio in portfolios]
+    try:
+        created = await store.bulk_create_portfolios(records)
+    except BulkError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+    return [PortfolioResponse(**portfolio) for portfolio in created]
+
+
+@router.patch("/bulk", response_model=List[PortfolioResponse])
+async def bulk_update_portfolios(
+    portfolios: List[PortfolioBulkUpdate],
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Apply partial updates to many portfolios in one all-or-nothing batch."""
+    changes = [portfolio.model_dump(mode="json", exclude_unset=True) for portfolio in portfolios]
+    try:
+        updated = await store.bulk_update_portfolios(changes)
+    except BulkError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+    return [PortfolioResponse(**portfolio) for portfolio in updated]
+
+
+@router.post("/bulk/delete", status_code=status.HTTP_204_NO_CONTENT)
+async def bulk_delete_portfolios(
+    portfolio_ids: List[str] = Body(...),
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Delete many portfolios in one all-or-nothing batch."""
+    try:
+        await store.bulk_delete_portfolios(portfolio_ids)
+    except BulkError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+    return None
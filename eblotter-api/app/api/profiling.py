@@ -0,0 +1,214 @@
+"""
+On-demand profiling of single requests.
+
+With ``PROFILING_TOKEN`` set, a request carrying ``X-Profile-Token: <token>``
+can ask to be profiled with ``X-Profile: <mode>`` or ``?profile=<mode>``,
+where the modes are those of :mod:`app.core.profiling`. The response is
+served as usual, plus an ``X-Profile-Id`` header. The report is kept in
+memory, and ``GET /profiles/{id}`` (with the same token) downloads it.
+``PROFILING_SAMPLE_RATE`` additionally profiles that fraction of all requests
+in ``PROFILING_SAMPLE_MODE``, so slow paths show up without anyone asking. It
+needs the token as well, since its profiles are downloaded the same way.
+
+Only one request is profiled at a time. A request asking while another one
+is being profiled is served normally, with ``X-Profile: busy``.
+"""
+
+import hmac
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+
+from app.core import profiling
+from app.core.config import settings
+
+PROFILE_HEADER = b"x-profile"
+TOKEN_HEADER = b"x-profile-token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+
+class StoredProfile:
+    __slots__ = ("id", "mode", "method", "path", "status", "duration", "created", "report", "raw")
+
+    def __init__(
+        self,
+        profile_id: str,
+        mode: str,
+        scope,
+        status: int,
+        duration: float,
+        result: Dict[str, Any],
+    ):
+        self.id = profile_id
+        self.mode = mode
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.status = status
+        self.duration = duration
+        self.created = time.time()
+        self.report: str = result["report"]
+        self.raw: Optional[bytes] = result.get("raw")
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 3),
+            "created": self.created,
+        }
+
+
+class ProfileStore:
+    """The latest ``max_entries`` profiles, oldest dropped first."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._profiles: "OrderedDict[str, StoredProfile]" = OrderedDict()
+
+    def add(self, profile: StoredProfile):
+        self._profiles[profile.id] = profile
+        while len(self._profiles) > self.max_entries:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[StoredProfile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[StoredProfile]:
+        return list(reversed(self._profiles.values()))
+
+    def clear(self):
+        self._profiles.clear()
+
+
+profile_store = ProfileStore(settings.PROFILING_MAX_STORED)
+
+
+def _authorized(token: Optional[str]) -> bool:
+    expected = settings.PROFILING_TOKEN
+    if not expected or not token:
+        return False
+    # compare_digest only takes ASCII str, so compare the bytes
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+def _requested_mode(scope) -> Optional[str]:
+    """The mode this request should be profiled in, if any."""
+    headers = dict(scope["headers"])
+    mode = headers.get(PROFILE_HEADER, b"").decode("latin-1")
+    if not mode and b"profile=" in scope["query_string"]:
+        mode = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [""])[0]
+    if mode:
+        token = headers.get(TOKEN_HEADER, b"").decode("latin-1")
+        return mode if mode in profiling.MODES and _authorized(token) else None
+    rate = settings.PROFILING_SAMPLE_RATE
+    if rate > 0 and random.random() < rate:
+        return settings.PROFILING_SAMPLE_MODE
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling the requests that ask for it (or are sampled)."""
+
+    def __init__(self, app, store: Optional[ProfileStore] = None):
+        self.app = app
+        self.store = store or profile_store
+
+    async def __call__(self, scope, receive, send):
+        # Sampling requires the token too, see Settings
+        if scope["type"] != "http" or not settings.PROFILING_TOKEN:
+            return await self.app(scope, receive, send)
+        mode = _requested_mode(scope)
+        if mode is None:
+            return await self.app(scope, receive, send)
+        if not profiling.acquire():
+            return await self.app(scope, receive, _with_header(send, PROFILE_HEADER, b"busy"))
+
+        profile_id = uuid.uuid4().hex
+        status = 500
+
+        async def capture(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                session.response_started()
+                headers = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER.lower().encode(), profile_id.encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            session = profiling.make_session(mode)
+            context = profiling.activate(session)
+            start = time.perf_counter()
+            session.start()
+            try:
+                await self.app(scope, receive, capture)
+            finally:
+                result = session.stop()
+                duration = time.perf_counter() - start
+                profiling.deactivate(context)
+                self.store.add(StoredProfile(profile_id, mode, scope, status, duration, result))
+        finally:
+            profiling.release()
+
+
+def _with_header(send, name: bytes, value: bytes):
+    async def wrapped(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), (name, value)]}
+        await send(message)
+
+    return wrapped
+
+
+router = APIRouter(prefix="/profiles", tags=["profiling"], include_in_schema=False)
+
+
+def _check_token(token: Optional[str]):
+    if not _authorized(token):
+        # Look like a missing route to anyone without the token
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("/")
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """Stored profiles, newest first."""
+    _check_token(x_profile_token)
+    return [profile.summary() for profile in profile_store.list()]
+
+
+@router.get("/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    profile_format: str = Query("text", alias="format", pattern=r"^(text|pstats)$"),
+    x_profile_token: Optional[str] = Header(None),
+):
+    """One profile's report, or the raw ``pstats`` dump of a ``cprofile`` one."""
+    _check_token(x_profile_token)
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if profile_format == "pstats":
+        if profile.raw is None:
+            raise HTTPException(status_code=400, detail=f"{profile.mode} profiles have no pstats")
+        return Response(
+            profile.raw,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'},
+        )
+    header = (
+        f"# {profile.mode} {profile.method} {profile.path} -> {profile.status} "
+        f"in {profile.duration * 1000:.1f} ms\n"
+    )
+    return PlainTextResponse(header + profile.report)
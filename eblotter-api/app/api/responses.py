@@ -0,0 +1,49 @@
+"""
+Fast JSON responses for routes that return trusted store data.
+
+Returning one of these from a route skips FastAPI's response_model
+validation and encodes straight to bytes, with orjson when it is installed.
+"""
+
+import json
+import time
+from collections.abc import Mapping
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from app.core.metrics import response_encode_duration
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None  # type: ignore[assignment]
+
+
+def _default(value: Any) -> Any:
+    # Columnar stores hand out read-only mapping views rather than dicts
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode ``content`` as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=_default).encode(
+        "utf-8"
+    )
+
+
+_encode_timings = response_encode_duration.labels()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with :func:`dumps`."""
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = dumps(content)
+        _encode_timings.observe(time.perf_counter() - start)
+        return body
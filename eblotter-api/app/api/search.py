@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+
+from app.api.responses import FastJSONResponse
+from app.data.async_store import AsyncRepository, get_async_store
+from app.schemas.deal import SearchHit
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("/", response_model=List[SearchHit])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Words or word prefixes"),
+    limit: int = Query(20, ge=1, le=100),
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Typeahead search over deals, brokers, portfolios and allocations, best match first."""
+    return FastJSONResponse(await store.search(q, limit))
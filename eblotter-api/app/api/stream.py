@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
+
+from app.api.responses import dumps
+from app.core.config import settings
+from app.data.async_store import AsyncRepository, get_async_store
+from app.data.events import ChangeEvent, Subscription
+from app.schemas.deal import deal_response_dict
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+COLLECTIONS = {"deals", "brokers", "portfolios", "allocations"}
+
+# Events carry records in the same shape as the REST responses
+_WIRE_FORMATS = {"deals": deal_response_dict}
+
+RESYNC_FRAME = b'event: resync\ndata: {"reason":"missed events; reload and keep listening"}\n\n'
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+def _frame(event: ChangeEvent) -> bytes:
+    """SSE frame for ``event``, encoded once and shared by every subscriber."""
+    if event.frame is None:
+        payload = event.to_dict()
+        to_wire = _WIRE_FORMATS.get(event.collection)
+        if to_wire is not None and event.record is not None:
+            payload["record"] = to_wire(event.record)
+        event.frame = b"id: %d\nevent: change\ndata: %s\n\n" % (event.seq, dumps(payload))
+    return event.frame
+
+
+async def event_frames(
+    request: Request, subscription: Subscription, heartbeat: float
+) -> AsyncIterator[bytes]:
+    """Yield SSE frames for ``subscription`` until the client goes away."""
+    try:
+        while True:
+            events, resync = await subscription.next_batch(heartbeat)
+            if resync:
+                yield RESYNC_FRAME
+            if events:
+                yield b"".join(_frame(event) for event in events)
+            elif not resync:
+                if await request.is_disconnected():
+                    return
+                yield KEEPALIVE_FRAME
+    finally:
+        subscription.close()
+
+
+@router.get("/")
+async def stream_changes(
+    request: Request,
+    collections: Optional[str] = Query(
+        None, description="Comma-separated collections to follow (default: all)"
+    ),
+    since: Optional[int] = Query(None, description="Resume after this sequence number"),
+    last_event_id: Optional[int] = Header(None),
+    store: AsyncRepository = Depends(get_async_store),
+):
+    """Server-sent events for every create, update and delete.
+
+    Each ``change`` event has the sequence number as its SSE id, so browsers
+    resume automatically through ``Last-Event-ID``. A ``resync`` event means
+    events were missed (the client fell too far behind, or resumed from a
+    sequence no longer held) and state should be reloaded. With several
+    workers on a shared JSON store, a ``change`` with op ``reload`` means
+    another worker changed that collection.
+    """
+    wanted = None
+    if collections:
+        wanted = {name.strip() for name in collections.split(",") if name.strip()}
+        unknown = wanted - COLLECTIONS
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown collections: {', '.join(sorted(unknown))}"
+            )
+    after = since if since is not None else last_event_id
+    subscription = store.feed.subscribe(after, wanted)
+    return StreamingResponse(
+        event_frames(request, subscription, settings.STREAM_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
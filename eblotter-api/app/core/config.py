@@ -1,5 +1,6 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import List, Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -12,7 +13,57 @@ class Settings(BaseSettings):
     API_PREFIX: str = "/api/v1"
 
     # Database Configuration
-    DATABASE_URL: str = "sqlite:///./eblotter.db"
+    # json:// (or json:///path/to/dir) serves the JSON files in app/data;
+    # any SQLAlchemy URL serves the database instead. The default used to be
+    # sqlite:///./eblotter.db back when the routers always served the JSON
+    # files; json:// keeps them doing so (see "Upgrading" in the README).
+    DATABASE_URL: str = "json://"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+
+    # JSON Store Configuration
+    STORE_PERSISTENCE: str = "snapshot"  # snapshot, journal
+    STORE_COMPACT_EVERY: int = 1000
+    STORE_FLUSH_POLICY: str = "immediate"  # immediate, interval, count
+    STORE_FLUSH_INTERVAL_MS: int = 50
+    STORE_FLUSH_EVERY: int = 100
+    # Coordinate several worker processes serving the same data directory
+    STORE_SHARED: bool = False
+    # How often a shared store looks for other workers' writes while idle (0 disables)
+    STORE_SHARED_POLL_MS: int = 500
+    # rows keeps plain dicts; columnar packs deals and allocations into typed columns
+    STORE_LAYOUT: str = "rows"
+    # Pickle each collection with its indexes next to the JSON file for fast restarts
+    STORE_SNAPSHOTS: bool = False
+    # Load each collection on first use instead of at startup
+    STORE_LAZY_LOAD: bool = False
+
+    # Encoded read responses kept for conditional GETs (0 disables the cache)
+    RESPONSE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+
+    # Responses kept for replaying retried writes that carry an Idempotency-Key
+    IDEMPOTENCY_TTL_SECONDS: float = 24 * 60 * 60
+    IDEMPOTENCY_MAX_ENTRIES: int = 10000
+
+    # Per-route latency histograms and the Prometheus /metrics endpoint
+    METRICS_ENABLED: bool = True
+
+    # On-demand request profiling. Requests carrying X-Profile-Token: <token> may
+    # ask for a profile with X-Profile or ?profile=; unset disables it. A fraction
+    # of all requests can also be profiled automatically in PROFILING_SAMPLE_MODE.
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_SAMPLE_MODE: Literal["cprofile", "sample", "tracemalloc"] = "sample"
+    PROFILING_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILING_TRACEMALLOC_FRAMES: int = 10
+    PROFILING_TOP: int = 40
+    PROFILING_MAX_STORED: int = 50
+
+    # Change stream (/stream): events kept for resuming, per-client queue bound,
+    # and seconds between keepalive comments
+    STREAM_BACKLOG: int = 1000
+    STREAM_QUEUE_SIZE: int = 1000
+    STREAM_HEARTBEAT_SECONDS: float = 15.0
 
     # CORS Configuration
     ALLOWED_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
@@ -23,6 +74,30 @@ class Settings(BaseSettings):
         case_sensitive=True
     )
 
+    @model_validator(mode="after")
+    def _sampling_needs_token(self) -> "Settings":
+        # Sampled profiles could never be downloaded without a token
+        if self.PROFILING_SAMPLE_RATE > 0 and not self.PROFILING_TOKEN:
+            raise ValueError("PROFILING_SAMPLE_RATE needs PROFILING_TOKEN to be set")
+        return self
+
+    @property
+    def uses_json_store(self) -> bool:
+        """Whether DATABASE_URL selects the JSON file store."""
+        return self.DATABASE_URL.startswith("json://")
+
+    @property
+    def json_data_dir(self) -> Optional[str]:
+        """Data directory from a json:///path URL, or None for the default."""
+        if not self.uses_json_store:
+            return None
+        return self.DATABASE_URL[len("json://"):] or None
+
+    @property
+    def sql_database_url(self) -> str:
+        """SQLAlchemy URL, falling back to a local SQLite file in JSON mode."""
+        return "sqlite:///./eblotter.db" if self.uses_json_store else self.DATABASE_URL
+
     @property
     def allowed_origins_list(self) -> List[str]:
         """Convert comma-separated origins string to list."""
@@ -0,0 +1,209 @@
+"""
+Profilers for a single request.
+
+A :class:`Session` wraps one request in one of three modes:
+
+``cprofile``
+    Deterministic profile of every call, as ``pstats`` text or a raw dump
+    for tools like snakeviz. Store calls that run on a worker thread are
+    profiled there and merged in, so ``JSONStore`` time is not lost.
+``sample``
+    A background thread records the stacks of busy threads every
+    ``PROFILING_SAMPLE_INTERVAL_MS``. Overhead depends on the interval
+    rather than on the number of calls. The output is folded stacks,
+    which flame graph tools read directly.
+``tracemalloc``
+    Memory allocated by the request and still held when its response
+    starts, grouped by source line, plus the peak traced memory while the
+    request ran.
+
+Profilers are process-wide (cProfile and tracemalloc hook the interpreter),
+so only one session runs at a time. Anything else running concurrently on
+the event loop shows up in the profile too.
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import tempfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+MODES = ("cprofile", "sample", "tracemalloc")
+
+_session: ContextVar[Optional["Session"]] = ContextVar("profiling_session", default=None)
+_running = threading.Lock()
+
+# Innermost frames of threads that are waiting rather than working
+_IDLE_FUNCTIONS = {"select", "poll", "wait", "_worker", "sleep"}
+
+
+class Session:
+    """One profile in progress; :meth:`stop` returns the finished report."""
+
+    mode = ""
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self) -> Dict[str, Any]:
+        """``{"report": text}``, plus ``"raw"`` bytes when the mode has a binary format."""
+        raise NotImplementedError
+
+    def in_thread(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """``fn`` adjusted to be profiled when it runs on a worker thread."""
+        return fn
+
+    def response_started(self):
+        """Called as the response headers go out, before the body is released."""
+
+
+class CProfileSession(Session):
+    mode = "cprofile"
+
+    def __init__(self, top: int):
+        self.top = top
+        self._profile = cProfile.Profile()
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._profile.enable()
+
+    def in_thread(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        def profiled(*args, **kwargs):
+            profile = cProfile.Profile()
+            with self._lock:
+                self._thread_profiles.append(profile)
+            return profile.runcall(fn, *args, **kwargs)
+
+        return profiled
+
+    def stop(self) -> Dict[str, Any]:
+        self._profile.disable()
+        out = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=out)
+        with self._lock:
+            for profile in self._thread_profiles:
+                stats.add(profile)
+        stats.sort_stats("cumulative").print_stats(self.top)
+        # dump_stats only writes to a path; its format is what pstats loads
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "profile.pstats"
+            stats.dump_stats(path)
+            raw = path.read_bytes()
+        return {"report": out.getvalue(), "raw": raw}
+
+
+class SampleSession(Session):
+    mode = "sample"
+
+    def __init__(self, interval_ms: float, top: int):
+        self.interval = interval_ms / 1000
+        self.top = top
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._done.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own or frame.f_code.co_name in _IDLE_FUNCTIONS:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Dict[str, Any]:
+        self._done.set()
+        self._thread.join()
+        header = f"# {self.samples} samples every {self.interval * 1000:g} ms\n"
+        lines = [f"{stack} {count}" for stack, count in self._stacks.most_common(self.top)]
+        return {"report": header + "\n".join(lines) + "\n"}
+
+
+class TracemallocSession(Session):
+    mode = "tracemalloc"
+
+    def __init__(self, frames: int, top: int):
+        self.frames = frames
+        self.top = top
+        self._started_tracing = False
+        self._before: Optional[tracemalloc.Snapshot] = None
+        self._after: Optional[tracemalloc.Snapshot] = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._before = tracemalloc.take_snapshot()
+
+    def response_started(self):
+        # What the request holds while its response is alive, not after teardown
+        if self._after is None:
+            self._after = tracemalloc.take_snapshot()
+
+    def stop(self) -> Dict[str, Any]:
+        after = self._after or tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if self._started_tracing:
+            tracemalloc.stop()
+        # Leave out the profiler's own bookkeeping
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        assert self._before is not None
+        before = self._before.filter_traces(ignore)
+        diff = after.filter_traces(ignore).compare_to(before, "lineno")
+        lines = [f"# peak traced memory {peak / 1024:.1f} KiB"]
+        lines.extend(str(stat) for stat in diff[: self.top])
+        return {"report": "\n".join(lines) + "\n"}
+
+
+def make_session(mode: str) -> Session:
+    if mode == "cprofile":
+        return CProfileSession(settings.PROFILING_TOP)
+    if mode == "sample":
+        return SampleSession(settings.PROFILING_SAMPLE_INTERVAL_MS, settings.PROFILING_TOP)
+    if mode == "tracemalloc":
+        return TracemallocSession(settings.PROFILING_TRACEMALLOC_FRAMES, settings.PROFILING_TOP)
+    raise ValueError(f"Unknown profiling mode: {mode}")
+
+
+def acquire() -> bool:
+    """Claim the profiler for one session; False while another is running."""
+    return _running.acquire(blocking=False)
+
+
+def release():
+    _running.release()
+
+
+def activate(session: Session):
+    """Make ``session`` current for this request's context (and its worker threads)."""
+    return _session.set(session)
+
+
+def deactivate(token):
+    _session.reset(token)
+
+
+def in_thread(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """``fn`` as it should run on a worker thread for the current request."""
+    session = _session.get()
+    return fn if session is None else session.in_thread(fn)
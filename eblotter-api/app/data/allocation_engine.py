@@ -0,0 +1,150 @@
+"""
+Vectorized allocation of a deal circle across portfolio demands.
+
+Every method reduces to one kernel, :func:`capped_split`. Each account gets
+``min(demand, level * weight)``, with the single ``level`` chosen so the
+amounts add up to the circle. The methods differ only in the weights:
+
+``Pro Rata``
+    Weight is the demand, so every account gets the same fill rate.
+``Equal``
+    Equal weights. Small demands are filled and the rest share the remainder.
+``Tiered``
+    Demand times the weight of the account's tier.
+``Custom``
+    Weights supplied per account.
+``Priority``
+    Levels are filled in ascending order. Accounts on the level where the
+    circle runs out share it pro rata, and later levels get nothing.
+
+The level is found by sorting the accounts by the level at which they fill
+up, so a circle over thousands of accounts takes a sort and a few cumulative
+sums rather than a loop over the accounts.
+
+With a lot size, each amount is rounded down to whole lots. The lots freed
+by rounding go, one each, to the accounts with the largest remainders
+(largest remainder method), without exceeding any demand. Whatever cannot be
+placed in whole lots is reported as unallocated.
+"""
+
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+METHODS = ("Pro Rata", "Tiered", "Priority", "Equal", "Custom")
+
+# Slack for float error when counting lots
+_EPSILON = 1e-9
+
+
+class AllocationResult(NamedTuple):
+    amounts: np.ndarray
+    fill_rates: np.ndarray  # amount / demand, 0 where there is no demand
+    allocated: float
+    unallocated: float
+
+
+def capped_split(size: float, demands: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """``min(demands, level * weights)`` summing to ``size``, or every demand if less.
+
+    Accounts with no weight get nothing.
+    """
+    demands = np.asarray(demands, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    amounts = np.zeros_like(demands)
+    active = np.flatnonzero((weights > 0) & (demands > 0))
+    demand, weight = demands[active], weights[active]
+    if demand.sum() <= size:
+        amounts[active] = demand
+        return amounts
+
+    # The level at which each account is filled, in the order they fill up
+    fills = demand / weight
+    order = np.argsort(fills, kind="stable")
+    sorted_demand, sorted_weight = demand[order], weight[order]
+    # Total handed out once the level reaches each account's fill level
+    filled_before = np.concatenate(([0.0], np.cumsum(sorted_demand)[:-1]))
+    weight_after = sorted_weight[::-1].cumsum()[::-1]
+    totals = filled_before + fills[order] * weight_after
+    # The first account that does not fill sets the level
+    first_open = int(np.searchsorted(totals, size, side="left"))
+    level = (size - filled_before[first_open]) / weight_after[first_open]
+    amounts[active] = np.minimum(demand, level * weight)
+    return amounts
+
+
+def priority_split(size: float, demands: np.ndarray, priorities: np.ndarray) -> np.ndarray:
+    """Fill priority levels in ascending order, pro rata within a level."""
+    demands = np.asarray(demands, dtype=np.float64)
+    levels, codes = np.unique(priorities, return_inverse=True)
+    level_demand = np.bincount(codes, weights=demands, minlength=len(levels))
+    # What is left of the circle when each level's turn comes
+    left = np.maximum(size - np.concatenate(([0.0], np.cumsum(level_demand)[:-1])), 0.0)
+    rates = np.divide(
+        np.minimum(left, level_demand),
+        level_demand,
+        out=np.zeros_like(level_demand),
+        where=level_demand > 0,
+    )
+    return demands * rates[codes]
+
+
+def round_to_lots(
+    amounts: np.ndarray, demands: np.ndarray, lot: float, ranks: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Round ``amounts`` down to whole lots and hand the freed lots back.
+
+    Freed lots go one per account, largest remainder first, then by ``ranks``
+    (lower first), then in input order. Accounts that were rounded down
+    exactly, or that a lot would push past their demand, get none.
+    """
+    lots = np.floor(amounts / lot + _EPSILON)
+    freed = int(np.floor((amounts.sum() - lots.sum() * lot) / lot + _EPSILON))
+    if freed > 0:
+        remainders = amounts - lots * lot
+        # Only accounts that lost part of a share, and never past a demand
+        eligible = (remainders > _EPSILON * lot) & ((lots + 1) * lot <= demands + _EPSILON)
+        ranks = np.zeros(len(amounts)) if ranks is None else ranks
+        order = np.lexsort((np.arange(len(amounts)), ranks, -remainders))
+        winners = order[eligible[order]][:freed]
+        lots[winners] += 1
+    return lots * lot
+
+
+def allocate(
+    method: str,
+    size: float,
+    demands: Sequence[float],
+    lot: Optional[float] = None,
+    weights: Optional[Sequence[float]] = None,
+    priorities: Optional[Sequence[int]] = None,
+) -> AllocationResult:
+    """Split a circle of ``size`` across ``demands`` with one of :data:`METHODS`.
+
+    ``weights`` are the per-account weights for ``Custom`` and the tier weights
+    for ``Tiered``; ``priorities`` order the levels for ``Priority``. ``lot``
+    rounds every amount to whole lots.
+    """
+    demand_array = np.asarray(demands, dtype=np.float64)
+    ranks: Optional[np.ndarray] = None
+    if method == "Pro Rata":
+        amounts = capped_split(size, demand_array, demand_array)
+    elif method == "Equal":
+        amounts = capped_split(size, demand_array, np.ones_like(demand_array))
+    elif method == "Tiered":
+        tier_weights = np.asarray(weights, dtype=np.float64)
+        amounts = capped_split(size, demand_array, demand_array * tier_weights)
+    elif method == "Custom":
+        amounts = capped_split(size, demand_array, np.asarray(weights, dtype=np.float64))
+    elif method == "Priority":
+        ranks = np.asarray(priorities)
+        amounts = priority_split(size, demand_array, ranks)
+    else:
+        raise ValueError(f"Unknown allocation method: {method}")
+    if lot:
+        amounts = round_to_lots(amounts, demand_array, lot, ranks)
+    rates = np.divide(
+        amounts, demand_array, out=np.zeros_like(demand_array), where=demand_array > 0
+    )
+    allocated = float(amounts.sum())
+    return AllocationResult(amounts, rates, allocated, max(size - allocated, 0.0))
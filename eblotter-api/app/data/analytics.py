@@ -0,0 +1,128 @@
+"""
+Vectorized group-by kernels behind the analytics endpoints.
+
+A collection is turned into three NumPy arrays (a group code per record,
+the measure and an optional weight, with NaN for missing values) and every
+group is totalled at once with ``bincount``. Columnar collections hand over
+their packed columns directly; row collections are read field by field.
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.data.columnar import (
+    PACKED,
+    CategoryColumn,
+    ColumnarTable,
+    FloatColumn,
+    IntColumn,
+    PackedColumn,
+)
+from app.data.repository import Record, group_total, ranked_groups
+
+
+def group_by(
+    codes: np.ndarray,
+    labels: List[Any],
+    values: np.ndarray,
+    weights: Optional[np.ndarray] = None,
+) -> List[Record]:
+    """Count, total and (weighted) mean of ``values`` per group code.
+
+    ``codes`` index into ``labels``; NaN values or weights are left out of
+    the total and mean but still counted.
+    """
+    size = len(labels)
+    weighted = weights is not None
+    counts = np.bincount(codes, minlength=size)
+    present = ~np.isnan(values)
+    values = np.where(present, values, 0.0)
+    totals = np.bincount(codes, weights=values, minlength=size)
+    if weights is None:
+        weights = present.astype(np.float64)
+    else:
+        weights = np.where(present & ~np.isnan(weights), weights, 0.0)
+    weight_totals = np.bincount(codes, weights=weights, minlength=size)
+    weighted_totals = np.bincount(codes, weights=values * weights, minlength=size)
+    return ranked_groups(
+        [
+            group_total(
+                labels[code],
+                int(counts[code]),
+                float(totals[code]),
+                float(weight_totals[code]),
+                float(weighted_totals[code]),
+                weighted,
+            )
+            for code in np.flatnonzero(counts)
+        ]
+    )
+
+
+def aggregate_records(
+    records: Iterable[Mapping[str, Any]], by: str, value: str, weight: Optional[str] = None
+) -> List[Record]:
+    """:func:`group_by` over dict-like records."""
+    records = list(records)
+    codes, labels = factorize(record.get(by) for record in records)
+    values = _floats(record.get(value) for record in records)
+    weights = _floats(record.get(weight) for record in records) if weight else None
+    return group_by(codes, labels, values, weights)
+
+
+def aggregate_table(
+    table: ColumnarTable, by: str, value: str, weight: Optional[str] = None
+) -> List[Record]:
+    """:func:`group_by` straight over a columnar table's packed columns.
+
+    Falls back to :func:`aggregate_records` when a field is not packed or a
+    group column holds values other than strings.
+    """
+    segment = table.segment
+    numeric = (FloatColumn, IntColumn)
+    group_column = segment.columns.get(by)
+    value_column = segment.columns.get(value)
+    weight_column = segment.columns.get(weight) if weight else None
+    if (
+        not isinstance(group_column, CategoryColumn)
+        or group_column.overflow
+        or not isinstance(value_column, numeric)
+        or (weight and not isinstance(weight_column, numeric))
+    ):
+        return aggregate_records(table.values(), by, value, weight)
+
+    live = np.frombuffer(bytes(segment.live), dtype=np.uint8).astype(bool)
+    # Rows without a category share one extra code for the missing group
+    labels = [*group_column.categories, None]
+    tags = np.frombuffer(bytes(group_column.tags), dtype=np.uint8)
+    data = np.array(group_column.data, dtype=np.intp)
+    codes = np.where(tags == PACKED, data, len(labels) - 1)
+    values = _packed_floats(value_column)
+    weights = _packed_floats(weight_column) if isinstance(weight_column, numeric) else None
+    return group_by(codes[live], labels, values[live], None if weights is None else weights[live])
+
+
+def factorize(labels: Iterable[Any]) -> Tuple[np.ndarray, List[Any]]:
+    """Group codes for ``labels`` and the distinct labels in first-seen order."""
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(label, len(index)) for label in labels), dtype=np.intp)
+    return codes, list(index)
+
+
+def _floats(values: Iterable[Any]) -> np.ndarray:
+    return np.fromiter(
+        (v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in values),
+        dtype=np.float64,
+    )
+
+
+def _packed_floats(column: PackedColumn) -> np.ndarray:
+    """A packed numeric column as floats, NaN where the value is missing."""
+    tags = np.frombuffer(bytes(column.tags), dtype=np.uint8)
+    data = np.array(column.data, dtype=np.float64)
+    values = np.where(tags == PACKED, data, np.nan)
+    for row, value in column.overflow.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[row] = value
+    return values
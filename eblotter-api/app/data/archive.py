@@ -0,0 +1,213 @@
+"""
+Read-only archive tier for records that are rarely read and never changed.
+
+Archived records are appended to an NDJSON file that is memory-mapped for
+reading. Only an index of each key's byte offset stays in memory, and a
+lookup decodes just the one line it needs, so resident memory follows the
+records actually read rather than the size of the history. The index is
+cached in a sidecar file stamped with the archive's size and mtime, and
+rebuilt by one scan when the stamp no longer matches.
+
+Run ``python -m app.data.archive --before 2024-01-01`` to move deals that
+ended before that date out of ``deals.json``. Without ``STORE_SHARED`` the API
+must not be serving the same data directory at the time.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import pickle
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None  # type: ignore[assignment]
+
+
+def _loads(line: bytes) -> Dict[str, Any]:
+    record: Dict[str, Any] = orjson.loads(line) if orjson is not None else json.loads(line)
+    return record
+
+
+class Archive:
+    """Append-only NDJSON file of records, looked up by ``key_field``.
+
+    The owning collection's lock guards it. :meth:`refresh` and
+    :meth:`append` map the file and read or write the index, so they run
+    under the write lock. Lookups only decode from the open map under the
+    read lock, so they never block on the index or race to rebuild it.
+    """
+
+    def __init__(self, path: Path, key_field: str):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.key_field = key_field
+        self._max_id = 0
+        self._offsets: Optional[Dict[Any, int]] = None
+        self._map: Optional[mmap.mmap] = None
+        self._stamp: Optional[Tuple[int, int, int]] = None
+
+    def _current_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def refresh(self):
+        """Open the file, or reopen it if another process appended since.
+
+        Call it under the owning collection's write lock, when the
+        collection loads or reloads.
+        """
+        if self._offsets is None or self._current_stamp() != self._stamp:
+            self._offsets = None
+            self._open()
+
+    def _open(self) -> Dict[Any, int]:
+        """The key offsets, opening the file on first use (write lock only)."""
+        if self._offsets is not None:
+            return self._offsets
+        self._stamp = self._current_stamp()
+        self._map = None
+        if self._stamp is None or self._stamp[1] == 0:
+            self._offsets, self._max_id = {}, 0
+            return self._offsets
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        cached = self._read_index()
+        if cached is None:
+            cached = self._scan()
+            self._write_index(cached)
+        self._offsets, self._max_id = cached
+        return self._offsets
+
+    def _read_index(self) -> Optional[Tuple[Dict[Any, int], int]]:
+        try:
+            with open(self.index_path, "rb") as f:
+                stamp, offsets, max_id = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        return (offsets, max_id) if stamp == self._stamp else None
+
+    def _write_index(self, index: Tuple[Dict[Any, int], int]):
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump((self._stamp, *index), f, protocol=5)
+        os.replace(tmp_path, self.index_path)
+
+    def _scan(self) -> Tuple[Dict[Any, int], int]:
+        """Offset of every key's latest line, read straight from the map."""
+        offsets: Dict[Any, int] = {}
+        max_id = 0
+        for offset, record in self._lines(0):
+            offsets[record[self.key_field]] = offset
+            max_id = max(max_id, record.get("id") or 0)
+        return offsets, max_id
+
+    def _lines(self, start: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        mm = self._map
+        assert mm is not None
+        offset, size = start, len(mm)
+        while offset < size:
+            end = mm.find(b"\n", offset)
+            if end == -1:
+                # A torn final line from a crash mid-append is ignored
+                return
+            try:
+                yield offset, _loads(mm[offset:end])
+            except ValueError:
+                pass
+            offset = end + 1
+
+    def _opened(self) -> Dict[Any, int]:
+        """The key offsets of an archive already opened by :meth:`refresh`."""
+        if self._offsets is None:
+            raise RuntimeError(f"{self.path.name} is read before refresh() opened it")
+        return self._offsets
+
+    @property
+    def max_id(self) -> int:
+        """Highest record id in the archive, so ids are never handed out twice."""
+        self._opened()
+        return self._max_id
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._opened()
+
+    def __len__(self) -> int:
+        return len(self._opened())
+
+    def get(self, key: Any) -> Optional[Dict[str, Any]]:
+        """Decode the archived record stored under ``key``."""
+        offset = self._opened().get(key)
+        return None if offset is None else self._decode(offset)
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        """Decode every archived record, in the order they were archived."""
+        for offset in sorted(self._opened().values()):
+            yield self._decode(offset)
+
+    def _decode(self, offset: int) -> Dict[str, Any]:
+        mm = self._map
+        assert mm is not None
+        return _loads(mm[offset : mm.find(b"\n", offset)])
+
+    def append(self, records: Iterable[Dict[str, Any]]):
+        """Durably add ``records``; a key archived twice resolves to the newer line."""
+        lines = [
+            json.dumps(dict(record), separators=(",", ":"), default=str).encode() + b"\n"
+            for record in records
+        ]
+        if not lines:
+            return
+        offsets = self._open()
+        start = self._stamp[1] if self._stamp is not None else 0
+        mm = self._map
+        if start and mm is not None and mm[start - 1 : start] != b"\n":
+            # Close off a torn line so it cannot swallow the first new one
+            lines.insert(0, b"\n")
+        with open(self.path, "ab") as f:
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._stamp = self._current_stamp()
+        # Index only the new lines
+        for offset, record in self._lines(start):
+            offsets[record[self.key_field]] = offset
+            self._max_id = max(self._max_id, record.get("id") or 0)
+        self._write_index((offsets, self._max_id))
+
+
+def main(argv: Optional[List[str]] = None):
+    from app.core.config import settings
+    from app.data.json_store import JSONStore
+
+    parser = argparse.ArgumentParser(description="Move finished deals to the read-only archive.")
+    parser.add_argument(
+        "--before",
+        type=date.fromisoformat,
+        required=True,
+        help="archive deals whose end_date is earlier (YYYY-MM-DD)",
+    )
+    parser.add_argument("--data-dir", type=Path, default=settings.json_data_dir)
+    args = parser.parse_args(argv)
+
+    store = JSONStore(data_dir=args.data_dir)
+    archive = store.deals.archive
+    assert archive is not None
+    try:
+        count = store.archive_deals(args.before)
+    finally:
+        store.close()
+    print(f"Archived {count} deal(s) to {archive.path}")
+
+
+if __name__ == "__main__":
+    main()
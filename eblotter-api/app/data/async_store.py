@@ -0,0 +1,91 @@
+"""
+Awaitable access to the configured repository for async route handlers.
+
+Calls that only touch memory run directly on the event loop. Calls that may
+block on disk or the database run on a worker thread, so the loop keeps
+serving other requests while they wait. Every call is timed into
+``store_operation_duration_seconds``.
+"""
+
+import asyncio
+import functools
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.core import profiling
+from app.core.metrics import store_operation_duration
+from app.data.repository import READ_METHODS, WRITE_METHODS, Repository, get_repository
+
+
+def _kind(name: str) -> str:
+    if name in READ_METHODS:
+        return "lookup"
+    return "mutate" if name in WRITE_METHODS else "other"
+
+
+class AsyncRepository:
+    """Async facade exposing every :class:`Repository` method as a coroutine.
+
+    ``repository.inline_methods`` names the methods that never block and are
+    safe to call on the event loop; everything else goes to a worker thread.
+    ``repository.runs_inline`` can still send an inline method to a thread
+    for one call.
+    """
+
+    def __init__(self, repository: Repository):
+        self.repository = repository
+        self.feed = repository.feed
+        self._methods: Dict[str, Callable[..., Any]] = {}
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self.repository, name)
+        if not callable(method) or name.startswith("_"):
+            raise AttributeError(name)
+        wrapper = self._methods.get(name)
+        if wrapper is None:
+            wrapper = self._methods[name] = self._wrap(name, method)
+        return wrapper
+
+    def _wrap(self, name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        timings = store_operation_duration.labels(name, _kind(name))
+        clock = time.perf_counter
+
+        runs_inline = self.repository.runs_inline
+
+        @functools.wraps(method)
+        async def offloaded(*args, **kwargs):
+            start = clock()
+            try:
+                return await asyncio.to_thread(profiling.in_thread(method), *args, **kwargs)
+            finally:
+                timings.observe(clock() - start)
+
+        if name not in self.repository.inline_methods:
+            return offloaded
+
+        @functools.wraps(method)
+        async def inline(*args, **kwargs):
+            # e.g. a lazy collection's first read parses its file: not on the loop
+            if not runs_inline(name, *args):
+                return await offloaded(*args, **kwargs)
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                timings.observe(clock() - start)
+
+        return inline
+
+
+_async_store: Optional[AsyncRepository] = None
+
+
+async def get_async_store() -> AsyncRepository:
+    """Dependency to get the configured store for async routes.
+
+    Declared ``async`` so resolving it does not hop through the threadpool.
+    """
+    global _async_store
+    if _async_store is None:
+        _async_store = AsyncRepository(get_repository())
+    return _async_store
@@ -0,0 +1,328 @@
+"""
+Columnar record storage for large JSON store collections.
+
+A :class:`ColumnarTable` stands in for the ``{key: record}`` dict of a
+collection. Each declared field is kept in one column: numbers, booleans,
+dates and timestamps in typed ``array`` buffers, repetitive strings
+dictionary-encoded, and anything else in a plain list. Fields a table does
+not declare live in a small per-row overflow dict. Reads return
+:class:`Row` views that decode fields on access.
+
+Rows are appended, never rewritten: replacing a record appends a new row and
+retires the old one, so a :class:`Row` handed out earlier keeps showing the
+record as it was. Retired rows are dropped by rebuilding the columns once
+they outnumber the live ones. Values that a typed column cannot store
+exactly (an int in a float column, a date string that is not canonical
+ISO) go to the column's overflow and come back unchanged.
+"""
+
+from array import array
+from collections.abc import Mapping
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+# Per-row tags kept by typed columns
+ABSENT, NONE, PACKED, OVERFLOW = 0, 1, 2, 3
+
+# Marks a field the record does not have, as opposed to one set to None
+_MISSING = object()
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Retired rows tolerated before a rebuild is considered
+_MIN_REBUILD = 1024
+
+
+class Column:
+    """One field stored as a plain list; absent fields hold a sentinel."""
+
+    def __init__(self):
+        self.values: List[Any] = []
+
+    def append(self, value: Any):
+        self.values.append(value)
+
+    def get(self, row: int) -> Any:
+        """Value for ``row``; raises ``KeyError`` when the field is absent."""
+        value = self.values[row]
+        if value is _MISSING:
+            raise KeyError(row)
+        return value
+
+    def has(self, row: int) -> bool:
+        return self.values[row] is not _MISSING
+
+
+class PackedColumn(Column):
+    """Field packed into a typed array, with per-row tags for gaps."""
+
+    typecode = "q"
+
+    def __init__(self) -> None:
+        self.data = array(self.typecode)
+        self.tags = bytearray()
+        self.overflow: Dict[int, Any] = {}
+
+    def encode(self, value: Any) -> Any:
+        """Packed form of ``value``, or ``None`` if it must go to the overflow."""
+        raise NotImplementedError
+
+    def decode(self, packed: Any) -> Any:
+        raise NotImplementedError
+
+    def append(self, value: Any):
+        if value is _MISSING:
+            tag = ABSENT
+        elif value is None:
+            tag = NONE
+        else:
+            packed = self.encode(value)
+            tag = PACKED if packed is not None else OVERFLOW
+        if tag == OVERFLOW:
+            self.overflow[len(self.tags)] = value
+        self.data.append(packed if tag == PACKED else 0)
+        self.tags.append(tag)
+
+    def get(self, row: int) -> Any:
+        tag = self.tags[row]
+        if tag == PACKED:
+            return self.decode(self.data[row])
+        if tag == NONE:
+            return None
+        if tag == OVERFLOW:
+            return self.overflow[row]
+        raise KeyError(row)
+
+    def has(self, row: int) -> bool:
+        return self.tags[row] != ABSENT
+
+
+class FloatColumn(PackedColumn):
+    typecode = "d"
+
+    def encode(self, value):
+        return value if type(value) is float else None
+
+    def decode(self, packed):
+        return packed
+
+
+class IntColumn(PackedColumn):
+    typecode = "q"
+
+    def encode(self, value):
+        if type(value) is int and -(2**63) <= value < 2**63:
+            return value
+        return None
+
+    def decode(self, packed):
+        return packed
+
+
+class BoolColumn(PackedColumn):
+    typecode = "b"
+
+    def encode(self, value):
+        return int(value) if type(value) is bool else None
+
+    def decode(self, packed):
+        return bool(packed)
+
+
+class DateColumn(PackedColumn):
+    """ISO dates as proleptic ordinals."""
+
+    typecode = "i"
+
+    def encode(self, value):
+        if type(value) is not str or len(value) != 10:
+            return None
+        try:
+            day = date.fromisoformat(value)
+        except ValueError:
+            return None
+        return day.toordinal() if day.isoformat() == value else None
+
+    def decode(self, packed):
+        return date.fromordinal(packed).isoformat()
+
+
+class DateTimeColumn(PackedColumn):
+    """Naive ISO timestamps as microseconds since the epoch."""
+
+    typecode = "q"
+
+    def encode(self, value):
+        if type(value) is not str:
+            return None
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        if moment.tzinfo is not None or moment.isoformat() != value:
+            return None
+        return (moment - _EPOCH) // _MICROSECOND
+
+    def decode(self, packed):
+        return (_EPOCH + packed * _MICROSECOND).isoformat()
+
+
+class CategoryColumn(PackedColumn):
+    """Strings replaced by codes into a shared dictionary of distinct values."""
+
+    typecode = "i"
+
+    def __init__(self):
+        super().__init__()
+        self.categories: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, value):
+        if type(value) is not str:
+            return None
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.categories)
+            self.categories.append(value)
+        return code
+
+    def decode(self, packed):
+        return self.categories[packed]
+
+
+COLUMN_TYPES = {
+    "object": Column,
+    "float": FloatColumn,
+    "int": IntColumn,
+    "bool": BoolColumn,
+    "date": DateColumn,
+    "datetime": DateTimeColumn,
+    "category": CategoryColumn,
+}
+
+
+class Segment:
+    """Append-only set of columns; retired rows stay readable until rebuilt."""
+
+    def __init__(self, schema: Dict[str, str]):
+        self.columns: Dict[str, Column] = {
+            field: COLUMN_TYPES[kind]() for field, kind in schema.items()
+        }
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        self.live = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.live)
+
+    def append(self, record: Mapping[str, Any]) -> int:
+        row = len(self.live)
+        for field, column in self.columns.items():
+            column.append(record.get(field, _MISSING))
+        extra = {f: v for f, v in record.items() if f not in self.columns}
+        if extra:
+            self.extras[row] = extra
+        self.live.append(1)
+        return row
+
+
+class Row(Mapping):
+    """Read-only view of one stored record."""
+
+    __slots__ = ("_segment", "_row")
+
+    def __init__(self, segment: Segment, row: int):
+        self._segment = segment
+        self._row = row
+
+    def __getitem__(self, field: str) -> Any:
+        column = self._segment.columns.get(field)
+        if column is not None:
+            return column.get(self._row)
+        return self._segment.extras[self._row][field]
+
+    def get(self, field: str, default: Any = None) -> Any:
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def __iter__(self) -> Iterator[str]:
+        row = self._row
+        for field, column in self._segment.columns.items():
+            if column.has(row):
+                yield field
+        yield from self._segment.extras.get(row, ())
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"Row({dict(self)!r})"
+
+
+class ColumnarTable:
+    """Insertion-ordered ``{key: record}`` mapping stored column by column.
+
+    Supports the dict operations :class:`~app.data.json_store.Collection`
+    uses. Assigning a dict stores a copy of its values; reads return
+    :class:`Row` views.
+    """
+
+    def __init__(self, schema: Dict[str, str]):
+        self.schema = dict(schema)
+        self.segment = Segment(self.schema)
+        self._rows: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._rows
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._rows)
+
+    def __getitem__(self, key: Any) -> Row:
+        return Row(self.segment, self._rows[key])
+
+    def get(self, key: Any, default: Optional[Row] = None) -> Optional[Row]:
+        row = self._rows.get(key)
+        return default if row is None else Row(self.segment, row)
+
+    def keys(self):
+        return self._rows.keys()
+
+    def values(self) -> List[Row]:
+        segment = self.segment
+        return [Row(segment, row) for row in self._rows.values()]
+
+    def __setitem__(self, key: Any, record: Mapping[str, Any]):
+        old = self._rows.get(key)
+        if old is not None:
+            self.segment.live[old] = 0
+        self._rows[key] = self.segment.append(record)
+        self._maybe_rebuild()
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return default
+        self.segment.live[row] = 0
+        record = Row(self.segment, row)
+        self._maybe_rebuild()
+        return record
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Every record as a plain dict, in insertion order."""
+        return [dict(record) for record in self.values()]
+
+    def _maybe_rebuild(self):
+        """Drop retired rows once they outnumber the live ones."""
+        retired = len(self.segment) - len(self._rows)
+        if retired < _MIN_REBUILD or retired <= len(self._rows):
+            return
+        old = self.segment
+        self.segment = Segment(self.schema)
+        for key, row in self._rows.items():
+            self._rows[key] = self.segment.append(Row(old, row))
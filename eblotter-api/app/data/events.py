@@ -0,0 +1,162 @@
+"""
+In-process change feed fanned out to streaming subscribers.
+
+Stores publish one :class:`ChangeEvent` per created, updated or deleted
+record. Each event gets the next sequence number and is kept in a short
+backlog so reconnecting clients can resume. Every subscriber has its own
+bounded queue. When a slow subscriber's queue fills up it is told to
+resynchronise rather than making writers wait.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+
+class ChangeEvent:
+    """One mutation of one record. ``record`` is ``None`` for deletes."""
+
+    __slots__ = ("seq", "collection", "op", "key", "record", "frame")
+
+    def __init__(self, seq: int, collection: str, op: str, key: Any, record: Optional[dict]):
+        self.seq = seq
+        self.collection = collection
+        self.op = op
+        self.key = key
+        self.record = record
+        # Wire encoding, filled in once by the first stream that sends the event
+        self.frame: Optional[bytes] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        event = {"seq": self.seq, "collection": self.collection, "op": self.op, "key": self.key}
+        if self.record is not None:
+            event["record"] = self.record
+        return event
+
+
+class Subscription:
+    """A subscriber's bounded queue, drained from its event loop."""
+
+    def __init__(
+        self,
+        feed: "ChangeFeed",
+        loop: asyncio.AbstractEventLoop,
+        collections: Optional[Set[str]],
+        max_queue: int,
+    ):
+        self.feed = feed
+        self.collections = collections
+        self.max_queue = max_queue
+        self._loop = loop
+        self._events: Deque[ChangeEvent] = deque()
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+        self._overflowed = False
+
+    def wants(self, event: ChangeEvent) -> bool:
+        return self.collections is None or event.collection in self.collections
+
+    def offer(self, event: ChangeEvent):
+        """Queue ``event`` without blocking; called from writer threads."""
+        with self._lock:
+            if len(self._events) >= self.max_queue:
+                # Too far behind: drop the backlog and ask for a resync
+                self._events.clear()
+                self._overflowed = True
+            else:
+                self._events.append(event)
+        self._wake()
+
+    def mark_overflowed(self):
+        with self._lock:
+            self._overflowed = True
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # The subscriber's loop is gone; nobody will drain this queue
+            self.feed.unsubscribe(self)
+
+    async def next_batch(self, timeout: float) -> Tuple[List[ChangeEvent], bool]:
+        """Wait up to ``timeout`` seconds for events.
+
+        Returns the queued events and whether the subscriber missed events
+        and must reload state before applying them.
+        """
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return [], False
+        self._wakeup.clear()
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+            overflowed, self._overflowed = self._overflowed, False
+        return events, overflowed
+
+    def close(self):
+        self.feed.unsubscribe(self)
+
+
+class ChangeFeed:
+    """Sequences store mutations and fans them out to subscriptions."""
+
+    def __init__(self, backlog: Optional[int] = None, max_queue: Optional[int] = None):
+        self.max_queue = max_queue or settings.STREAM_QUEUE_SIZE
+        # Start from the clock so sequence numbers keep increasing across restarts
+        self._seq = time.time_ns() // 1000
+        self._backlog: Deque[ChangeEvent] = deque(maxlen=backlog or settings.STREAM_BACKLOG)
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the latest event."""
+        return self._seq
+
+    def publish(self, collection: str, op: str, key: Any, record: Optional[dict] = None):
+        """Record a mutation and hand it to every interested subscriber."""
+        with self._lock:
+            self._seq += 1
+            event = ChangeEvent(self._seq, collection, op, key, record)
+            self._backlog.append(event)
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.wants(event):
+                subscription.offer(event)
+
+    def subscribe(
+        self, after: Optional[int] = None, collections: Optional[Set[str]] = None
+    ) -> Subscription:
+        """Follow the feed from the running event loop.
+
+        With ``after`` the subscription first replays backlog events past that
+        sequence number; if they have already left the backlog it starts with
+        a resync instead.
+        """
+        subscription = Subscription(self, asyncio.get_running_loop(), collections, self.max_queue)
+        with self._lock:
+            if after is not None:
+                oldest = self._backlog[0].seq if self._backlog else self._seq + 1
+                if after < oldest - 1 or after > self._seq:
+                    subscription.mark_overflowed()
+                else:
+                    for event in self._backlog:
+                        if event.seq > after and subscription.wants(event):
+                            subscription.offer(event)
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+
+change_feed = ChangeFeed()
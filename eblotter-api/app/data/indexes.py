@@ -0,0 +1,233 @@
+"""
+Secondary indexes maintained by JSON store collections.
+"""
+
+import heapq
+import re
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Sorted index entries are (missing, value, id, key). Records without a value
+# sort after every present value so each index covers the whole collection.
+Entry = Tuple[bool, Any, int, Any]
+Position = Tuple[bool, Any, int]
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split ``text`` into lowercase alphanumeric words."""
+    return _TOKEN.findall(text.lower())
+
+
+def _normalize(value: Any) -> Any:
+    """Compare dates as ISO strings, the form they take in the JSON files."""
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class HashIndex:
+    """Maps each distinct value of ``field`` to the keys of matching records."""
+
+    def __init__(self, field: str):
+        self.field = field
+        self._keys: Dict[Any, Set[Any]] = {}
+
+    def clear(self):
+        self._keys = {}
+
+    def build(self, items: Iterable[Tuple[Any, Dict[str, Any]]]):
+        """Index ``(key, record)`` pairs from scratch."""
+        self.clear()
+        for key, record in items:
+            self.add(key, record)
+
+    def add(self, key: Any, record: Dict[str, Any]):
+        value = _normalize(record.get(self.field))
+        self._keys.setdefault(value, set()).add(key)
+
+    def remove(self, key: Any, record: Dict[str, Any]):
+        value = _normalize(record.get(self.field))
+        keys = self._keys.get(value)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys[value]
+
+    def lookup(self, value: Any) -> Set[Any]:
+        """Keys of records whose field equals ``value``."""
+        return self._keys.get(_normalize(value), set())
+
+
+class SortedIndex:
+    """Keeps record keys ordered by ``field`` (then id) for ranges and sorting."""
+
+    def __init__(self, field: str, default: Any):
+        self.field = field
+        self._default = default
+        self._entries: List[Entry] = []
+
+    def clear(self):
+        self._entries = []
+
+    def _entry(self, key: Any, record: Dict[str, Any]) -> Entry:
+        value = _normalize(record.get(self.field))
+        if value is None:
+            return (True, self._default, record["id"], key)
+        return (False, value, record["id"], key)
+
+    def build(self, items: Iterable[Tuple[Any, Dict[str, Any]]]):
+        """Index ``(key, record)`` pairs from scratch with one sort."""
+        self._entries = [self._entry(key, record) for key, record in items]
+        self._entries.sort()
+
+    def add(self, key: Any, record: Dict[str, Any]):
+        # O(n) per insert: fine for single writes, never for loading (see build)
+        insort(self._entries, self._entry(key, record))
+
+    def remove(self, key: Any, record: Dict[str, Any]):
+        entry = self._entry(key, record)
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    def _bounds(self, low: Any, high: Any) -> Tuple[int, int]:
+        """Slice of entries with a present value in ``[low, high]``."""
+        entries = self._entries
+        start = 0 if low is None else bisect_left(entries, (False, _normalize(low)))
+        stop = (
+            bisect_left(entries, (True,))
+            if high is None
+            else bisect_right(entries, (False, _normalize(high), float("inf")))
+        )
+        return start, max(start, stop)
+
+    def position(self, record: Dict[str, Any]) -> Position:
+        """Sort position of ``record``, used as a keyset pagination cursor."""
+        return self._entry(None, record)[:3]
+
+    def range(
+        self,
+        low: Any = None,
+        high: Any = None,
+        descending: bool = False,
+        after: Optional[Position] = None,
+    ) -> Iterator[Any]:
+        """Yield keys whose value lies in ``[low, high]`` in index order.
+
+        Without bounds every record is yielded, records missing the field
+        after all others; descending order is the exact reverse. ``after``
+        resumes strictly past a position returned by :meth:`position`.
+        """
+        entries = self._entries
+        if low is None and high is None:
+            start, stop = 0, len(entries)
+        else:
+            start, stop = self._bounds(low, high)
+        if after is not None:
+            missing, value, record_id = after
+            if descending:
+                stop = min(stop, bisect_left(entries, (missing, value, record_id)))
+            else:
+                start = max(start, bisect_left(entries, (missing, value, record_id + 1)))
+        indices = range(stop - 1, start - 1, -1) if descending else range(start, stop)
+        for i in indices:
+            yield entries[i][3]
+
+    def count(self, low: Any = None, high: Any = None) -> int:
+        """Number of records in ``[low, high]``; used to pick the cheapest index."""
+        start, stop = self._bounds(low, high)
+        return stop - start
+
+
+class TextIndex:
+    """Inverted index from the words of text fields to record keys.
+
+    ``weights`` maps each indexed field to the score a match in it is worth.
+    Words are also kept in a sorted list, so every word starting with a
+    prefix is one bisect away, which is what typeahead search needs.
+    """
+
+    def __init__(self, weights: Dict[str, float]):
+        self.weights = weights
+        self._postings: Dict[str, Dict[Any, float]] = {}
+        self._words: List[str] = []
+
+    def clear(self):
+        self._postings = {}
+        self._words = []
+
+    def _word_weights(self, record: Dict[str, Any]) -> Dict[str, float]:
+        """Each word of ``record`` with the weight of the best field containing it."""
+        words: Dict[str, float] = {}
+        for field, weight in self.weights.items():
+            value = record.get(field)
+            if isinstance(value, str):
+                for word in tokenize(value):
+                    if words.get(word, 0.0) < weight:
+                        words[word] = weight
+        return words
+
+    def build(self, items: Iterable[Tuple[Any, Dict[str, Any]]]):
+        """Index ``(key, record)`` pairs from scratch, sorting the words once."""
+        postings: Dict[str, Dict[Any, float]] = {}
+        for key, record in items:
+            for word, weight in self._word_weights(record).items():
+                postings.setdefault(word, {})[key] = weight
+        self._postings = postings
+        self._words = sorted(postings)
+
+    def add(self, key: Any, record: Dict[str, Any]):
+        for word, weight in self._word_weights(record).items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+                # O(n) per new word: fine for single writes, never for loading (see build)
+                insort(self._words, word)
+            postings[key] = weight
+
+    def remove(self, key: Any, record: Dict[str, Any]):
+        for word in self._word_weights(record):
+            postings = self._postings.get(word)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[word]
+                del self._words[bisect_left(self._words, word)]
+
+    def _prefix_scores(self, term: str) -> Dict[Any, float]:
+        """Best score per key over the words that start with ``term``."""
+        scores: Dict[Any, float] = {}
+        words = self._words
+        i = bisect_left(words, term)
+        while i < len(words) and words[i].startswith(term):
+            word = words[i]
+            # An exact word scores the full field weight, longer completions less
+            closeness = len(term) / len(word)
+            for key, weight in self._postings[word].items():
+                score = weight * closeness
+                if score > scores.get(key, 0.0):
+                    scores[key] = score
+            i += 1
+        return scores
+
+    def search(self, terms: List[str], limit: int) -> List[Tuple[float, Any]]:
+        """Top ``limit`` ``(score, key)`` pairs of records matching every term as a prefix."""
+        scores: Optional[Dict[Any, float]] = None
+        # Rarest-looking (longest) terms first keeps the running intersection small
+        for term in sorted(set(terms), key=len, reverse=True):
+            term_scores = self._prefix_scores(term)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {k: s + term_scores[k] for k, s in scores.items() if k in term_scores}
+            if not scores:
+                return []
+        if scores is None:
+            return []
+        return heapq.nlargest(limit, ((s, k) for k, s in scores.items()), key=itemgetter(0))
@@ -0,0 +1,72 @@
+"""
+Append-only write-ahead log used by the JSON store's journal persistence mode.
+Each line is one compact JSON entry describing a single mutation.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, IO
+
+
+class Journal:
+    """Per-collection log of ``put``/``delete`` entries."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.count = 0
+        self._file: Optional[IO[str]] = None
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Yield every complete entry in the log.
+
+        A torn final line left by a crash mid-append is cut off so later
+        appends start on a clean line.
+        """
+        self.count = 0
+        if not self.path.exists():
+            return
+        valid_bytes = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid_bytes += len(line)
+                self.count += 1
+                yield entry
+        if valid_bytes < self.path.stat().st_size:
+            os.truncate(self.path, valid_bytes)
+
+    def append(self, entry: Dict[str, Any]):
+        """Append one entry and make it durable."""
+        self.extend([entry])
+
+    def extend(self, entries: List[Dict[str, Any]]):
+        """Append a batch of entries with a single write and fsync."""
+        if not entries:
+            return
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write(
+            "".join(json.dumps(e, separators=(",", ":"), default=str) + "\n" for e in entries)
+        )
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.count += len(entries)
+
+    def truncate(self):
+        """Discard all entries once they are folded into a snapshot."""
+        self.close()
+        with open(self.path, "w"):
+            pass
+        self.count = 0
+
+    def close(self):
+        """Close the underlying file handle."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
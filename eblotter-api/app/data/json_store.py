@@ -2,53 +2,645 @@
 JSON-based data store for the eBlotter API.
 Provides an in-memory data store loaded from JSON files.
 """
+import itertools
 import json
 import os
-from typing import List, Dict, Any, Optional
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Set, Tuple, Union
 from pathlib import Path
-from datetime import datetime
-
-class JSONStore:
-    """Simple in-memory data store backed by JSON files."""
-
-    def __init__(self):
-        self.data_dir = Path(__file__).parent
-        self.deals: List[Dict[str, Any]] = []
-        self.brokers: List[Dict[str, Any]] = []
-        self.portfolios: List[Dict[str, Any]] = []
-        self.allocations: List[Dict[str, Any]] = []
-        self._next_ids = {
-            "deals": 1,
-            "brokers": 1,
-            "portfolios": 1,
-            "allocations": 1
+from datetime import date, datetime
+
+from app.core.config import settings
+from app.core.metrics import store_persist_duration
+from app.data.analytics import aggregate_records, aggregate_table
+from app.data.archive import Archive
+from app.data.columnar import ColumnarTable
+from app.data.events import ChangeFeed, change_feed
+from app.data.indexes import HashIndex, Position, SortedIndex, TextIndex, tokenize
+from app.data.journal import Journal
+from app.data.locks import RWLock
+from app.data.repository import (  # noqa: F401 - re-exported for the routers
+    READ_METHODS,
+    SEARCH_FIELDS,
+    WRITE_METHODS,
+    ArchivedError,
+    BulkError,
+    DuplicateKeyError,
+    Page,
+    Repository,
+    get_repository,
+    search_hit,
+    top_hits,
+)
+from app.data.shared import SharedState
+
+
+# Process-wide source of collection versions, so a version is never reused
+# by another collection or another store instance.
+_versions = itertools.count(1)
+
+# Bumped whenever the pickled layout of a collection changes, so snapshots
+# written by older code are ignored rather than misread
+SNAPSHOT_FORMAT = 1
+
+# Column layouts used by the columnar store; other fields go to per-row overflow
+DEAL_COLUMNS = {
+    "id": "int",
+    "deal_id": "object",
+    "deal_name": "object",
+    "client": "category",
+    "amount": "float",
+    "status": "category",
+    "start_date": "date",
+    "end_date": "date",
+    "owner": "category",
+    "created_at": "datetime",
+    "updated_at": "datetime",
+}
+ALLOCATION_COLUMNS = {
+    "id": "int",
+    "deal_circle": "category",
+    "desc_of_security": "category",
+    "allocation_type": "category",
+    "circle_date": "date",
+    "is_add_on": "bool",
+    "circle_notes": "object",
+    "deal_allocation": "float",
+    "allocation_date": "date",
+    "allocation_rounding": "float",
+    "cusip": "category",
+    "trader": "category",
+    "broker": "category",
+    "execution_date": "date",
+    "execution_reason": "category",
+    "execution_notes": "object",
+    "portfolio_id": "category",
+    "created_at": "datetime",
+    "updated_at": "datetime",
+}
+
+
+class Collection:
+    """In-memory table of records indexed by their natural key.
+
+    Records live in an insertion-ordered dict keyed by ``key_field`` so point
+    lookups, updates and deletes are O(1) while listing keeps file order.
+    Secondary indexes over other fields, plus an id index used for paging,
+    are kept in step with every change, as is the optional full-text index
+    over ``text_fields``, and ``version`` moves on each time. Callers hold
+    ``lock`` in read mode to look records up and in write mode to change
+    them; stored records are replaced, never mutated in place.
+
+    Given a ``columns`` layout the records are kept in a
+    :class:`~app.data.columnar.ColumnarTable` and read back as row views.
+    Records moved to the read-only ``archive`` keep their keys and ids
+    reserved but are left out of listings and queries.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        key_field: str,
+        hash_fields: Sequence[str] = (),
+        sorted_fields: Optional[Dict[str, Any]] = None,
+        text_fields: Optional[Dict[str, float]] = None,
+        columns: Optional[Dict[str, str]] = None,
+        archive: Optional[Archive] = None,
+    ):
+        self.name = name
+        self.filename = f"{name}.json"
+        self.key_field = key_field
+        self.columns = columns
+        self.archive = archive
+        self.records = self._empty()
+        self.loaded = False
+        self.next_id = 1
+        self.version = next(_versions)
+        self.lock = RWLock()
+        self.hash_indexes = {field: HashIndex(field) for field in hash_fields}
+        # Every collection keeps an id index to order pages and resume cursors
+        sorted_fields = {"id": 0, **(sorted_fields or {})}
+        self.sorted_indexes = {
+            field: SortedIndex(field, default) for field, default in sorted_fields.items()
+        }
+        self.text_index = TextIndex(text_fields) if text_fields else None
+
+    @property
+    def _indexes(self) -> List[Any]:
+        indexes = [*self.hash_indexes.values(), *self.sorted_indexes.values()]
+        if self.text_index is not None:
+            indexes.append(self.text_index)
+        return indexes
+
+    def _empty(self):
+        return ColumnarTable(self.columns) if self.columns else {}
+
+    def load(self, records: List[Dict[str, Any]]):
+        """Replace the contents of the collection and rebuild the indexes.
+
+        Each index is built in one pass over the records rather than record
+        by record, so loading stays O(n log n).
+        """
+        # A repeated key keeps its first position and its last record, as put() would
+        latest = {record[self.key_field]: record for record in records}
+        self.records = self._empty()
+        for key, record in latest.items():
+            self.records[key] = record
+        for index in self._indexes:
+            index.build(latest.items())
+        self.next_id = max((r["id"] for r in records), default=0) + 1
+        self._reserve_archived_ids()
+        self.version = next(_versions)
+        self.loaded = True
+
+    def _reserve_archived_ids(self):
+        if self.archive is not None:
+            self.archive.refresh()
+            self.next_id = max(self.next_id, self.archive.max_id + 1)
+
+    @property
+    def signature(self) -> Tuple[Any, ...]:
+        """Layout of the collection's state; snapshots only restore into a match."""
+        return (
+            SNAPSHOT_FORMAT,
+            self.key_field,
+            tuple(self.hash_indexes),
+            tuple(self.sorted_indexes),
+            tuple(self.text_index.weights.items()) if self.text_index else None,
+            tuple(self.columns.items()) if self.columns else None,
+        )
+
+    def dump_state(self) -> bytes:
+        """Pickle the records and indexes so :meth:`restore_state` skips re-indexing."""
+        state = (
+            self.records,
+            self.next_id,
+            self.hash_indexes,
+            self.sorted_indexes,
+            self.text_index,
+        )
+        return pickle.dumps(state, protocol=5)
+
+    def restore_state(self, payload: bytes):
+        """Replace the contents of the collection with a :meth:`dump_state` pickle."""
+        (
+            self.records,
+            self.next_id,
+            self.hash_indexes,
+            self.sorted_indexes,
+            self.text_index,
+        ) = pickle.loads(payload)
+        self._reserve_archived_ids()
+        self.version = next(_versions)
+        self.loaded = True
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return all records in insertion order."""
+        return list(self.records.values())
+
+    def to_dicts(self, records: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Return all records (or ``records`` from :meth:`all`) as plain dicts.
+
+        The output of :meth:`all` stays valid once the lock is released,
+        since records are replaced rather than changed and columnar rows are
+        append-only. So callers can take it under the lock and convert it
+        outside.
+        """
+        records = self.all() if records is None else records
+        if self.columns:
+            return [dict(record) for record in records]
+        return records
+
+    def get(self, key: Any) -> Optional[Dict[str, Any]]:
+        """Return the record stored under ``key``."""
+        record: Optional[Dict[str, Any]] = self.records.get(key)
+        return record
+
+    def exists(self, key: Any) -> bool:
+        """Whether ``key`` is taken, by a live or an archived record."""
+        return key in self.records or self.archived(key)
+
+    def archived(self, key: Any) -> bool:
+        """Whether ``key`` belongs to a record moved to the archive."""
+        return key not in self.records and self.archive is not None and key in self.archive
+
+    def add(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Assign the next id to ``record`` and index it."""
+        if self.key_field != "id" and self.exists(record[self.key_field]):
+            raise DuplicateKeyError(record[self.key_field])
+        record["id"] = self.next_id
+        self.next_id += 1
+        self.put(record)
+        return record
+
+    def put(self, record: Dict[str, Any]):
+        """Insert ``record`` or replace the one stored under the same key."""
+        key = record[self.key_field]
+        old = self.records.get(key)
+        for index in self._indexes:
+            if old is not None:
+                index.remove(key, old)
+            index.add(key, record)
+        self.records[key] = record
+        self.next_id = max(self.next_id, record["id"] + 1)
+        self.version = next(_versions)
+
+    def replace(self, key: Any, record: Dict[str, Any]):
+        """Swap the record stored under ``key``, keeping its position."""
+        self.put(record)
+
+    def remove(self, key: Any) -> Optional[Dict[str, Any]]:
+        """Drop the record stored under ``key``."""
+        record: Optional[Dict[str, Any]] = self.records.pop(key, None)
+        if record is not None:
+            for index in self._indexes:
+                index.remove(key, record)
+            self.version = next(_versions)
+        return record
+
+    def query(
+        self,
+        equals: Optional[Dict[str, Any]] = None,
+        ranges: Optional[Dict[str, Tuple[Any, Any]]] = None,
+        sort: Optional[str] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Position] = None,
+    ) -> Page:
+        """Return one page of records matching every filter.
+
+        ``equals`` filters go through hash indexes and ``ranges`` through
+        sorted indexes (bounds are inclusive, ``None`` is open). ``sort`` names
+        a sorted field, prefixed with ``-`` for descending order; records are
+        otherwise ordered by id. ``after`` is the ``next_position`` of the
+        previous page and resumes just past it.
+        """
+        equals = {f: v for f, v in (equals or {}).items() if v is not None}
+        ranges = {f: b for f, b in (ranges or {}).items() if b != (None, None)}
+        descending = sort is not None and sort.startswith("-")
+        sort_field = sort.lstrip("-") if sort else "id"
+        order = self.sorted_indexes[sort_field]
+
+        candidates: Optional[Set[Any]] = None
+        matches_by_field = [self.hash_indexes[f].lookup(v) for f, v in equals.items()]
+        for keys in sorted(matches_by_field, key=len):
+            candidates = set(keys) if candidates is None else candidates & keys
+            if not candidates:
+                return Page([], None)
+
+        # Drive the scan from the sort index unless, when ordering by id, the
+        # hash candidates or the narrowest range are smaller; remaining
+        # filters are checked per record.
+        driver_field: Optional[str] = sort_field
+        if sort is None and ranges:
+            sizes = {f: self.sorted_indexes[f].count(*bounds) for f, bounds in ranges.items()}
+            driver_field = min(sizes, key=sizes.__getitem__)
+            if candidates is not None and len(candidates) <= sizes[driver_field]:
+                driver_field = None
+        elif sort is None and candidates is not None:
+            driver_field = None
+
+        if driver_field == sort_field:
+            low, high = ranges.pop(sort_field, (None, None))
+            matches = self._matching(order.range(low, high, descending, after), candidates, ranges)
+        else:
+            scan: Iterable[Any]
+            if driver_field is None:
+                # Only chosen when there are hash candidates
+                assert candidates is not None
+                scan = candidates
+            else:
+                scan = self.sorted_indexes[driver_field].range(*ranges[driver_field])
+            last_id = after[2] if after is not None else 0
+            matches = iter(sorted(
+                (r for r in self._matching(scan, candidates, ranges) if r["id"] > last_id),
+                key=lambda r: r["id"],
+            ))
+
+        page = list(islice(matches, skip, None if limit is None else skip + limit + 1))
+        if limit is None or len(page) <= limit:
+            return Page(page, None)
+        page = page[:limit]
+        if not page:
+            return Page([], None)
+        return Page(page, order.position(page[-1]))
+
+    def _matching(
+        self,
+        keys: Iterable[Any],
+        candidates: Optional[Set[Any]],
+        ranges: Dict[str, Tuple[Any, Any]],
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield records for ``keys`` that pass the candidate and range filters."""
+        for key in keys:
+            if candidates is not None and key not in candidates:
+                continue
+            record = self.records[key]
+            if all(_in_range(record.get(f), low, high) for f, (low, high) in ranges.items()):
+                yield record
+
+
+def _in_range(value: Any, low: Any, high: Any) -> bool:
+    """Inclusive range check where ``None`` bounds are open."""
+    if value is None:
+        return False
+    if isinstance(value, date):
+        value = value.isoformat()
+    if low is not None and value < (low.isoformat() if isinstance(low, date) else low):
+        return False
+    if high is not None and value > (high.isoformat() if isinstance(high, date) else high):
+        return False
+    return True
+
+
+class JSONStore(Repository):
+    """Simple in-memory data store backed by JSON files.
+
+    In ``snapshot`` persistence mode every mutation rewrites the collection's
+    JSON file. In ``journal`` mode mutations are appended to a per-collection
+    ``.log`` file that is replayed on load and folded into the JSON snapshot
+    every ``compact_every`` entries.
+
+    The flush policy decides when pending mutations reach disk: ``immediate``
+    writes inside the mutating call, ``interval`` lets a background thread
+    write every ``flush_interval_ms`` and ``count`` wakes it once
+    ``flush_every`` mutations are pending. Each flush writes every dirty
+    collection once, so bursts of mutations share a single write and fsync.
+
+    With ``shared`` several processes (uvicorn workers) can serve the same
+    data directory. Writers take a cross-process file lock, catch up on
+    other workers' writes and persist before releasing it. Readers reload a
+    collection once another worker has changed it, and a background thread
+    polls for such changes every ``shared_poll_ms`` so the change feed hears
+    about them even while this worker is idle. Shared mode needs the
+    ``immediate`` flush policy so nothing is left pending outside the lock.
+    """
+
+    def __init__(
+        self,
+        data_dir: Union[str, Path, None] = None,
+        persistence: Optional[str] = None,
+        compact_every: Optional[int] = None,
+        flush_policy: Optional[str] = None,
+        flush_interval_ms: Optional[int] = None,
+        flush_every: Optional[int] = None,
+        feed: Optional[ChangeFeed] = None,
+        shared: Optional[bool] = None,
+        shared_poll_ms: Optional[int] = None,
+        layout: Optional[str] = None,
+        snapshots: Optional[bool] = None,
+        lazy: Optional[bool] = None,
+    ):
+        self.data_dir = Path(data_dir) if data_dir else Path(__file__).parent
+        self.persistence = persistence or settings.STORE_PERSISTENCE
+        if self.persistence not in ("snapshot", "journal"):
+            raise ValueError(f"Unknown persistence mode: {self.persistence}")
+        self.compact_every = compact_every or settings.STORE_COMPACT_EVERY
+        self.flush_policy = flush_policy or settings.STORE_FLUSH_POLICY
+        if self.flush_policy not in ("immediate", "interval", "count"):
+            raise ValueError(f"Unknown flush policy: {self.flush_policy}")
+        self.flush_interval_ms = flush_interval_ms or settings.STORE_FLUSH_INTERVAL_MS
+        self.flush_every = flush_every or settings.STORE_FLUSH_EVERY
+        shared = settings.STORE_SHARED if shared is None else shared
+        if shared and self.flush_policy != "immediate":
+            raise ValueError("Shared stores need the immediate flush policy")
+        self.snapshots = settings.STORE_SNAPSHOTS if snapshots is None else snapshots
+        self.lazy = settings.STORE_LAZY_LOAD if lazy is None else lazy
+        if shared and self.lazy:
+            raise ValueError("Shared stores load every collection together")
+        self._shared = SharedState(self.data_dir) if shared else None
+        self._generations: Dict[str, int] = {}
+        self.shared_poll_ms = (
+            settings.STORE_SHARED_POLL_MS if shared_poll_ms is None else shared_poll_ms
+        )
+        self._watcher: Optional[threading.Thread] = None
+        self._watcher_stop = threading.Event()
+        self.layout = layout or settings.STORE_LAYOUT
+        if self.layout not in ("rows", "columnar"):
+            raise ValueError(f"Unknown layout: {self.layout}")
+        columnar = self.layout == "columnar"
+        self.feed = feed or change_feed
+        # Reads only touch memory; so do writes once a background flusher owns the disk,
+        # unless it pickles snapshots, which holds the collection lock for the whole dump.
+        # Shared stores may lock files and reload on any call, so nothing runs inline.
+        if self._shared is not None:
+            self.inline_methods = frozenset()
+        elif self.flush_policy == "immediate" or self.snapshots:
+            self.inline_methods = READ_METHODS
+        else:
+            self.inline_methods = READ_METHODS | WRITE_METHODS
+        self.deals = Collection(
+            "deals",
+            "deal_id",
+            hash_fields=("status", "client", "owner"),
+            sorted_fields={"amount": 0.0, "start_date": "", "end_date": "", "deal_name": ""},
+            text_fields=SEARCH_FIELDS["deals"],
+            columns=DEAL_COLUMNS if columnar else None,
+            archive=Archive(self.data_dir / "deals.archive.ndjson", "deal_id"),
+        )
+        self.brokers = Collection("brokers", "broker_id", text_fields=SEARCH_FIELDS["brokers"])
+        self.portfolios = Collection(
+            "portfolios", "portfolio_id", text_fields=SEARCH_FIELDS["portfolios"]
+        )
+        self.allocations = Collection(
+            "allocations",
+            "id",
+            text_fields=SEARCH_FIELDS["allocations"],
+            columns=ALLOCATION_COLUMNS if columnar else None,
+        )
+        # Collection behind each single-collection read, e.g. get_deal -> deals
+        self._read_collections = {
+            name: c for c in self.collections for name in READ_METHODS
+            if name.endswith((f"_{c.name}", f"_{c.name[:-1]}"))
         }
-        self.load_data()
+        self._journals = {
+            c.name: Journal(self.data_dir / f"{c.name}.log") for c in self.collections
+        }
+        self._pending: Dict[str, List[Dict[str, Any]]] = {c.name: [] for c in self.collections}
+        self._pending_count = 0
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flush_wakeup = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._closing = False
+        self._load_lock = threading.Lock()
+
+    @property
+    def collections(self) -> List[Collection]:
+        """All collections managed by the store."""
+        return [self.deals, self.brokers, self.portfolios, self.allocations]
 
     def load_data(self):
-        """Load all data from JSON files."""
-        self.deals = self._load_json("deals.json")
-        self.brokers = self._load_json("brokers.json")
-        self.portfolios = self._load_json("portfolios.json")
-        self.allocations = self._load_json("allocations.json")
+        """Load every collection not loaded yet; lazy stores wait for first use.
 
-        # Add timestamps to items that don't have them
-        now = datetime.now().isoformat()
-        for item in self.brokers + self.portfolios + self.allocations:
-            if "created_at" not in item:
-                item["created_at"] = now
-            if "updated_at" not in item:
-                item["updated_at"] = now
-
-        # Update next IDs based on existing data
-        if self.deals:
-            self._next_ids["deals"] = max(d["id"] for d in self.deals) + 1
-        if self.brokers:
-            self._next_ids["brokers"] = max(b["id"] for b in self.brokers) + 1
-        if self.portfolios:
-            self._next_ids["portfolios"] = max(p["id"] for p in self.portfolios) + 1
-        if self.allocations:
-            self._next_ids["allocations"] = max(a["id"] for a in self.allocations) + 1
+        Collections also load on first use if this is never called, so a
+        store costs nothing until it serves a request.
+        """
+        if not self.lazy:
+            self._load(self.collections)
+
+    def runs_inline(self, name: str, *args: Any) -> bool:
+        """Reads run inline, except while a lazy collection they touch is not loaded yet."""
+        if name not in self.inline_methods:
+            return False
+        if not self.lazy:
+            return True
+        collection = self._read_collections.get(name)
+        if name == "version" and args:
+            collection = getattr(self, args[0])
+        if collection is not None:
+            return collection.loaded
+        return all(c.loaded for c in self.collections)
+
+    def _ensure_loaded(self, collection: Collection):
+        if not collection.loaded:
+            self._load([collection] if self.lazy else self.collections)
+
+    def _load(self, collections: List[Collection]):
+        with self._load_lock:
+            pending = [c for c in collections if not c.loaded]
+            if not pending:
+                return
+            with self._shared_files():
+                if self._shared is not None:
+                    self._generations = self._shared.read()
+                for collection in pending:
+                    self._load_collection(collection)
+        self._start_watcher()
+
+    def _load_collection(self, collection: Collection):
+        """Rebuild a collection, its indexes and next id from its files.
+
+        With snapshots enabled the state is restored from the collection's
+        pickle when it was written for the current JSON file, and the pickle
+        is rewritten after parsing the JSON otherwise.
+        """
+        stamp = self._file_stamp(collection)
+        payload = self._read_snapshot(collection, stamp) if self.snapshots else None
+        records = None
+        if payload is None:
+            records = self._load_json(collection.filename)
+
+            # Add timestamps to items that don't have them
+            if collection is not self.deals:
+                now = datetime.now().isoformat()
+                for item in records:
+                    if "created_at" not in item:
+                        item["created_at"] = now
+                    if "updated_at" not in item:
+                        item["updated_at"] = now
+
+        with collection.lock.write():
+            if records is None:
+                assert payload is not None
+                collection.restore_state(payload)
+            else:
+                collection.load(records)
+                if self.snapshots and stamp is not None:
+                    payload = collection.dump_state()
+            if self.persistence == "journal":
+                self._replay(collection)
+        if records is not None and payload is not None:
+            self._write_snapshot(collection, stamp, payload)
+
+    def _file_stamp(self, collection: Collection) -> Optional[Tuple[int, int, int]]:
+        """Identity of the collection's JSON file as it is now, if it exists."""
+        try:
+            st = os.stat(self.data_dir / collection.filename)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _snapshot_path(self, collection: Collection) -> Path:
+        return self.data_dir / f"{collection.name}.snapshot"
+
+    def _read_snapshot(self, collection: Collection, stamp: Any) -> Optional[bytes]:
+        """Pickled state saved for exactly this JSON file and layout, if any."""
+        if stamp is None:
+            return None
+        try:
+            with open(self._snapshot_path(collection), "rb") as f:
+                header = pickle.load(f)
+                if header != (collection.signature, stamp):
+                    return None
+                return f.read()
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_snapshot(self, collection: Collection, stamp: Any, payload: bytes):
+        """Save ``payload`` as the snapshot of the JSON file identified by ``stamp``."""
+        start = time.perf_counter()
+        path = self._snapshot_path(collection)
+        tmp_path = path.with_name(path.name + ".tmp")
+        # A cache of the JSON file: losing it only costs one slower load
+        with open(tmp_path, "wb") as f:
+            pickle.dump((collection.signature, stamp), f, protocol=5)
+            f.write(payload)
+        os.replace(tmp_path, path)
+        store_persist_duration.labels(collection.name, "snapshot").observe(
+            time.perf_counter() - start
+        )
+
+    @contextmanager
+    def _shared_files(self) -> Iterator[None]:
+        """Keep other workers from writing while the files are read."""
+        if self._shared is None:
+            yield
+            return
+        with self._shared.shared():
+            yield
+
+    def _sync(self):
+        """Reload collections another worker has changed since we last looked."""
+        if self._shared is None or not self._shared.changed():
+            return
+        with self._shared.shared():
+            generations = self._shared.read()
+            for collection in self.collections:
+                generation = generations.get(collection.name, 0)
+                if generation != self._generations.get(collection.name, 0):
+                    self._load_collection(collection)
+                    # Subscribers cannot tell what changed, so they reload too
+                    self.feed.publish(collection.name, "reload", None)
+            self._generations = generations
+
+    def _start_watcher(self):
+        """Start polling for other workers' writes, for shared stores."""
+        if self._shared is None or self.shared_poll_ms <= 0 or self._watcher is not None:
+            return
+        self._watcher_stop.clear()
+        self._watcher = threading.Thread(
+            target=self._run_watcher, name="json-store-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def _run_watcher(self):
+        """Catch up with other workers until the store is closed."""
+        interval = self.shared_poll_ms / 1000
+        while not self._watcher_stop.wait(interval):
+            self._sync()
+
+    @contextmanager
+    def _reading(self, collection: Collection) -> Iterator[None]:
+        """Hold a collection's read lock after catching up with other workers."""
+        self._ensure_loaded(collection)
+        self._sync()
+        with collection.lock.read():
+            yield
+
+    def _replay(self, collection: Collection):
+        """Apply journal entries written since the last snapshot."""
+        journal = self._journals[collection.name]
+        journal.close()
+        for entry in journal.replay():
+            if entry["op"] == "put":
+                collection.put(entry["record"])
+            elif entry["op"] == "delete":
+                collection.remove(entry["key"])
 
     def _load_json(self, filename: str) -> List[Dict[str, Any]]:
         """Load data from a JSON file."""
@@ -60,179 +652,561 @@ class JSONStore:
             return json.load(f)
 
     def _save_json(self, filename: str, data: List[Dict[str, Any]]):
-        """Save data to a JSON file."""
+        """Save data to a JSON file, replacing it atomically."""
         file_path = self.data_dir / filename
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        start = time.perf_counter()
+        text = json.dumps(data, indent=2, default=str)
+        encoded = time.perf_counter()
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+        store_persist_duration.labels(file_path.stem, "encode").observe(encoded - start)
+        store_persist_duration.labels(file_path.stem, "write").observe(
+            time.perf_counter() - encoded
+        )
+
+    def _save(self, collection: Collection):
+        """Persist a collection to its JSON file (and snapshot)."""
+        # Only the cheap copy happens under the lock; writers wait for it, not for encoding
+        with collection.lock.read():
+            records = collection.all()
+            payload = collection.dump_state() if self.snapshots else None
+        self._save_json(collection.filename, collection.to_dicts(records))
+        if payload is not None:
+            self._write_snapshot(collection, self._file_stamp(collection), payload)
+
+    @contextmanager
+    def _mutating(self, collection: Collection) -> Iterator[None]:
+        """Hold a collection's write lock, then flush once it is released.
+
+        Shared stores do all of it under the cross-process lock, starting
+        from the latest data and announcing the write to other workers.
+        """
+        self._ensure_loaded(collection)
+        if self._shared is None:
+            with collection.lock.write():
+                yield
+            self._schedule_flush()
+            return
+        with self._shared.exclusive():
+            self._sync()
+            with collection.lock.write():
+                yield
+            self._schedule_flush()
+            self._generations = self._shared.bump([collection.name])
+
+    def _persist_put(self, collection: Collection, record: Dict[str, Any], created: bool = False):
+        """Persist a created or updated record and announce it on the change feed."""
+        self._persist(collection, {"op": "put", "record": record})
+        key = record[collection.key_field]
+        self.feed.publish(collection.name, "create" if created else "update", key, record)
+
+    def _persist_delete(self, collection: Collection, key: Any):
+        """Persist the removal of a record and announce it on the change feed."""
+        self._persist(collection, {"op": "delete", "key": key})
+        self.feed.publish(collection.name, "delete", key)
+
+    def _persist(self, collection: Collection, entry: Dict[str, Any]):
+        """Queue a mutation while the collection's write lock is held."""
+        with self._pending_lock:
+            self._pending[collection.name].append(entry)
+            self._pending_count += 1
+
+    def _schedule_flush(self):
+        """Write queued mutations according to the flush policy."""
+        with self._pending_lock:
+            pending_count = self._pending_count
+        if not pending_count:
+            return
+        if self.flush_policy == "immediate":
+            self.flush()
+            return
+        self._start_flusher()
+        if self.flush_policy == "count" and pending_count >= self.flush_every:
+            self._flush_wakeup.set()
+
+    def flush(self):
+        """Write all pending mutations, one batch per dirty collection."""
+        with self._write_lock:
+            with self._pending_lock:
+                pending = self._pending
+                self._pending = {c.name: [] for c in self.collections}
+                self._pending_count = 0
+
+            for collection in self.collections:
+                entries = pending[collection.name]
+                if not entries:
+                    continue
+                if self.persistence == "snapshot":
+                    self._save(collection)
+                    continue
+                journal = self._journals[collection.name]
+                start = time.perf_counter()
+                journal.extend(entries)
+                store_persist_duration.labels(collection.name, "journal").observe(
+                    time.perf_counter() - start
+                )
+                if journal.count >= self.compact_every:
+                    self._compact(collection)
+
+    def _start_flusher(self):
+        """Start the background flusher thread on first use."""
+        if self._flusher is not None:
+            return
+        with self._pending_lock:
+            if self._flusher is None and not self._closing:
+                self._flusher = threading.Thread(
+                    target=self._run_flusher, name="json-store-flusher", daemon=True
+                )
+                self._flusher.start()
+
+    def _run_flusher(self):
+        """Flush pending mutations until the store is closed."""
+        timeout = self.flush_interval_ms / 1000 if self.flush_policy == "interval" else None
+        while not self._closing:
+            self._flush_wakeup.wait(timeout)
+            self._flush_wakeup.clear()
+            self.flush()
+
+    def compact(self, collection: Optional[Collection] = None):
+        """Fold journal entries into the JSON snapshot and truncate the log."""
+        self.flush()
+        with self._write_lock:
+            for c in [collection] if collection else self.collections:
+                self._compact(c)
+
+    def _compact(self, collection: Collection):
+        """Snapshot a collection and empty its journal."""
+        self._save(collection)
+        self._journals[collection.name].truncate()
+
+    def close(self):
+        """Drain pending writes, stop background threads and release journal handles."""
+        self._closing = True
+        if self._watcher is not None:
+            self._watcher_stop.set()
+            self._watcher.join()
+            self._watcher = None
+        if self._flusher is not None:
+            self._flush_wakeup.set()
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        for journal in self._journals.values():
+            journal.close()
+        self._closing = False
+
+    # Bulk operations
+    def _bulk_create(
+        self, collection: Collection, records: List[Dict[str, Any]], timestamps: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Create every record or none of them, persisting once for the batch."""
+        now = datetime.now().isoformat()
+        with self._mutating(collection):
+            if collection.key_field != "id":
+                errors = []
+                seen: Set[Any] = set()
+                for i, record in enumerate(records):
+                    key = record[collection.key_field]
+                    if collection.exists(key) or key in seen:
+                        errors.append({"index": i, "key": key, "error": "already exists"})
+                    seen.add(key)
+                if errors:
+                    raise BulkError(errors)
+            for record in records:
+                if timestamps:
+                    record["created_at"] = now
+                    record["updated_at"] = now
+                collection.add(record)
+                self._persist_put(collection, record, created=True)
+        return records
+
+    def _bulk_update(
+        self, collection: Collection, changes: List[Dict[str, Any]], timestamps: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Merge partial ``changes`` (each carrying its key) into existing records."""
+        now = datetime.now().isoformat()
+        with self._mutating(collection):
+            self._check_bulk_keys(collection, [c[collection.key_field] for c in changes])
+            updated = []
+            for change in changes:
+                # Every key was just checked to be live
+                existing = collection.records[change[collection.key_field]]
+                record = {**existing, **change, "id": existing["id"]}
+                if timestamps:
+                    record["created_at"] = existing.get("created_at", now)
+                    record["updated_at"] = now
+                collection.replace(record[collection.key_field], record)
+                self._persist_put(collection, record)
+                updated.append(record)
+        return updated
+
+    def _bulk_delete(self, collection: Collection, keys: List[Any]) -> int:
+        """Delete every key or none of them."""
+        with self._mutating(collection):
+            self._check_bulk_keys(collection, keys)
+            for key in keys:
+                collection.remove(key)
+                self._persist_delete(collection, key)
+        return len(keys)
+
+    def _check_bulk_keys(self, collection: Collection, keys: List[Any]):
+        """Reject unknown or repeated keys before a bulk update or delete."""
+        errors = []
+        seen: Set[Any] = set()
+        for i, key in enumerate(keys):
+            if key not in collection.records:
+                error = "archived" if collection.archived(key) else "not found"
+                errors.append({"index": i, "key": key, "error": error})
+            elif key in seen:
+                errors.append({"index": i, "key": key, "error": "duplicate in batch"})
+            seen.add(key)
+        if errors:
+            raise BulkError(errors)
+
+    def bulk_create_deals(self, deals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create deals all-or-nothing."""
+        return self._bulk_create(self.deals, deals, timestamps=False)
+
+    def bulk_update_deals(self, changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply partial updates keyed by deal_id all-or-nothing."""
+        return self._bulk_update(self.deals, changes, timestamps=False)
+
+    def bulk_delete_deals(self, deal_ids: List[str]) -> int:
+        """Delete deals all-or-nothing."""
+        return self._bulk_delete(self.deals, deal_ids)
+
+    def bulk_create_brokers(self, brokers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create brokers all-or-nothing."""
+        return self._bulk_create(self.brokers, brokers)
+
+    def bulk_update_brokers(self, changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply partial updates keyed by broker_id all-or-nothing."""
+        return self._bulk_update(self.brokers, changes)
+
+    def bulk_delete_brokers(self, broker_ids: List[str]) -> int:
+        """Delete brokers all-or-nothing."""
+        return self._bulk_delete(self.brokers, broker_ids)
+
+    def bulk_create_portfolios(self, portfolios: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create portfolios all-or-nothing."""
+        return self._bulk_create(self.portfolios, portfolios)
+
+    def bulk_update_portfolios(self, changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply partial updates keyed by portfolio_id all-or-nothing."""
+        return self._bulk_update(self.portfolios, changes)
+
+    def bulk_delete_portfolios(self, portfolio_ids: List[str]) -> int:
+        """Delete portfolios all-or-nothing."""
+        return self._bulk_delete(self.portfolios, portfolio_ids)
+
+    def bulk_create_allocations(self, allocations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create allocations all-or-nothing."""
+        return self._bulk_create(self.allocations, allocations)
+
+    def bulk_update_allocations(self, changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply partial updates keyed by allocation id all-or-nothing."""
+        return self._bulk_update(self.allocations, changes)
+
+    def bulk_delete_allocations(self, allocation_ids: List[int]) -> int:
+        """Delete allocations all-or-nothing."""
+        return self._bulk_delete(self.allocations, allocation_ids)
 
     # Deal operations
     def get_deals(self) -> List[Dict[str, Any]]:
         """Get all deals."""
-        return self.deals
+        with self._reading(self.deals):
+            return self.deals.all()
 
     def get_deal(self, deal_id: str) -> Optional[Dict[str, Any]]:
-        """Get a deal by deal_id."""
-        return next((d for d in self.deals if d["deal_id"] == deal_id), None)
+        """Get a deal by deal_id, looking in the archive if it is not live."""
+        with self._reading(self.deals):
+            deal = self.deals.get(deal_id)
+            if deal is None and self.deals.archive is not None:
+                deal = self.deals.archive.get(deal_id)
+            return deal
+
+    def archive_deals(self, ended_before: date) -> int:
+        """Move deals whose ``end_date`` is before ``ended_before`` to the archive.
+
+        Archived deals stay readable through :meth:`get_deal` but drop out of
+        listings, queries and search, and can no longer be changed.
+        """
+        cutoff = ended_before.isoformat()
+        archive = self.deals.archive
+        assert archive is not None
+        with self._mutating(self.deals):
+            records = self.deals.records
+            keys = [
+                key for key in self.deals.sorted_indexes["end_date"].range(None, cutoff)
+                if "" < (records[key].get("end_date") or "") < cutoff
+            ]
+            archive.append(records[key] for key in keys)
+            for key in keys:
+                record = self.deals.remove(key)
+                self._persist(self.deals, {"op": "delete", "key": key})
+                self.feed.publish(self.deals.name, "archive", key, record)
+        return len(keys)
+
+    def version(self, collection: str) -> int:
+        """Version of ``collection``; it changes on every mutation."""
+        target: Collection = getattr(self, collection)
+        self._ensure_loaded(target)
+        self._sync()
+        return target.version
+
+    def collection_sizes(self) -> Dict[str, int]:
+        """Live records per loaded collection; lazy collections are not loaded for this."""
+        return {c.name: len(c.records) for c in self.collections if c.loaded}
+
+    def aggregate(
+        self, collection: str, by: str, value: str, weight: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Group totals computed over column arrays of ``collection``."""
+        table = getattr(self, collection)
+        with self._reading(table):
+            if table.columns:
+                return aggregate_table(table.records, by, value, weight)
+            records = table.all()
+        return aggregate_records(records, by, value, weight)
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Top ``limit`` records across collections whose words start with every query term."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        hits = []
+        for collection in self.collections:
+            if collection.text_index is None:
+                continue
+            with self._reading(collection):
+                # Loading may have replaced the index, so look it up under the lock
+                text_index = collection.text_index
+                assert text_index is not None
+                for score, key in text_index.search(terms, limit):
+                    record = collection.records[key]
+                    hits.append(search_hit(collection.name, collection.key_field, record, score))
+        return top_hits(hits, limit)
+
+    def query_deals(
+        self,
+        status: Optional[str] = None,
+        client: Optional[str] = None,
+        owner: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        start_date_from: Optional[date] = None,
+        start_date_to: Optional[date] = None,
+        end_date_from: Optional[date] = None,
+        end_date_to: Optional[date] = None,
+        sort: Optional[str] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Position] = None,
+    ) -> Page:
+        """Get one page of deals matching the filters through the secondary indexes."""
+        with self._reading(self.deals):
+            return self.deals.query(
+                equals={"status": status, "client": client, "owner": owner},
+                ranges={
+                    "amount": (min_amount, max_amount),
+                    "start_date": (start_date_from, start_date_to),
+                    "end_date": (end_date_from, end_date_to),
+                },
+                sort=sort,
+                skip=skip,
+                limit=limit,
+                after=after,
+            )
 
     def create_deal(self, deal_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new deal."""
-        deal_data["id"] = self._next_ids["deals"]
-        self._next_ids["deals"] += 1
-        self.deals.append(deal_data)
-        self._save_json("deals.json", self.deals)
+        """Create a new deal. Raises DuplicateKeyError if deal_id is taken."""
+        with self._mutating(self.deals):
+            self.deals.add(deal_data)
+            self._persist_put(self.deals, deal_data, created=True)
         return deal_data
 
     def update_deal(self, deal_id: str, deal_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update an existing deal."""
-        for i, deal in enumerate(self.deals):
-            if deal["deal_id"] == deal_id:
-                # Preserve the original id
-                deal_data["id"] = deal["id"]
-                deal_data["deal_id"] = deal_id
-                self.deals[i] = deal_data
-                self._save_json("deals.json", self.deals)
-                return deal_data
-        return None
+        with self._mutating(self.deals):
+            deal = self.deals.get(deal_id)
+            if deal is None:
+                if self.deals.archived(deal_id):
+                    raise ArchivedError(deal_id)
+                return None
+            # Preserve the original id
+            deal_data["id"] = deal["id"]
+            deal_data["deal_id"] = deal_id
+            self.deals.replace(deal_id, deal_data)
+            self._persist_put(self.deals, deal_data)
+        return deal_data
 
     def delete_deal(self, deal_id: str) -> bool:
         """Delete a deal."""
-        original_length = len(self.deals)
-        self.deals = [d for d in self.deals if d["deal_id"] != deal_id]
-        if len(self.deals) < original_length:
-            self._save_json("deals.json", self.deals)
-            return True
-        return False
+        with self._mutating(self.deals):
+            if self.deals.remove(deal_id) is None:
+                if self.deals.archived(deal_id):
+                    raise ArchivedError(deal_id)
+                return False
+            self._persist_delete(self.deals, deal_id)
+        return True
 
     # Broker operations
     def get_brokers(self) -> List[Dict[str, Any]]:
         """Get all brokers."""
-        return self.brokers
+        with self._reading(self.brokers):
+            return self.brokers.all()
+
+    def query_brokers(
+        self, skip: int = 0, limit: Optional[int] = None, after: Optional[Position] = None
+    ) -> Page:
+        """Get one page of brokers ordered by id."""
+        with self._reading(self.brokers):
+            return self.brokers.query(skip=skip, limit=limit, after=after)
 
     def get_broker(self, broker_id: str) -> Optional[Dict[str, Any]]:
         """Get a broker by broker_id."""
-        return next((b for b in self.brokers if b["broker_id"] == broker_id), None)
+        with self._reading(self.brokers):
+            return self.brokers.get(broker_id)
 
     def create_broker(self, broker_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new broker."""
-        broker_data["id"] = self._next_ids["brokers"]
-        self._next_ids["brokers"] += 1
+        """Create a new broker. Raises DuplicateKeyError if broker_id is taken."""
         now = datetime.now().isoformat()
         broker_data["created_at"] = now
         broker_data["updated_at"] = now
-        self.brokers.append(broker_data)
-        self._save_json("brokers.json", self.brokers)
+        with self._mutating(self.brokers):
+            self.brokers.add(broker_data)
+            self._persist_put(self.brokers, broker_data, created=True)
         return broker_data
 
     def update_broker(self, broker_id: str, broker_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update an existing broker."""
-        for i, broker in enumerate(self.brokers):
-            if broker["broker_id"] == broker_id:
-                broker_data["id"] = broker["id"]
-                broker_data["broker_id"] = broker_id
-                broker_data["created_at"] = broker.get("created_at", datetime.now().isoformat())
-                broker_data["updated_at"] = datetime.now().isoformat()
-                self.brokers[i] = broker_data
-                self._save_json("brokers.json", self.brokers)
-                return broker_data
-        return None
+        with self._mutating(self.brokers):
+            broker = self.brokers.get(broker_id)
+            if broker is None:
+                return None
+            broker_data["id"] = broker["id"]
+            broker_data["broker_id"] = broker_id
+            broker_data["created_at"] = broker.get("created_at", datetime.now().isoformat())
+            broker_data["updated_at"] = datetime.now().isoformat()
+            self.brokers.replace(broker_id, broker_data)
+            self._persist_put(self.brokers, broker_data)
+        return broker_data
 
     def delete_broker(self, broker_id: str) -> bool:
         """Delete a broker."""
-        original_length = len(self.brokers)
-        self.brokers = [b for b in self.brokers if b["broker_id"] != broker_id]
-        if len(self.brokers) < original_length:
-            self._save_json("brokers.json", self.brokers)
-            return True
-        return False
+        with self._mutating(self.brokers):
+            if self.brokers.remove(broker_id) is None:
+                return False
+            self._persist_delete(self.brokers, broker_id)
+        return True
 
     # Portfolio operations
     def get_portfolios(self) -> List[Dict[str, Any]]:
         """Get all portfolios."""
-        return self.portfolios
+        with self._reading(self.portfolios):
+            return self.portfolios.all()
+
+    def query_portfolios(
+        self, skip: int = 0, limit: Optional[int] = None, after: Optional[Position] = None
+    ) -> Page:
+        """Get one page of portfolios ordered by id."""
+        with self._reading(self.portfolios):
+            return self.portfolios.query(skip=skip, limit=limit, after=after)
 
     def get_portfolio(self, portfolio_id: str) -> Optional[Dict[str, Any]]:
         """Get a portfolio by portfolio_id."""
-        return next((p for p in self.portfolios if p["portfolio_id"] == portfolio_id), None)
+        with self._reading(self.portfolios):
+            return self.portfolios.get(portfolio_id)
 
     def create_portfolio(self, portfolio_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new portfolio."""
-        portfolio_data["id"] = self._next_ids["portfolios"]
-        self._next_ids["portfolios"] += 1
+        """Create a new portfolio. Raises DuplicateKeyError if portfolio_id is taken."""
         now = datetime.now().isoformat()
         portfolio_data["created_at"] = now
         portfolio_data["updated_at"] = now
-        self.portfolios.append(portfolio_data)
-        self._save_json("portfolios.json", self.portfolios)
+        with self._mutating(self.portfolios):
+            self.portfolios.add(portfolio_data)
+            self._persist_put(self.portfolios, portfolio_data, created=True)
         return portfolio_data
 
     def update_portfolio(self, portfolio_id: str, portfolio_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update an existing portfolio."""
-        for i, portfolio in enumerate(self.portfolios):
-            if portfolio["portfolio_id"] == portfolio_id:
-                portfolio_data["id"] = portfolio["id"]
-                portfolio_data["portfolio_id"] = portfolio_id
-                portfolio_data["created_at"] = portfolio.get("created_at", datetime.now().isoformat())
-                portfolio_data["updated_at"] = datetime.now().isoformat()
-                self.portfolios[i] = portfolio_data
-                self._save_json("portfolios.json", self.portfolios)
-                return portfolio_data
-        return None
+        with self._mutating(self.portfolios):
+            portfolio = self.portfolios.get(portfolio_id)
+            if portfolio is None:
+                return None
+            portfolio_data["id"] = portfolio["id"]
+            portfolio_data["portfolio_id"] = portfolio_id
+            portfolio_data["created_at"] = portfolio.get("created_at", datetime.now().isoformat())
+            portfolio_data["updated_at"] = datetime.now().isoformat()
+            self.portfolios.replace(portfolio_id, portfolio_data)
+            self._persist_put(self.portfolios, portfolio_data)
+        return portfolio_data
 
     def delete_portfolio(self, portfolio_id: str) -> bool:
         """Delete a portfolio."""
-        original_length = len(self.portfolios)
-        self.portfolios = [p for p in self.portfolios if p["portfolio_id"] != portfolio_id]
-        if len(self.portfolios) < original_length:
-            self._save_json("portfolios.json", self.portfolios)
-            return True
-        return False
+        with self._mutating(self.portfolios):
+            if self.portfolios.remove(portfolio_id) is None:
+                return False
+            self._persist_delete(self.portfolios, portfolio_id)
+        return True
 
     # Allocation operations
     def get_allocations(self) -> List[Dict[str, Any]]:
         """Get all allocations."""
-        return self.allocations
+        with self._reading(self.allocations):
+            return self.allocations.all()
+
+    def query_allocations(
+        self, skip: int = 0, limit: Optional[int] = None, after: Optional[Position] = None
+    ) -> Page:
+        """Get one page of allocations ordered by id."""
+        with self._reading(self.allocations):
+            return self.allocations.query(skip=skip, limit=limit, after=after)
 
     def get_allocation(self, allocation_id: int) -> Optional[Dict[str, Any]]:
         """Get an allocation by id."""
-        return next((a for a in self.allocations if a["id"] == allocation_id), None)
+        with self._reading(self.allocations):
+            return self.allocations.get(allocation_id)
 
     def create_allocation(self, allocation_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new allocation."""
-        allocation_data["id"] = self._next_ids["allocations"]
-        self._next_ids["allocations"] += 1
         now = datetime.now().isoformat()
         allocation_data["created_at"] = now
         allocation_data["updated_at"] = now
-        self.allocations.append(allocation_data)
-        self._save_json("allocations.json", self.allocations)
+        with self._mutating(self.allocations):
+            self.allocations.add(allocation_data)
+            self._persist_put(self.allocations, allocation_data, created=True)
         return allocation_data
 
     def update_allocation(self, allocation_id: int, allocation_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update an existing allocation."""
-        for i, allocation in enumerate(self.allocations):
-            if allocation["id"] == allocation_id:
-                allocation_data["id"] = allocation_id
-                allocation_data["created_at"] = allocation.get("created_at", datetime.now().isoformat())
-                allocation_data["updated_at"] = datetime.now().isoformat()
-                self.allocations[i] = allocation_data
-                self._save_json("allocations.json", self.allocations)
-                return allocation_data
-        return None
+        with self._mutating(self.allocations):
+            allocation = self.allocations.get(allocation_id)
+            if allocation is None:
+                return None
+            allocation_data["id"] = allocation_id
+            allocation_data["created_at"] = allocation.get("created_at", datetime.now().isoformat())
+            allocation_data["updated_at"] = datetime.now().isoformat()
+            self.allocations.replace(allocation_id, allocation_data)
+            self._persist_put(self.allocations, allocation_data)
+        return allocation_data
 
     def delete_allocation(self, allocation_id: int) -> bool:
         """Delete an allocation."""
-        original_length = len(self.allocations)
-        self.allocations = [a for a in self.allocations if a["id"] != allocation_id]
-        if len(self.allocations) < original_length:
-            self._save_json("allocations.json", self.allocations)
-            return True
-        return False
-
+        with self._mutating(self.allocations):
+            if self.allocations.remove(allocation_id) is None:
+                return False
+            self._persist_delete(self.allocations, allocation_id)
+        return True
 
 # Global store instance
-json_store = JSONStore()
+json_store = JSONStore(data_dir=settings.json_data_dir)
 
 
-def get_json_store() -> JSONStore:
-    """Dependency to get the JSON store instance."""
-    return json_store
+def get_json_store() -> Repository:
+    """Dependency to get the configured store (JSON files or the SQL database)."""
+    return get_repository()
@@ -0,0 +1,366 @@
+"""
+Storage interface shared by the JSON file store and the SQL database store.
+
+The routers only talk to a :class:`Repository`; ``get_repository`` picks the
+implementation from ``settings.DATABASE_URL`` (``json://`` selects the JSON
+files, any SQLAlchemy URL selects the database).
+"""
+
+import heapq
+from abc import ABC, abstractmethod
+from typing import Any, Dict, FrozenSet, Hashable, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.data.events import ChangeFeed
+from app.data.indexes import Position
+
+Record = Dict[str, Any]
+
+# Text fields covered by search in each collection, with the score a match in
+# each is worth. The first field labels the hit.
+SEARCH_FIELDS: Dict[str, Dict[str, float]] = {
+    "deals": {"deal_name": 2.0, "client": 1.0, "owner": 1.0},
+    "brokers": {"broker_name": 2.0},
+    "portfolios": {"portfolio_name": 2.0, "manager": 1.0},
+    "allocations": {"cusip": 2.0, "desc_of_security": 1.0},
+}
+
+# Defaults stored in cursor positions for rows missing the sort field; they
+# match the JSON store's sorted indexes so cursors look the same on both.
+SORT_DEFAULTS: Dict[str, Any] = {
+    "id": 0,
+    "amount": 0.0,
+    "start_date": "",
+    "end_date": "",
+    "deal_name": "",
+}
+
+# Group-by fields offered by the analytics endpoints in each collection, the
+# measure totalled per group, and the field weighting its mean (if any)
+ANALYTICS_FIELDS: Dict[str, Tuple[Tuple[str, ...], str, Optional[str]]] = {
+    "deals": (("status", "client", "owner"), "amount", None),
+    "allocations": (
+        ("broker", "trader", "allocation_type", "deal_circle"),
+        "deal_allocation",
+        None,
+    ),
+    "portfolios": (("risk_profile", "manager", "strategy"), "performance", "aum"),
+}
+
+
+class DuplicateKeyError(ValueError):
+    """Raised when creating a record whose natural key already exists."""
+
+
+class ArchivedError(ValueError):
+    """Raised when changing a record that was moved to the read-only archive."""
+
+
+class BulkError(ValueError):
+    """Raised when any item of a bulk operation is rejected; nothing is applied.
+
+    ``errors`` holds one ``{"index", "key", "error"}`` dict per rejected item.
+    """
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(f"{len(errors)} item(s) rejected")
+        self.errors = errors
+
+
+class Page(NamedTuple):
+    """One page of query results.
+
+    ``next_position`` is set when more records follow; pass it back as
+    ``after`` to fetch the next page.
+    """
+
+    items: List[Record]
+    next_position: Optional[Position]
+
+
+def search_hit(collection: str, key_field: str, record: Record, score: float) -> Record:
+    """Search result entry pointing at ``record``."""
+    label = next((record[f] for f in SEARCH_FIELDS[collection] if record.get(f)), "")
+    return {
+        "type": collection[:-1],
+        "id": record["id"],
+        "key": record[key_field],
+        "label": label,
+        "score": round(score, 4),
+    }
+
+
+def top_hits(hits: List[Record], limit: int) -> List[Record]:
+    """Best ``limit`` hits, highest score first."""
+    return heapq.nlargest(limit, hits, key=lambda hit: hit["score"])
+
+
+def group_total(
+    group: Any, count: int, total: float, weight: float, weighted_total: float, weighted: bool
+) -> Record:
+    """Analytics entry for one group; ``weight`` is the denominator of ``mean``."""
+    return {
+        "group": group,
+        "count": count,
+        "total": total,
+        "mean": weighted_total / weight if weight else None,
+        "weight": weight if weighted else None,
+    }
+
+
+def ranked_groups(groups: List[Record]) -> List[Record]:
+    """Groups by descending total, ties by name with the missing group last."""
+    return sorted(groups, key=lambda g: (-g["total"], g["group"] is None, g["group"] or ""))
+
+
+class Repository(ABC):
+    """Operations the API needs from a storage backend.
+
+    Records are plain dicts with dates as ISO strings. Natural keys are
+    ``deal_id``, ``broker_id``, ``portfolio_id`` and the allocation ``id``.
+    List queries are ordered by id unless sorted, and page with the keyset
+    positions described in :mod:`app.data.indexes`. Every committed write is
+    published on ``feed``.
+    """
+
+    feed: ChangeFeed
+    # Methods that never block on I/O, safe to call from the event loop
+    inline_methods: FrozenSet[str] = frozenset()
+
+    def runs_inline(self, name: str, *args: Any) -> bool:
+        """Whether calling ``name(*args)`` right now is safe on the event loop."""
+        return name in self.inline_methods
+
+    @abstractmethod
+    def load_data(self):
+        """Prepare the backing storage for requests."""
+
+    @abstractmethod
+    def close(self):
+        """Flush pending work and release resources."""
+
+    @abstractmethod
+    def version(self, collection: str) -> Hashable:
+        """Token for the current contents of ``collection``, e.g. ``"deals"``.
+
+        It changes whenever the collection does, so it can key caches of
+        anything derived from the collection.
+        """
+
+    @abstractmethod
+    def collection_sizes(self) -> Dict[str, int]:
+        """Number of records per collection, for monitoring."""
+
+    @abstractmethod
+    def aggregate(
+        self, collection: str, by: str, value: str, weight: Optional[str] = None
+    ) -> List[Record]:
+        """Count, total and mean of ``value`` per distinct ``by``, largest total first.
+
+        Each entry is ``{"group", "count", "total", "mean", "weight"}``. Records
+        missing ``value`` count towards ``count`` only. With ``weight`` the
+        mean is weighted by that field and ``weight`` holds its total.
+        """
+
+    @abstractmethod
+    def search(self, query: str, limit: int = 20) -> List[Record]:
+        """Rank deals, brokers, portfolios and allocations by prefix matches on ``query``."""
+
+    # Deal operations
+    @abstractmethod
+    def get_deals(self) -> List[Record]:
+        """Get all deals."""
+
+    @abstractmethod
+    def get_deal(self, deal_id: str) -> Optional[Record]:
+        """Get a deal by deal_id."""
+
+    @abstractmethod
+    def query_deals(
+        self,
+        status: Optional[str] = None,
+        client: Optional[str] = None,
+        owner: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        start_date_from: Optional[Any] = None,
+        start_date_to: Optional[Any] = None,
+        end_date_from: Optional[Any] = None,
+        end_date_to: Optional[Any] = None,
+        sort: Optional[str] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Position] = None,
+    ) -> Page:
+        """Get one page of deals matching the filters."""
+
+    @abstractmethod
+    def create_deal(self, deal_data: Record) -> Record:
+        """Create a new deal. Raises DuplicateKeyError if deal_id is taken."""
+
+    @abstractmethod
+    def update_deal(self, deal_id: str, deal_data: Record) -> Optional[Record]:
+        """Update an existing deal. Raises ArchivedError if it was archived."""
+
+    @abstractmethod
+    def delete_deal(self, deal_id: str) -> bool:
+        """Delete a deal. Raises ArchivedError if it was archived."""
+
+    @abstractmethod
+    def bulk_create_deals(self, deals: List[Record]) -> List[Record]:
+        """Create deals all-or-nothing."""
+
+    @abstractmethod
+    def bulk_update_deals(self, changes: List[Record]) -> List[Record]:
+        """Apply partial updates keyed by deal_id all-or-nothing."""
+
+    @abstractmethod
+    def bulk_delete_deals(self, deal_ids: List[str]) -> int:
+        """Delete deals all-or-nothing."""
+
+    # Broker operations
+    @abstractmethod
+    def get_brokers(self) -> List[Record]:
+        """Get all brokers."""
+
+    @abstractmethod
+    def get_broker(self, broker_id: str) -> Optional[Record]:
+        """Get a broker by broker_id."""
+
+    @abstractmethod
+    def query_brokers(
+        self, skip: int = 0, limit: Optional[int] = None, after: Optional[Position] = None
+    ) -> Page:
+        """Get one page of brokers ordered by id."""
+
+    @abstractmethod
+    def create_broker(self, broker_data: Record) -> Record:
+        """Create a new broker. Raises DuplicateKeyError if broker_id is taken."""
+
+    @abstractmethod
+    def update_broker(self, broker_id: str, broker_data: Record) -> Optional[Record]:
+        """Update an existing broker."""
+
+    @abstractmethod
+    def delete_broker(self, broker_id: str) -> bool:
+        """Delete a broker."""
+
+    @abstractmethod
+    def bulk_create_brokers(self, brokers: List[Record]) -> List[Record]:
+        """Create brokers all-or-nothing."""
+
+    @abstractmethod
+    def bulk_update_brokers(self, changes: List[Record]) -> List[Record]:
+        """Apply partial updates keyed by broker_id all-or-nothing."""
+
+    @abstractmethod
+    def bulk_delete_brokers(self, broker_ids: List[str]) -> int:
+        """Delete brokers all-or-nothing."""
+
+    # Portfolio operations
+    @abstractmethod
+    def get_portfolios(self) -> List[Record]:
+        """Get all portfolios."""
+
+    @abstractmethod
+    def get_portfolio(self, portfolio_id: str) -> Optional[Record]:
+        """Get a portfolio by portfolio_id."""
+
+    @abstractmethod
+    def query_portfolios(
+        self, skip: int = 0, limit: Optional[int] = None, after: Optional[Position] = None
+    ) -> Page:
+        """Get one page of portfolios ordered by id."""
+
+    @abstractmethod
+    def create_portfolio(self, portfolio_data: Record) -> Record:
+        """Create a new portfolio. Raises DuplicateKeyError if portfolio_id is taken."""
+
+    @abstractmethod
+    def update_portfolio(self, portfolio_id: str, portfolio_data: Record) -> Optional[Record]:
+        """Update an existing portfolio."""
+
+    @abstractmethod
+    def delete_portfolio(self, portfolio_id: str) -> bool:
+        """Delete a portfolio."""
+
+    @abstractmethod
+    def bulk_create_portfolios(self, portfolios: List[Record]) -> List[Record]:
+        """Create portfolios all-or-nothing."""
+
+    @abstractmethod
+    def bulk_update_portfolios(self, changes: List[Record]) -> List[Record]:
+        """Apply partial updates keyed by portfolio_id all-or-nothing."""
+
+    @abstractmethod
+    def bulk_delete_portfolios(self, portfolio_ids: List[str]) -> int:
+        """Delete portfolios all-or-nothing."""
+
+    # Allocation operations
+    @abstractmethod
+    def get_allocations(self) -> List[Record]:
+        """Get all allocations."""
+
+    @abstractmethod
+    def get_allocation(self, allocation_id: int) -> Optional[Record]:
+        """Get an allocation by id."""
+
+    @abstractmethod
+    def query_allocations(
+        self, skip: int = 0, limit: Optional[int] = None, after: Optional[Position] = None
+    ) -> Page:
+        """Get one page of allocations ordered by id."""
+
+    @abstractmethod
+    def create_allocation(self, allocation_data: Record) -> Record:
+        """Create a new allocation."""
+
+    @abstractmethod
+    def update_allocation(self, allocation_id: int, allocation_data: Record) -> Optional[Record]:
+        """Update an existing allocation."""
+
+    @abstractmethod
+    def delete_allocation(self, allocation_id: int) -> bool:
+        """Delete an allocation."""
+
+    @abstractmethod
+    def bulk_create_allocations(self, allocations: List[Record]) -> List[Record]:
+        """Create allocations all-or-nothing."""
+
+    @abstractmethod
+    def bulk_update_allocations(self, changes: List[Record]) -> List[Record]:
+        """Apply partial updates keyed by allocation id all-or-nothing."""
+
+    @abstractmethod
+    def bulk_delete_allocations(self, allocation_ids: List[int]) -> int:
+        """Delete allocations all-or-nothing."""
+
+
+READ_METHODS = frozenset(
+    name
+    for name in Repository.__abstractmethods__
+    if name.startswith(("get_", "query_")) or name in ("search", "version")
+)
+WRITE_METHODS = frozenset(
+    name
+    for name in Repository.__abstractmethods__
+    if name.startswith(("create_", "update_", "delete_", "bulk_"))
+)
+
+_repository: Optional[Repository] = None
+
+
+def get_repository() -> Repository:
+    """Return the process-wide repository selected by ``settings.DATABASE_URL``."""
+    global _repository
+    if _repository is None:
+        if settings.uses_json_store:
+            from app.data.json_store import json_store
+
+            _repository = json_store
+        else:
+            from app.data.sql_store import SQLStore
+            from app.db.base import SessionLocal
+
+            _repository = SQLStore(SessionLocal)
+    return _repository
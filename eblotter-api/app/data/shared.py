@@ -0,0 +1,97 @@
+"""
+Cross-process coordination for JSON stores shared by several workers.
+
+Writers serialize on an exclusive ``flock`` of ``.store.lock`` in the data
+directory. After each write they bump the collection's counter in
+``.generation``, which is replaced atomically. Readers ``stat`` that file
+before serving a request and reload only the collections whose counter
+moved, so checking for changes costs one system call.
+"""
+
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+LOCK_FILE = ".store.lock"
+GENERATION_FILE = ".generation"
+
+
+class SharedState:
+    """File lock and generation counters for one data directory."""
+
+    def __init__(self, data_dir: Path):
+        self.lock_path = Path(data_dir) / LOCK_FILE
+        self.generation_path = Path(data_dir) / GENERATION_FILE
+        self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        # flock only excludes other open files, so threads of this process
+        # also queue on a plain lock
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._stamp: Optional[Tuple[int, int, int]] = None
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """Hold the cross-process write lock (reentrant within a thread)."""
+        with self._thread_lock:
+            if self._depth == 0:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        """Keep writers out while files are read."""
+        with self._thread_lock:
+            if self._depth:
+                # Already exclusive in this thread
+                yield
+                return
+            fcntl.flock(self._fd, fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _current_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.generation_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def changed(self) -> bool:
+        """Whether ``.generation`` changed since it was last read or written here."""
+        return self._current_stamp() != self._stamp
+
+    def read(self) -> Dict[str, int]:
+        """Current generation of every collection."""
+        self._stamp = self._current_stamp()
+        if self._stamp is None:
+            return {}
+        with open(self.generation_path) as f:
+            generations: Dict[str, int] = json.load(f)
+        return generations
+
+    def bump(self, names) -> Dict[str, int]:
+        """Advance the generation of ``names``; call while holding :meth:`exclusive`."""
+        generations = self.read()
+        for name in names:
+            generations[name] = generations.get(name, 0) + 1
+        tmp_path = self.generation_path.with_name(GENERATION_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(generations, f)
+        os.replace(tmp_path, self.generation_path)
+        self._stamp = self._current_stamp()
+        return generations
+
+    def close(self):
+        os.close(self._fd)
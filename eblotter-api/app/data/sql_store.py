@@ -0,0 +1,573 @@
+"""
+SQLAlchemy-backed repository for the eBlotter API.
+Serves the same dict records as the JSON store from the tables in app.models.
+"""
+
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from sqlalchemy import Date, DateTime, and_, case, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.data.events import ChangeFeed, change_feed
+from app.data.indexes import Position, TextIndex, tokenize
+from app.data.repository import (
+    SEARCH_FIELDS,
+    SORT_DEFAULTS,
+    BulkError,
+    DuplicateKeyError,
+    Page,
+    Record,
+    Repository,
+    group_total,
+    ranked_groups,
+    search_hit,
+    top_hits,
+)
+from app.db.base import Base
+from app.models.deal import Allocation, Broker, CollectionVersion, Deal, Portfolio
+
+
+def bump_version(connection: Any, collection: str):
+    """Move ``collection``'s version on inside the caller's transaction.
+
+    ``connection`` is a Session or Connection. The row lock taken by the
+    update also orders concurrent writers, so each commit gets its own value.
+    """
+    versions = CollectionVersion.__table__
+    result = connection.execute(
+        update(versions)
+        .where(versions.c.collection == collection)
+        .values(version=versions.c.version + 1)
+    )
+    if result.rowcount == 0:
+        # Tables created before the counter existed start counting here
+        connection.execute(insert(versions).values(collection=collection, version=1))
+
+
+# Most rows per table that search pulls from the database for ranking
+SEARCH_SCAN_LIMIT = 1000
+
+
+class _Table:
+    """Row/dict conversion for one mapped model.
+
+    ``timestamps`` controls whether records expose the audit columns; the
+    JSON store keeps none for deals.
+    """
+
+    def __init__(self, model: Type[Base], key_field: str, timestamps: bool = True):
+        self.model = model
+        self.key_field = key_field
+        self.key_column = getattr(model, key_field)
+        self.timestamps = timestamps
+        self.columns = {c.name: c for c in model.__table__.columns}
+
+    def to_record(self, row: Any) -> Record:
+        record = {}
+        for name in self.columns:
+            value = getattr(row, name)
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            record[name] = value
+        if not self.timestamps:
+            record.pop("created_at", None)
+            record.pop("updated_at", None)
+        return record
+
+    def to_values(self, record: Record) -> Dict[str, Any]:
+        """Column values for ``record``, parsing ISO dates for Date/DateTime columns."""
+        values = {}
+        for name, value in record.items():
+            column = self.columns.get(name)
+            if column is None or name == "id":
+                continue
+            if isinstance(value, str) and isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(value, str) and isinstance(column.type, Date):
+                value = date.fromisoformat(value)
+            values[name] = value
+        return values
+
+
+def _parse_bound(column: Any, value: Any) -> Any:
+    if isinstance(value, str) and isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    return value
+
+
+class SQLStore(Repository):
+    """Repository backed by a SQLAlchemy session factory.
+
+    Every operation runs in its own session and transaction, so the store
+    is safe to share between threads; the connection pool lives on the
+    engine.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], feed: Optional[ChangeFeed] = None):
+        self.session_factory = session_factory
+        # Only writes made through this process reach the feed
+        self.feed = feed or change_feed
+        self.deals = _Table(Deal, "deal_id", timestamps=False)
+        self.brokers = _Table(Broker, "broker_id")
+        self.portfolios = _Table(Portfolio, "portfolio_id")
+        self.allocations = _Table(Allocation, "id")
+
+    def load_data(self):
+        """Create any missing tables and their version counters."""
+        with self.session_factory() as session:
+            Base.metadata.create_all(bind=session.get_bind())
+        tables = (self.deals, self.brokers, self.portfolios, self.allocations)
+        with self.session_factory() as session, session.begin():
+            known = set(session.scalars(select(CollectionVersion.collection)))
+            session.add_all(
+                CollectionVersion(collection=table.model.__tablename__, version=0)
+                for table in tables
+                if table.model.__tablename__ not in known
+            )
+
+    def close(self):
+        """Return pooled connections."""
+        with self.session_factory() as session:
+            session.get_bind().dispose()
+
+    # Generic operations
+    def _all(self, table: _Table) -> List[Record]:
+        with self.session_factory() as session:
+            rows = session.scalars(select(table.model).order_by(table.model.id))
+            return [table.to_record(row) for row in rows]
+
+    def _get(self, table: _Table, key: Any) -> Optional[Record]:
+        with self.session_factory() as session:
+            row = session.scalars(select(table.model).where(table.key_column == key)).first()
+            return table.to_record(row) if row is not None else None
+
+    def _query(
+        self,
+        table: _Table,
+        where: Optional[List[Any]] = None,
+        sort: Optional[str] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Position] = None,
+    ) -> Page:
+        """Keyset-ordered page with the same ordering rules as the JSON store.
+
+        Rows missing the sort field come after all others; descending order
+        is the exact reverse, with id breaking ties.
+        """
+        model = table.model
+        descending = sort is not None and sort.startswith("-")
+        sort_field = sort.lstrip("-") if sort else "id"
+        column = getattr(model, sort_field)
+        missing = column.is_(None)
+        conditions = list(where or [])
+        if after is not None:
+            conditions.append(self._after(column, model.id, after, descending))
+
+        order = [missing, column, model.id]
+        statement = (
+            select(model)
+            .where(*conditions)
+            .order_by(*(o.desc() for o in order) if descending else order)
+        )
+        if skip:
+            statement = statement.offset(skip)
+        if limit is not None:
+            statement = statement.limit(limit + 1)
+        with self.session_factory() as session:
+            records = [table.to_record(row) for row in session.scalars(statement)]
+        if limit is None or len(records) <= limit:
+            return Page(records, None)
+        records = records[:limit]
+        if not records:
+            return Page([], None)
+        last = records[-1]
+        value = last.get(sort_field)
+        position = (
+            (True, SORT_DEFAULTS[sort_field], last["id"])
+            if value is None
+            else (False, value, last["id"])
+        )
+        return Page(records, position)
+
+    @staticmethod
+    def _after(column: Any, id_column: Any, after: Position, descending: bool) -> Any:
+        """Rows strictly past ``after`` in (missing, value, id) order."""
+        was_missing, value, record_id = after
+        if not was_missing:
+            value = _parse_bound(column, value)
+        if not descending:
+            if was_missing:
+                return and_(column.is_(None), id_column > record_id)
+            return or_(
+                column.is_(None),
+                column > value,
+                and_(column == value, id_column > record_id),
+            )
+        if was_missing:
+            return or_(
+                column.is_not(None),
+                and_(column.is_(None), id_column < record_id),
+            )
+        return and_(
+            column.is_not(None),
+            or_(column < value, and_(column == value, id_column < record_id)),
+        )
+
+    @staticmethod
+    def _stamped(table: _Table, record: Record, created_at: Optional[datetime] = None):
+        """Column values for ``record`` with fresh audit timestamps.
+
+        Every write moves ``updated_at``, deals included even though their
+        records do not show it, so :meth:`version` notices the change.
+        """
+        values = table.to_values(record)
+        now = datetime.now()
+        values["created_at"] = created_at or now
+        values["updated_at"] = now
+        return values
+
+    def _create(self, table: _Table, record: Record) -> Record:
+        with self.session_factory() as session, session.begin():
+            if table.key_field != "id":
+                key = record[table.key_field]
+                exists = session.scalar(select(table.model.id).where(table.key_column == key))
+                if exists is not None:
+                    raise DuplicateKeyError(key)
+            row = table.model(**self._stamped(table, record))
+            session.add(row)
+            try:
+                session.flush()
+            except IntegrityError:
+                # Lost a race with a concurrent create of the same key
+                raise DuplicateKeyError(record.get(table.key_field))
+            created = table.to_record(row)
+            bump_version(session, table.model.__tablename__)
+        self._publish(table, "create", [created])
+        return created
+
+    def _update(self, table: _Table, key: Any, record: Record) -> Optional[Record]:
+        with self.session_factory() as session, session.begin():
+            row = session.scalars(select(table.model).where(table.key_column == key)).first()
+            if row is None:
+                return None
+            # Updates replace the whole record, as in the JSON store
+            record = {**dict.fromkeys(table.columns), **record, table.key_field: key}
+            for name, value in self._stamped(table, record, row.created_at).items():
+                setattr(row, name, value)
+            session.flush()
+            updated = table.to_record(row)
+            bump_version(session, table.model.__tablename__)
+        self._publish(table, "update", [updated])
+        return updated
+
+    def _delete(self, table: _Table, key: Any) -> bool:
+        with self.session_factory() as session, session.begin():
+            row = session.scalars(select(table.model).where(table.key_column == key)).first()
+            if row is None:
+                return False
+            session.delete(row)
+            bump_version(session, table.model.__tablename__)
+        self.feed.publish(table.model.__tablename__, "delete", key)
+        return True
+
+    def _bulk_create(self, table: _Table, records: List[Record]) -> List[Record]:
+        with self.session_factory() as session, session.begin():
+            if table.key_field != "id":
+                keys = [r[table.key_field] for r in records]
+                existing = select(table.key_column).where(table.key_column.in_(keys))
+                taken = set(session.scalars(existing))
+                errors = []
+                seen = set()
+                for i, key in enumerate(keys):
+                    if key in taken or key in seen:
+                        errors.append({"index": i, "key": key, "error": "already exists"})
+                    seen.add(key)
+                if errors:
+                    raise BulkError(errors)
+            rows = [table.model(**self._stamped(table, record)) for record in records]
+            session.add_all(rows)
+            session.flush()
+            created = [table.to_record(row) for row in rows]
+            bump_version(session, table.model.__tablename__)
+        self._publish(table, "create", created)
+        return created
+
+    def _rows_for_keys(self, session: Session, table: _Table, keys: List[Any]) -> Dict[Any, Any]:
+        """Load rows for ``keys``, rejecting unknown or repeated keys."""
+        rows = {
+            getattr(row, table.key_field): row
+            for row in session.scalars(select(table.model).where(table.key_column.in_(keys)))
+        }
+        errors = []
+        seen = set()
+        for i, key in enumerate(keys):
+            if key not in rows:
+                errors.append({"index": i, "key": key, "error": "not found"})
+            elif key in seen:
+                errors.append({"index": i, "key": key, "error": "duplicate in batch"})
+            seen.add(key)
+        if errors:
+            raise BulkError(errors)
+        return rows
+
+    def _bulk_update(self, table: _Table, changes: List[Record]) -> List[Record]:
+        with self.session_factory() as session, session.begin():
+            rows = self._rows_for_keys(session, table, [c[table.key_field] for c in changes])
+            updated = []
+            for change in changes:
+                row = rows[change[table.key_field]]
+                values = table.to_values(change)
+                values["updated_at"] = datetime.now()
+                for name, value in values.items():
+                    setattr(row, name, value)
+                updated.append(row)
+            session.flush()
+            updated = [table.to_record(row) for row in updated]
+            bump_version(session, table.model.__tablename__)
+        self._publish(table, "update", updated)
+        return updated
+
+    def _bulk_delete(self, table: _Table, keys: List[Any]) -> int:
+        with self.session_factory() as session, session.begin():
+            rows = self._rows_for_keys(session, table, keys)
+            for row in rows.values():
+                session.delete(row)
+            bump_version(session, table.model.__tablename__)
+        for key in keys:
+            self.feed.publish(table.model.__tablename__, "delete", key)
+        return len(keys)
+
+    def _publish(self, table: _Table, op: str, records: List[Record]):
+        """Announce committed writes on the change feed."""
+        for record in records:
+            self.feed.publish(table.model.__tablename__, op, record[table.key_field], record)
+
+    def version(self, collection: str) -> int:
+        """The table's write counter from ``collection_versions``.
+
+        Every write commits a new value along with its rows, so the counter
+        also reflects writes by other processes.
+        """
+        with self.session_factory() as session:
+            version = session.scalar(
+                select(CollectionVersion.version).where(CollectionVersion.collection == collection)
+            )
+        return int(version or 0)
+
+    def collection_sizes(self) -> Dict[str, int]:
+        """Row count of each table."""
+        tables = (self.deals, self.brokers, self.portfolios, self.allocations)
+        with self.session_factory() as session:
+            return {
+                table.model.__tablename__: session.execute(
+                    select(func.count()).select_from(table.model)
+                ).scalar_one()
+                for table in tables
+            }
+
+    def aggregate(
+        self, collection: str, by: str, value: str, weight: Optional[str] = None
+    ) -> List[Record]:
+        """Group totals computed by the database with ``GROUP BY``."""
+        model = getattr(self, collection).model
+        group, measure = getattr(model, by), getattr(model, value)
+        # Records missing the measure are counted but carry no weight
+        weights = case((measure.is_not(None), getattr(model, weight) if weight else 1.0))
+        statement = select(
+            group,
+            func.count(),
+            func.coalesce(func.sum(measure), 0.0),
+            func.coalesce(func.sum(weights), 0.0),
+            func.coalesce(func.sum(measure * weights), 0.0),
+        ).group_by(group)
+        with self.session_factory() as session:
+            rows = session.execute(statement).all()
+        return ranked_groups(
+            [
+                group_total(label, count, total, weight_total, weighted_total, weight is not None)
+                for label, count, total, weight_total, weighted_total in rows
+            ]
+        )
+
+    def search(self, query: str, limit: int = 20) -> List[Record]:
+        """Prefix search ranked the same way as the JSON store.
+
+        The database narrows each table to rows containing every term (at most
+        ``SEARCH_SCAN_LIMIT``), then a throwaway text index ranks them.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        hits = []
+        for table in (self.deals, self.brokers, self.portfolios, self.allocations):
+            name = table.model.__tablename__
+            weights = SEARCH_FIELDS[name]
+            columns = [getattr(table.model, field) for field in weights]
+            statement = (
+                select(table.model)
+                .where(*(or_(*(func.lower(c).contains(t) for c in columns)) for t in set(terms)))
+                .order_by(table.model.id)
+                .limit(SEARCH_SCAN_LIMIT)
+            )
+            with self.session_factory() as session:
+                records = {
+                    getattr(row, table.key_field): table.to_record(row)
+                    for row in session.scalars(statement)
+                }
+            index = TextIndex(weights)
+            for key, record in records.items():
+                index.add(key, record)
+            for score, key in index.search(terms, limit):
+                hits.append(search_hit(name, table.key_field, records[key], score))
+        return top_hits(hits, limit)
+
+    # Deal operations
+    def get_deals(self) -> List[Record]:
+        return self._all(self.deals)
+
+    def get_deal(self, deal_id: str) -> Optional[Record]:
+        return self._get(self.deals, deal_id)
+
+    def query_deals(
+        self,
+        status: Optional[str] = None,
+        client: Optional[str] = None,
+        owner: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        start_date_from: Optional[date] = None,
+        start_date_to: Optional[date] = None,
+        end_date_from: Optional[date] = None,
+        end_date_to: Optional[date] = None,
+        sort: Optional[str] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Position] = None,
+    ) -> Page:
+        where: List[Any] = []
+        column: Any
+        for column, value in ((Deal.status, status), (Deal.client, client), (Deal.owner, owner)):
+            if value is not None:
+                where.append(column == value)
+        bounds = (
+            (Deal.amount, min_amount, max_amount),
+            (Deal.start_date, start_date_from, start_date_to),
+            (Deal.end_date, end_date_from, end_date_to),
+        )
+        for column, low, high in bounds:
+            if low is not None:
+                where.append(column >= _parse_bound(column, low))
+            if high is not None:
+                where.append(column <= _parse_bound(column, high))
+        return self._query(self.deals, where, sort, skip, limit, after)
+
+    def create_deal(self, deal_data: Record) -> Record:
+        return self._create(self.deals, deal_data)
+
+    def update_deal(self, deal_id: str, deal_data: Record) -> Optional[Record]:
+        return self._update(self.deals, deal_id, deal_data)
+
+    def delete_deal(self, deal_id: str) -> bool:
+        return self._delete(self.deals, deal_id)
+
+    def bulk_create_deals(self, deals: List[Record]) -> List[Record]:
+        return self._bulk_create(self.deals, deals)
+
+    def bulk_update_deals(self, changes: List[Record]) -> List[Record]:
+        return self._bulk_update(self.deals, changes)
+
+    def bulk_delete_deals(self, deal_ids: List[str]) -> int:
+        return self._bulk_delete(self.deals, deal_ids)
+
+    # Broker operations
+    def get_brokers(self) -> List[Record]:
+        return self._all(self.brokers)
+
+    def get_broker(self, broker_id: str) -> Optional[Record]:
+        return self._get(self.brokers, broker_id)
+
+    def query_brokers(
+        self, skip: int = 0, limit: Optional[int] = None, after: Optional[Position] = None
+    ) -> Page:
+        return self._query(self.brokers, skip=skip, limit=limit, after=after)
+
+    def create_broker(self, broker_data: Record) -> Record:
+        return self._create(self.brokers, broker_data)
+
+    def update_broker(self, broker_id: str, broker_data: Record) -> Optional[Record]:
+        return self._update(self.brokers, broker_id, broker_data)
+
+    def delete_broker(self, broker_id: str) -> bool:
+        return self._delete(self.brokers, broker_id)
+
+    def bulk_create_brokers(self, brokers: List[Record]) -> List[Record]:
+        return self._bulk_create(self.brokers, brokers)
+
+    def bulk_update_brokers(self, changes: List[Record]) -> List[Record]:
+        return self._bulk_update(self.brokers, changes)
+
+    def bulk_delete_brokers(self, broker_ids: List[str]) -> int:
+        return self._bulk_delete(self.brokers, broker_ids)
+
+    # Portfolio operations
+    def get_portfolios(self) -> List[Record]:
+        return self._all(self.portfolios)
+
+    def get_portfolio(self, portfolio_id: str) -> Optional[Record]:
+        return self._get(self.portfolios, portfolio_id)
+
+    def query_portfolios(
+        self, skip: int = 0, limit: Optional[int] = None, after: Optional[Position] = None
+    ) -> Page:
+        return self._query(self.portfolios, skip=skip, limit=limit, after=after)
+
+    def create_portfolio(self, portfolio_data: Record) -> Record:
+        return self._create(self.portfolios, portfolio_data)
+
+    def update_portfolio(self, portfolio_id: str, portfolio_data: Record) -> Optional[Record]:
+        return self._update(self.portfolios, portfolio_id, portfolio_data)
+
+    def delete_portfolio(self, portfolio_id: str) -> bool:
+        return self._delete(self.portfolios, portfolio_id)
+
+    def bulk_create_portfolios(self, portfolios: List[Record]) -> List[Record]:
+        return self._bulk_create(self.portfolios, portfolios)
+
+    def bulk_update_portfolios(self, changes: List[Record]) -> List[Record]:
+        return self._bulk_update(self.portfolios, changes)
+
+    def bulk_delete_portfolios(self, portfolio_ids: List[str]) -> int:
+        return self._bulk_delete(self.portfolios, portfolio_ids)
+
+    # Allocation operations
+    def get_allocations(self) -> List[Record]:
+        return self._all(self.allocations)
+
+    def get_allocation(self, allocation_id: int) -> Optional[Record]:
+        return self._get(self.allocations, allocation_id)
+
+    def query_allocations(
+        self, skip: int = 0, limit: Optional[int] = None, after: Optional[Position] = None
+    ) -> Page:
+        return self._query(self.allocations, skip=skip, limit=limit, after=after)
+
+    def create_allocation(self, allocation_data: Record) -> Record:
+        return self._create(self.allocations, allocation_data)
+
+    def update_allocation(self, allocation_id: int, allocation_data: Record) -> Optional[Record]:
+        return self._update(self.allocations, allocation_id, allocation_data)
+
+    def delete_allocation(self, allocation_id: int) -> bool:
+        return self._delete(self.allocations, allocation_id)
+
+    def bulk_create_allocations(self, allocations: List[Record]) -> List[Record]:
+        return self._bulk_create(self.allocations, allocations)
+
+    def bulk_update_allocations(self, changes: List[Record]) -> List[Record]:
+        return self._bulk_update(self.allocations, changes)
+
+    def bulk_delete_allocations(self, allocation_ids: List[int]) -> int:
+        return self._bulk_delete(self.allocations, allocation_ids)
@@ -3,12 +3,50 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+
+def build_engine(url: str):
+    """Create an engine, pooling connections for server databases."""
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False}, echo=settings.DEBUG)
+    return create_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        echo=settings.DEBUG,
+    )
+
+
+def async_database_url(url: str) -> str:
+    """The async-driver form of a sync SQLAlchemy URL (aiosqlite, asyncpg)."""
+    for sync_prefix, async_prefix in (
+        ("sqlite://", "sqlite+aiosqlite://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+
+def build_async_engine(url: str):
+    """Create an AsyncEngine for ``url``; needs the matching async driver installed."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = async_database_url(url)
+    if url.startswith("sqlite"):
+        return create_async_engine(url, echo=settings.DEBUG)
+    return create_async_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        echo=settings.DEBUG,
+    )
+
+
 # Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
-    echo=settings.DEBUG
-)
+engine = build_engine(settings.sql_database_url)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -31,3 +69,39 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# The async engine is built on first use so the async drivers stay optional
+_async_engine = None
+_async_sessionmaker = None
+
+
+def get_async_engine():
+    """Process-wide AsyncEngine for ``settings.sql_database_url``."""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = build_async_engine(settings.sql_database_url)
+    return _async_engine
+
+
+def get_async_sessionmaker():
+    """Factory of AsyncSessions bound to :func:`get_async_engine`."""
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_sessionmaker = async_sessionmaker(get_async_engine(), expire_on_commit=False)
+    return _async_sessionmaker
+
+
+async def get_async_db():
+    """
+    Dependency to get an async database session.
+
+    Usage:
+        @app.get("/items")
+        async def read_items(db: AsyncSession = Depends(get_async_db)):
+            return (await db.scalars(select(Item))).all()
+    """
+    async with get_async_sessionmaker()() as db:
+        yield db
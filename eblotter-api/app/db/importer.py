@@ -0,0 +1,240 @@
+"""
+Streaming bulk import into the SQL backend.
+
+Reads CSV or NDJSON in chunks of ``--batch-size`` rows and validates each
+chunk in one call to a Pydantic ``TypeAdapter`` over the table's Create
+schema. Each chunk is inserted with a single Core ``executemany``, and the
+import commits every ``--commit-every`` rows, so a file of any size loads
+in bounded memory and bounded transactions. ORM objects are never built.
+
+If the import stops on an error, the rows in earlier transactions stay
+committed and the report says how many.
+
+Usage:
+    python -m app.db.importer allocations book.csv --batch-size 5000
+    python -m app.db.importer deals deals.ndjson --database-url sqlite:///./eblotter.db
+"""
+
+import argparse
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Type
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app.data.sql_store import bump_version
+from app.db.base import Base, build_engine
+from app.models.deal import Allocation, Broker, CollectionVersion, Deal, Portfolio
+from app.schemas.deal import AllocationCreate, BrokerCreate, DealCreate, PortfolioCreate
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None  # type: ignore[assignment]
+
+BATCH_SIZE = 5000
+COMMIT_EVERY = 50_000
+
+# Validates a chunk of rows against one Create schema
+ChunkAdapter = TypeAdapter[List[Any]]
+
+# Table and Create schema behind each import target
+TARGETS: Dict[str, Tuple[Type[Base], ChunkAdapter]] = {
+    "deals": (Deal, TypeAdapter(List[DealCreate])),
+    "allocations": (Allocation, TypeAdapter(List[AllocationCreate])),
+    "brokers": (Broker, TypeAdapter(List[BrokerCreate])),
+    "portfolios": (Portfolio, TypeAdapter(List[PortfolioCreate])),
+}
+
+
+class ImportFailed(ValueError):
+    """Raised when rows fail validation or the database rejects a chunk.
+
+    ``committed`` rows were already saved by earlier transactions.
+    """
+
+    def __init__(self, message: str, committed: int):
+        super().__init__(f"{message} ({committed} row(s) committed before the failure)")
+        self.committed = committed
+
+
+class ImportResult(NamedTuple):
+    rows: int
+    skipped: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def read_csv(path: Path) -> Iterator[Dict[str, Any]]:
+    """Rows of a CSV file with a header line; empty cells read as missing."""
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield {name: value for name, value in row.items() if value != ""}
+
+
+def read_ndjson(path: Path) -> Iterator[Dict[str, Any]]:
+    """One JSON object per non-blank line."""
+    loads = orjson.loads if orjson is not None else json.loads
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+READERS: Dict[str, Callable[[Path], Iterator[Dict[str, Any]]]] = {
+    "csv": read_csv,
+    "ndjson": read_ndjson,
+}
+
+
+def detect_format(path: Path) -> str:
+    return "csv" if path.suffix.lower() == ".csv" else "ndjson"
+
+
+def chunks(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(records)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _validate(
+    adapter: ChunkAdapter,
+    chunk: List[Dict[str, Any]],
+    first_row: int,
+    skip_invalid: bool,
+    committed: int,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Column values for the valid rows of ``chunk`` and the number skipped."""
+    try:
+        return adapter.dump_python(adapter.validate_python(chunk)), 0
+    except ValidationError as exc:
+        bad = sorted({int(error["loc"][0]) for error in exc.errors()})
+        if not skip_invalid:
+            first = next(e for e in exc.errors() if e["loc"][0] == bad[0])
+            field = ".".join(str(part) for part in first["loc"][1:])
+            raise ImportFailed(
+                f"Row {first_row + bad[0]}: {field}: {first['msg']}", committed
+            ) from None
+        rejected = set(bad)
+        valid = [row for i, row in enumerate(chunk) if i not in rejected]
+        return adapter.dump_python(adapter.validate_python(valid)), len(bad)
+
+
+def import_records(
+    engine: Engine,
+    target: str,
+    records: Iterable[Dict[str, Any]],
+    batch_size: int = BATCH_SIZE,
+    commit_every: int = COMMIT_EVERY,
+    skip_invalid: bool = False,
+    progress: Optional[Callable[[int, float], None]] = None,
+) -> ImportResult:
+    """Validate and insert ``records`` into the ``target`` table.
+
+    ``progress(rows, seconds)`` is called after every commit.
+    """
+    model, adapter = TARGETS[target]
+    columns = set(model.__table__.columns.keys())
+    statement = insert(model.__table__)
+    Base.metadata.create_all(bind=engine, tables=[model.__table__, CollectionVersion.__table__])
+
+    start = time.perf_counter()
+    committed = skipped = pending = 0
+    first_row = 1
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            for chunk in chunks(records, batch_size):
+                rows, rejected = _validate(adapter, chunk, first_row, skip_invalid, committed)
+                skipped += rejected
+                values = [{k: v for k, v in row.items() if k in columns} for row in rows]
+                if values:
+                    connection.execute(statement, values)
+                first_row += len(chunk)
+                pending += len(values)
+                if pending >= commit_every:
+                    # Read caches over the table see the new rows
+                    bump_version(connection, model.__tablename__)
+                    transaction.commit()
+                    committed += pending
+                    pending = 0
+                    if progress is not None:
+                        progress(committed, time.perf_counter() - start)
+                    transaction = connection.begin()
+            if pending:
+                bump_version(connection, model.__tablename__)
+            transaction.commit()
+        except ImportFailed:
+            transaction.rollback()
+            raise
+        except Exception as exc:
+            transaction.rollback()
+            raise ImportFailed(f"Near row {first_row}: {exc}", committed) from exc
+    committed += pending
+    return ImportResult(committed, skipped, time.perf_counter() - start)
+
+
+def import_file(
+    engine: Engine, target: str, path: Path, file_format: Optional[str] = None, **options
+) -> ImportResult:
+    """Stream ``path`` (CSV or NDJSON, from its suffix by default) into ``target``."""
+    reader = READERS[file_format or detect_format(path)]
+    return import_records(engine, target, reader(path), **options)
+
+
+def main(argv: Optional[List[str]] = None):
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Bulk import CSV or NDJSON into the database.")
+    parser.add_argument("target", choices=TARGETS)
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=READERS, dest="file_format")
+    parser.add_argument(
+        "--batch-size", type=int, default=BATCH_SIZE, help="rows validated and inserted together"
+    )
+    parser.add_argument(
+        "--commit-every", type=int, default=COMMIT_EVERY, help="rows per transaction"
+    )
+    parser.add_argument(
+        "--skip-invalid",
+        action="store_true",
+        help="drop rows that fail validation instead of stopping",
+    )
+    parser.add_argument("--database-url", default=settings.sql_database_url)
+    args = parser.parse_args(argv)
+
+    def report(rows: int, seconds: float):
+        print(f"  {rows:,} rows committed ({rows / seconds:,.0f} rows/s)")
+
+    engine = build_engine(args.database_url)
+    try:
+        result = import_file(
+            engine,
+            args.target,
+            args.path,
+            args.file_format,
+            batch_size=args.batch_size,
+            commit_every=args.commit_every,
+            skip_invalid=args.skip_invalid,
+            progress=report,
+        )
+    except ImportFailed as exc:
+        parser.exit(1, f"Import failed: {exc}\n")
+    finally:
+        engine.dispose()
+    print(
+        f"Imported {result.rows:,} {args.target} in {result.seconds:.2f}s "
+        f"({result.rows_per_second:,.0f} rows/s), skipped {result.skipped:,} invalid row(s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
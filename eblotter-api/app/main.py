@@ -3,8 +3,22 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.api import deals, allocations, brokers, portfolios
-from app.data.json_store import json_store
+from app.api import (
+    deals,
+    allocations,
+    analytics,
+    brokers,
+    metrics,
+    portfolios,
+    profiling,
+    search,
+    stream,
+)
+from app.api.idempotency import REPLAYED_HEADER, IdempotencyMiddleware
+from app.api.metrics import MetricsMiddleware
+from app.api.profiling import ProfilingMiddleware
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.data.repository import get_repository
 
 
 @asynccontextmanager
@@ -13,15 +27,19 @@ async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Starting eBlotter API...")
 
-    # Load JSON data
-    json_store.load_data()
-    print("✅ JSON data loaded successfully")
+    # Load JSON data or prepare the database, depending on DATABASE_URL
+    get_repository().load_data()
+    # Name the backend, since DATABASE_URL alone decides it (json:// by default)
+    backend = "JSON files" if settings.uses_json_store else settings.DATABASE_URL.split(":", 1)[0]
+    print(f"✅ Data store ready ({backend})")
 
     print("✅ eBlotter API started successfully!")
     yield
 
     # Shutdown
     print("👋 Shutting down eBlotter API...")
+    # Drain writes still queued by a batched flush policy
+    get_repository().close()
 
 
 # Create FastAPI app
@@ -31,13 +49,24 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# CORS middleware
+# Replay retried writes that carry an Idempotency-Key
+app.add_middleware(IdempotencyMiddleware)
+
+# Profile requests that present the profiling token (or are sampled)
+app.add_middleware(ProfilingMiddleware)
+
+# Time every request, replays included
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# CORS middleware (added last so it wraps everything else)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.allowed_origins_list,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", REPLAYED_HEADER],
 )
 
 # Include routers
@@ -45,6 +74,12 @@ app.include_router(deals.router, prefix=settings.API_PREFIX)
 app.include_router(allocations.router, prefix=settings.API_PREFIX)
 app.include_router(brokers.router, prefix=settings.API_PREFIX)
 app.include_router(portfolios.router, prefix=settings.API_PREFIX)
+app.include_router(analytics.router, prefix=settings.API_PREFIX)
+app.include_router(search.router, prefix=settings.API_PREFIX)
+app.include_router(stream.router, prefix=settings.API_PREFIX)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
+app.include_router(profiling.router)
 
 
 @app.get("/")
@@ -48,6 +48,7 @@ class Allocation(Base):
     execution_date = Column(Date)
     execution_reason = Column(String(100))
     execution_notes = Column(String(1000))
+    portfolio_id = Column(String(50), index=True)  # Account the allocation went to
 
     # Audit fields
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -88,3 +89,16 @@ class Portfolio(Base):
     # Audit fields
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class CollectionVersion(Base):
+    """Write counter of one table, bumped in the same transaction as each write.
+
+    Read caches compare it with one primary-key lookup to tell whether the
+    table changed, in this process or any other.
+    """
+
+    __tablename__ = "collection_versions"
+
+    collection = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
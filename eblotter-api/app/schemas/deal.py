@@ -1,5 +1,5 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Any, Dict, List, Literal, Optional, Union
 from datetime import date, datetime
 
 
@@ -32,6 +32,11 @@ class DealUpdate(BaseModel):
     owner: Optional[str] = None
 
 
+class DealBulkUpdate(DealUpdate):
+    """Schema for one item of a bulk Deal update."""
+    deal_id: str
+
+
 class DealResponse(BaseModel):
     """Schema for Deal response with camelCase for frontend compatibility."""
     id: str
@@ -64,6 +69,27 @@ class DealResponse(BaseModel):
         )
 
 
+def deal_response_dict(deal: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a stored deal straight to the DealResponse wire format.
+
+    Store records were validated on the way in, so this skips building and
+    re-validating a DealResponse model; the keys and defaults mirror it.
+    """
+    get = deal.get
+    return {
+        "id": deal["deal_id"],
+        "dealName": deal["deal_name"],
+        "client": get("client", ""),
+        "amount": get("amount", 0),
+        "currency": "USD",
+        "status": get("status", "Pending"),
+        "startDate": get("start_date", ""),
+        "endDate": get("end_date", ""),
+        "owner": get("owner", ""),
+        "region": "North America",
+    }
+
+
 # Allocation Schemas
 class AllocationBase(BaseModel):
     """Base schema for Allocation."""
@@ -82,6 +108,7 @@ class AllocationBase(BaseModel):
     execution_date: Optional[date] = None
     execution_reason: Optional[str] = None
     execution_notes: Optional[str] = None
+    portfolio_id: Optional[str] = None
 
 
 class AllocationCreate(AllocationBase):
@@ -94,6 +121,11 @@ class AllocationUpdate(AllocationBase):
     pass
 
 
+class AllocationBulkUpdate(AllocationUpdate):
+    """Schema for one item of a bulk Allocation update."""
+    id: int
+
+
 class AllocationResponse(AllocationBase):
     """Schema for Allocation response."""
     id: int
@@ -103,6 +135,62 @@ class AllocationResponse(AllocationBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class AllocationDemand(BaseModel):
+    """Schema for one portfolio's demand in an allocation plan."""
+    portfolio_id: str
+    demand: float = Field(ge=0)
+    tier: Optional[str] = None  # Tiered: a key of tier_weights
+    priority: Optional[int] = None  # Priority: lower levels fill first
+    weight: Optional[float] = Field(None, ge=0)  # Custom
+
+
+class AllocationPlanRequest(BaseModel):
+    """Schema for splitting a deal circle across portfolio demands."""
+    deal_circle: Optional[str] = None
+    circle_size: float = Field(gt=0)
+    allocation_type: Literal["Pro Rata", "Tiered", "Priority", "Equal", "Custom"]
+    allocation_rounding: Optional[float] = Field(None, gt=0)  # lot size
+    tier_weights: Dict[str, float] = {}
+    demands: List[AllocationDemand] = Field(min_length=1)
+    persist: bool = False
+    template: Optional[AllocationCreate] = None  # other fields of persisted allocations
+
+    @model_validator(mode="after")
+    def check_demands(self):
+        if len({d.portfolio_id for d in self.demands}) < len(self.demands):
+            raise ValueError("each portfolio_id may appear only once")
+        if self.allocation_type == "Tiered":
+            if any(d.tier not in self.tier_weights for d in self.demands):
+                raise ValueError("Tiered needs every demand's tier in tier_weights")
+        elif self.allocation_type == "Priority":
+            if any(d.priority is None for d in self.demands):
+                raise ValueError("Priority needs a priority on every demand")
+        elif self.allocation_type == "Custom":
+            if any(d.weight is None for d in self.demands):
+                raise ValueError("Custom needs a weight on every demand")
+        return self
+
+
+class PlannedAllocation(BaseModel):
+    """Schema for one portfolio's share of an allocation plan."""
+    portfolio_id: str
+    demand: float
+    allocation: float
+    fill_rate: float  # allocation / demand, 0 for no demand
+
+
+class AllocationPlan(BaseModel):
+    """Schema for an allocation plan and, when persisted, the stored allocations."""
+    deal_circle: Optional[str] = None
+    allocation_type: str
+    circle_size: float
+    allocation_rounding: Optional[float] = None
+    allocated: float
+    unallocated: float
+    allocations: List[PlannedAllocation]
+    created: List[AllocationResponse] = []
+
+
 # Broker Schemas
 class BrokerBase(BaseModel):
     """Base schema for Broker."""
@@ -122,6 +210,11 @@ class BrokerUpdate(BaseModel):
     status: Optional[str] = None
 
 
+class BrokerBulkUpdate(BrokerUpdate):
+    """Schema for one item of a bulk Broker update."""
+    broker_id: str
+
+
 class BrokerResponse(BrokerBase):
     """Schema for Broker response."""
     id: int
@@ -162,6 +255,11 @@ class PortfolioUpdate(BaseModel):
     performance: Optional[float] = None
 
 
+class PortfolioBulkUpdate(PortfolioUpdate):
+    """Schema for one item of a bulk Portfolio update."""
+    portfolio_id: str
+
+
 class PortfolioResponse(PortfolioBase):
     """Schema for Portfolio response."""
     id: int
@@ -169,3 +267,23 @@ class PortfolioResponse(PortfolioBase):
     updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+# Search Schemas
+class SearchHit(BaseModel):
+    """Schema for one search result."""
+    type: str  # deal, broker, portfolio, allocation
+    id: int
+    key: Union[str, int]  # deal_id, broker_id, portfolio_id or allocation id
+    label: str
+    score: float
+
+
+# Analytics Schemas
+class GroupTotal(BaseModel):
+    """Schema for one group of an analytics breakdown."""
+    group: Optional[str] = None  # None collects records without a value
+    count: int
+    total: float
+    mean: Optional[float] = None  # weighted by `weight` when it is set
+    weight: Optional[float] = None
@@ -0,0 +1,442 @@
+"""
+ASGI-level throughput and latency for every API route.
+
+Serves a synthetic book from ``benchmarks.generate`` through the real
+application and middleware stack, in process over ``httpx.ASGITransport``,
+so figures exclude the network and the server but include routing,
+validation, the store and encoding. Each scenario runs its requests from
+``--concurrency`` concurrent clients and reports requests/s with p50, p90
+and p99 latency. Writes run after the reads, creating the rows they later
+update and delete. The response cache is off unless ``--cache`` is given.
+
+The SSE stream (``/stream/``) never completes a response and is left out, as
+are the ``/profiles`` downloads, which only answer when profiling is on.
+
+Usage:
+    python -m benchmarks.bench_api --preset 10k --concurrency 8 --output api.json
+"""
+
+import argparse
+import asyncio
+import random
+import shutil
+import sys
+import tempfile
+import time
+from itertools import count
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import httpx
+from fastapi.routing import APIRoute
+
+from benchmarks.generate import PRESETS, generate, write
+from benchmarks.results import emit, latency_summary, report
+from app.api.caching import response_cache
+from app.core.config import settings
+from app.data.async_store import AsyncRepository, get_async_store
+from app.data.json_store import JSONStore
+from app.main import app
+
+EXCLUDED_ROUTES = {
+    ("GET", settings.API_PREFIX + "/stream/"),
+    ("GET", "/profiles/"),
+    ("GET", "/profiles/{profile_id}"),
+}
+
+Request = Tuple[str, Optional[Any]]
+
+
+class Scenario(NamedTuple):
+    """``count`` requests to ``route`` built by ``build(i)`` as (url, json body)."""
+
+    name: str
+    method: str
+    route: str
+    build: Callable[[int], Request]
+    count: int
+    on_response: Optional[Callable[[httpx.Response], None]] = None
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, concurrency: int):
+    latencies: List[float] = []
+    errors = 0
+    indexes = count()
+
+    async def worker():
+        nonlocal errors
+        clock = time.perf_counter
+        while (i := next(indexes)) < scenario.count:
+            url, body = scenario.build(i)
+            start = clock()
+            response = await client.request(scenario.method, url, json=body)
+            await response.aread()
+            latencies.append(clock() - start)
+            if response.status_code >= 400:
+                errors += 1
+            elif scenario.on_response is not None:
+                scenario.on_response(response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, scenario.count))))
+    return latency_summary(
+        scenario.name,
+        latencies,
+        time.perf_counter() - started,
+        method=scenario.method,
+        route=scenario.route,
+        errors=errors,
+    )
+
+
+def scenarios(data: Dict[str, List[Dict[str, Any]]], args) -> List[Scenario]:
+    api = settings.API_PREFIX
+    rng = random.Random(args.seed)
+    reads, writes, heavy = args.requests, args.write_requests, max(1, args.requests // 100)
+    size = args.bulk_size
+    deal_ids = [d["deal_id"] for d in data["deals"]]
+    allocation_ids = [a["id"] for a in data["allocations"]]
+    broker_ids = [b["broker_id"] for b in data["brokers"]]
+    portfolio_ids = [p["portfolio_id"] for p in data["portfolios"]]
+    clients = sorted({d["client"] for d in data["deals"]})
+    created_allocations: List[int] = []
+    bulk_allocations: List[List[int]] = []
+    demands = [
+        {"portfolio_id": f"ACCT-{n:04d}", "demand": rng.randrange(10, 5000) * 100_000}
+        for n in range(1000)
+    ]
+
+    def get(path: str) -> Callable[[int], Request]:
+        return lambda i: (path, None)
+
+    def pick(path: str, keys: List[Any]) -> Callable[[int], Request]:
+        return lambda i: (path.format(rng.choice(keys)), None)
+
+    plan = [
+        Scenario("root", "GET", "/", get("/"), reads),
+        Scenario("health", "GET", "/health", get("/health"), reads),
+        Scenario("metrics", "GET", "/metrics", get("/metrics"), reads // 10),
+        Scenario("deals.list", "GET", f"{api}/deals/", get(f"{api}/deals/"), reads),
+        Scenario(
+            "deals.list.filtered",
+            "GET",
+            f"{api}/deals/",
+            lambda i: (f"{api}/deals/?status=Active&client={rng.choice(clients)}", None),
+            reads,
+        ),
+        Scenario(
+            "deals.list.sorted_1000",
+            "GET",
+            f"{api}/deals/",
+            get(f"{api}/deals/?sort=-amount&min_amount=100000&limit=1000"),
+            reads // 10,
+        ),
+        Scenario(
+            "deals.get",
+            "GET",
+            f"{api}/deals/{{deal_id}}",
+            pick(f"{api}/deals/{{}}", deal_ids),
+            reads,
+        ),
+        Scenario(
+            "deals.export.ndjson", "GET", f"{api}/deals/export", get(f"{api}/deals/export"), heavy
+        ),
+        Scenario(
+            "deals.export.csv",
+            "GET",
+            f"{api}/deals/export",
+            get(f"{api}/deals/export?format=csv"),
+            heavy,
+        ),
+        Scenario(
+            "allocations.list", "GET", f"{api}/allocations/", get(f"{api}/allocations/"), reads
+        ),
+        Scenario(
+            "allocations.get",
+            "GET",
+            f"{api}/allocations/{{allocation_id}}",
+            pick(f"{api}/allocations/{{}}", allocation_ids),
+            reads,
+        ),
+        Scenario(
+            "allocations.export",
+            "GET",
+            f"{api}/allocations/export",
+            get(f"{api}/allocations/export"),
+            heavy,
+        ),
+        Scenario(
+            "allocations.compute.1000",
+            "POST",
+            f"{api}/allocations/compute",
+            lambda i: (
+                f"{api}/allocations/compute",
+                {
+                    "circle_size": 250_000_000,
+                    "allocation_type": "Pro Rata",
+                    "allocation_rounding": 1000,
+                    "demands": demands,
+                },
+            ),
+            heavy,
+        ),
+        Scenario("brokers.list", "GET", f"{api}/brokers/", get(f"{api}/brokers/"), reads),
+        Scenario(
+            "brokers.get",
+            "GET",
+            f"{api}/brokers/{{broker_id}}",
+            pick(f"{api}/brokers/{{}}", broker_ids),
+            reads,
+        ),
+        Scenario("portfolios.list", "GET", f"{api}/portfolios/", get(f"{api}/portfolios/"), reads),
+        Scenario(
+            "portfolios.get",
+            "GET",
+            f"{api}/portfolios/{{portfolio_id}}",
+            pick(f"{api}/portfolios/{{}}", portfolio_ids),
+            reads,
+        ),
+        Scenario(
+            "analytics.deals",
+            "GET",
+            f"{api}/analytics/deals",
+            get(f"{api}/analytics/deals?by=client"),
+            heavy,
+        ),
+        Scenario(
+            "analytics.allocations",
+            "GET",
+            f"{api}/analytics/allocations",
+            get(f"{api}/analytics/allocations?by=broker"),
+            heavy,
+        ),
+        Scenario(
+            "analytics.portfolios",
+            "GET",
+            f"{api}/analytics/portfolios",
+            get(f"{api}/analytics/portfolios?by=strategy"),
+            heavy,
+        ),
+        Scenario(
+            "search",
+            "GET",
+            f"{api}/search/",
+            lambda i: (f"{api}/search/?q={rng.choice(['alpha', 'proj', 'gold', 'nova'])}", None),
+            reads,
+        ),
+    ]
+
+    # Writes: each key family is created, then updated, then deleted
+    for collection, key, body in (
+        ("deals", "deal_id", {"deal_name": "Benchmark", "status": "Pending", "amount": 1e6}),
+        ("brokers", "broker_id", {"broker_name": "Benchmark Securities", "status": "Active"}),
+        ("portfolios", "portfolio_id", {"portfolio_name": "Benchmark Fund", "aum": 1e8}),
+    ):
+        tag = collection[:4].upper()
+        base = f"{api}/{collection}"
+        batches = max(1, writes // 10)
+        plan += [
+            Scenario(
+                f"{collection}.create",
+                "POST",
+                f"{base}/",
+                lambda i, tag=tag, key=key, body=body, base=base: (
+                    f"{base}/",
+                    {key: f"B{tag}-{i:07d}", **body},
+                ),
+                writes,
+            ),
+            Scenario(
+                f"{collection}.update",
+                "PUT",
+                f"{base}/{{{key}}}",
+                lambda i, tag=tag, key=key, body=body, base=base: (
+                    f"{base}/B{tag}-{i:07d}",
+                    {key: f"B{tag}-{i:07d}", **body},
+                ),
+                writes,
+            ),
+            Scenario(
+                f"{collection}.delete",
+                "DELETE",
+                f"{base}/{{{key}}}",
+                lambda i, tag=tag, base=base: (f"{base}/B{tag}-{i:07d}", None),
+                writes,
+            ),
+            Scenario(
+                f"{collection}.bulk_create.{size}",
+                "POST",
+                f"{base}/bulk",
+                lambda i, tag=tag, key=key, body=body, base=base: (
+                    f"{base}/bulk",
+                    [{key: f"K{tag}-{i:05d}-{j:05d}", **body} for j in range(size)],
+                ),
+                batches,
+            ),
+            Scenario(
+                f"{collection}.bulk_update.{size}",
+                "PATCH",
+                f"{base}/bulk",
+                lambda i, tag=tag, key=key, base=base: (
+                    f"{base}/bulk",
+                    [{key: f"K{tag}-{i:05d}-{j:05d}"} for j in range(size)],
+                ),
+                batches,
+            ),
+            Scenario(
+                f"{collection}.bulk_delete.{size}",
+                "POST",
+                f"{base}/bulk/delete",
+                lambda i, tag=tag, base=base: (
+                    f"{base}/bulk/delete",
+                    [f"K{tag}-{i:05d}-{j:05d}" for j in range(size)],
+                ),
+                batches,
+            ),
+        ]
+
+    # Allocation ids are assigned by the store, so later steps use the returned ones
+    allocation = {"cusip": "BENCH0001", "deal_circle": deal_ids[0], "deal_allocation": 1e5}
+    batches = max(1, writes // 10)
+    plan += [
+        Scenario(
+            "allocations.create",
+            "POST",
+            f"{api}/allocations/",
+            lambda i: (f"{api}/allocations/", allocation),
+            writes,
+            lambda response: created_allocations.append(response.json()["id"]),
+        ),
+        Scenario(
+            "allocations.update",
+            "PUT",
+            f"{api}/allocations/{{allocation_id}}",
+            lambda i: (
+                f"{api}/allocations/{created_allocations[i]}",
+                {**allocation, "deal_allocation": 2e5},
+            ),
+            writes,
+        ),
+        Scenario(
+            "allocations.delete",
+            "DELETE",
+            f"{api}/allocations/{{allocation_id}}",
+            lambda i: (f"{api}/allocations/{created_allocations[i]}", None),
+            writes,
+        ),
+        Scenario(
+            f"allocations.bulk_create.{size}",
+            "POST",
+            f"{api}/allocations/bulk",
+            lambda i: (f"{api}/allocations/bulk", [allocation] * size),
+            batches,
+            lambda response: bulk_allocations.append([a["id"] for a in response.json()]),
+        ),
+        Scenario(
+            f"allocations.bulk_update.{size}",
+            "PATCH",
+            f"{api}/allocations/bulk",
+            lambda i: (
+                f"{api}/allocations/bulk",
+                [
+                    {"id": allocation_id, "deal_allocation": 2e5}
+                    for allocation_id in bulk_allocations[i]
+                ],
+            ),
+            batches,
+        ),
+        Scenario(
+            f"allocations.bulk_delete.{size}",
+            "POST",
+            f"{api}/allocations/bulk/delete",
+            lambda i: (f"{api}/allocations/bulk/delete", bulk_allocations[i]),
+            batches,
+        ),
+    ]
+    return plan
+
+
+def api_routes(routes) -> Iterator[Tuple[str, str]]:
+    """(method, full path) of every API route, including those of included routers."""
+    for route in routes:
+        if isinstance(route, APIRoute):
+            for method in route.methods:
+                yield method, route.path
+        elif hasattr(route, "effective_route_contexts"):
+            # Newer FastAPI keeps included routers whole rather than copying their routes
+            for context in route.effective_route_contexts():
+                if isinstance(context.original_route, APIRoute):
+                    for method in context.methods:
+                        yield method, context.path
+
+
+def uncovered_routes(plan: List[Scenario]) -> List[str]:
+    """Application routes that no scenario exercises and that are not excluded on purpose."""
+    covered = {(s.method, s.route) for s in plan} | EXCLUDED_ROUTES
+    return sorted(
+        f"{method} {path}"
+        for method, path in api_routes(app.routes)
+        if (method, path) not in covered
+    )
+
+
+async def run(plan: List[Scenario], store: AsyncRepository, concurrency: int):
+    async def override():
+        return store
+
+    app.dependency_overrides[get_async_store] = override
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return [await run_scenario(client, scenario, concurrency) for scenario in plan]
+    finally:
+        app.dependency_overrides.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--preset", choices=PRESETS, default="10k")
+    parser.add_argument("--deals", type=int, help="overrides --preset")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--layout", choices=["rows", "columnar"], default="rows")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per read route")
+    parser.add_argument("--write-requests", type=int, default=100, help="requests per write route")
+    parser.add_argument("--bulk-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on")
+    parser.add_argument("--output", type=Path, help="write results here instead of stdout")
+    args = parser.parse_args()
+
+    deals = args.deals or PRESETS[args.preset]
+    data = generate(deals, args.seed)
+    plan = scenarios(data, args)
+    missing = uncovered_routes(plan)
+    if missing:
+        print(f"Routes without a scenario: {', '.join(missing)}", file=sys.stderr)
+    if not args.cache:
+        response_cache.max_bytes = 0
+
+    data_dir = Path(tempfile.mkdtemp())
+    try:
+        write(data, data_dir)
+        store = JSONStore(data_dir=data_dir, layout=args.layout)
+        store.load_data()
+        results = asyncio.run(run(plan, AsyncRepository(store), args.concurrency))
+        store.close()
+    finally:
+        shutil.rmtree(data_dir)
+
+    params = {
+        "deals": deals,
+        "seed": args.seed,
+        "layout": args.layout,
+        "concurrency": args.concurrency,
+        "cache": args.cache,
+        "excluded_routes": sorted(" ".join(route) for route in EXCLUDED_ROUTES),
+        "uncovered_routes": missing,
+    }
+    emit(report("api", params, results), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Compare the deal list serialization paths.
+
+``model`` is the previous path: build a DealResponse per row, then let FastAPI
+validate the list against ``response_model`` and encode it. ``projection`` is
+the current path: project rows with ``deal_response_dict`` and encode them
+straight to bytes. The ``endpoint`` figure is GET /api/v1/deals/ end to end.
+
+Usage:
+    python -m benchmarks.bench_serialization --rows 10000
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+from app.api.caching import response_cache
+from app.api.responses import dumps
+from app.data.async_store import AsyncRepository, get_async_store
+from app.data.json_store import JSONStore
+from app.main import app
+from app.schemas.deal import DealResponse, deal_response_dict
+
+STATUSES = ["Active", "Pending", "Completed"]
+
+
+def make_deals(rows: int) -> List[dict]:
+    return [
+        {
+            "id": i + 1,
+            "deal_id": f"DEAL-{i + 1:07d}",
+            "deal_name": f"Project {i + 1}",
+            "client": f"Client {i % 97}",
+            "amount": float(1000 * (i % 5000)),
+            "status": STATUSES[i % len(STATUSES)],
+            "start_date": "2024-01-15",
+            "end_date": "2024-12-31",
+            "owner": f"Owner {i % 13}",
+        }
+        for i in range(rows)
+    ]
+
+
+def model_path(deals: List[dict], adapter: TypeAdapter) -> bytes:
+    responses = [
+        DealResponse(
+            id=deal["deal_id"],
+            dealName=deal["deal_name"],
+            client=deal.get("client", ""),
+            amount=deal.get("amount", 0),
+            currency="USD",
+            status=deal.get("status", "Pending"),
+            startDate=deal.get("start_date", ""),
+            endDate=deal.get("end_date", ""),
+            owner=deal.get("owner", ""),
+            region="North America",
+        )
+        for deal in deals
+    ]
+    # FastAPI re-validates the returned objects against response_model
+    validated = adapter.validate_python([r.model_dump() for r in responses])
+    return adapter.dump_json(validated)
+
+
+def projection_path(deals: List[dict]) -> bytes:
+    return dumps([deal_response_dict(deal) for deal in deals])
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    deals = make_deals(args.rows)
+    adapter = TypeAdapter(List[DealResponse])
+    results = {
+        "rows": args.rows,
+        "model_s": best_of(args.repeat, model_path, deals, adapter),
+        "projection_s": best_of(args.repeat, projection_path, deals),
+    }
+
+    data_dir = Path(tempfile.mkdtemp())
+    try:
+        (data_dir / "deals.json").write_text(json.dumps(deals))
+        store = AsyncRepository(JSONStore(data_dir=data_dir))
+
+        async def override():
+            return store
+
+        app.dependency_overrides[get_async_store] = override
+        # Measure encoding on every request, not replays from the response cache
+        response_cache.max_bytes = 0
+        client = TestClient(app)
+        results["endpoint_s"] = best_of(
+            args.repeat, client.get, f"/api/v1/deals/?limit={args.rows}"
+        )
+    finally:
+        app.dependency_overrides.clear()
+        shutil.rmtree(data_dir)
+
+    for path in ("model", "projection", "endpoint"):
+        results[f"{path}_rows_per_s"] = round(args.rows / results[f"{path}_s"])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Microbenchmarks for each JSONStore operation.
+
+Generates a synthetic book with ``benchmarks.generate``, then times loading
+(cold from JSON and from snapshots), point lookups, indexed queries, keyset
+paging, search, analytics and every kind of write for each storage layout.
+Lookups pick keys with a fixed seed, so runs are comparable.
+
+Usage:
+    python -m benchmarks.bench_store --preset 100k --output store.json
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.generate import PRESETS, generate, write
+from benchmarks.results import emit, latency_summary, measure, report
+from app.data.json_store import JSONStore
+
+
+def _load(data_dir: Path, layout: str, snapshots: bool, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        store = JSONStore(data_dir=data_dir, layout=layout, snapshots=snapshots)
+        start = time.perf_counter()
+        store.load_data()
+        timings.append(time.perf_counter() - start)
+        store.close()
+    return timings
+
+
+def bench_layout(
+    data: Dict[str, List[Dict[str, Any]]], data_dir: Path, layout: str, args
+) -> List[Dict[str, Any]]:
+    write(data, data_dir)
+    prefix = f"{layout}."
+    results = []
+
+    timings = _load(data_dir, layout, False, args.load_repeat)
+    results.append(latency_summary(prefix + "load_data.json", timings, sum(timings)))
+    _load(data_dir, layout, True, 1)  # writes the snapshots
+    timings = _load(data_dir, layout, True, args.load_repeat)
+    results.append(latency_summary(prefix + "load_data.snapshot", timings, sum(timings)))
+
+    store = JSONStore(data_dir=data_dir, layout=layout)
+    store.load_data()
+    rng = random.Random(args.seed)
+    deal_ids = [d["deal_id"] for d in data["deals"]]
+    clients = sorted({d["client"] for d in data["deals"]})
+    allocation_ids = [a["id"] for a in data["allocations"]]
+    reads = args.count
+
+    def run(name, fn, count=reads):
+        results.append(measure(prefix + name, fn, count))
+
+    run("get_deal", lambda: store.get_deal(rng.choice(deal_ids)))
+    run("get_allocation", lambda: store.get_allocation(rng.choice(allocation_ids)))
+    run("get_deal.missing", lambda: store.get_deal("DEAL-MISSING"))
+    run("version", lambda: store.version("deals"))
+    run("query_deals.status", lambda: store.query_deals(status="Active", limit=100))
+    run("query_deals.client", lambda: store.query_deals(client=rng.choice(clients), limit=100))
+    run(
+        "query_deals.amount_range",
+        lambda: store.query_deals(
+            min_amount=500_000, max_amount=1_000_000, sort="-amount", limit=100
+        ),
+    )
+    run(
+        "query_deals.date_range",
+        lambda: store.query_deals(
+            start_date_from=date(2024, 1, 1), start_date_to=date(2024, 3, 31), limit=100
+        ),
+    )
+    run("query_deals.deep_skip", lambda: store.query_deals(skip=len(deal_ids) // 2, limit=100))
+
+    def page_through():
+        # Ten consecutive keyset pages, the way the UI scrolls
+        after = None
+        for _ in range(10):
+            page = store.query_deals(sort="amount", limit=100, after=after)
+            after = page.next_position
+
+    run("query_deals.cursor_10_pages", page_through, max(1, reads // 10))
+    run("query_allocations.page", lambda: store.query_allocations(limit=100))
+    run("search.prefix", lambda: store.search("proj"))
+    run("search.words", lambda: store.search("alpha corp"))
+    heavy = max(1, reads // 100)
+    run("aggregate.deals_by_status", lambda: store.aggregate("deals", "status", "amount"), heavy)
+    run(
+        "aggregate.allocations_by_broker",
+        lambda: store.aggregate("allocations", "broker", "deal_allocation"),
+        heavy,
+    )
+    run("get_deals.all", store.get_deals, heavy)
+
+    writes = args.write_count
+    created = iter(range(writes))
+    run(
+        "create_deal",
+        lambda: store.create_deal(
+            {
+                "deal_id": f"BENCH-{next(created):07d}",
+                "deal_name": "Benchmark",
+                "client": clients[0],
+                "amount": 1_000_000.0,
+                "status": "Pending",
+                "owner": "Bench",
+            }
+        ),
+        writes,
+    )
+    updated = iter(range(writes))
+    run(
+        "update_deal",
+        lambda: store.update_deal(
+            f"BENCH-{next(updated):07d}", {"status": "Active", "amount": 2_000_000.0}
+        ),
+        writes,
+    )
+    deleted = iter(range(writes))
+    run("delete_deal", lambda: store.delete_deal(f"BENCH-{next(deleted):07d}"), writes)
+
+    batches = max(1, writes // 10)
+    size = args.bulk_size
+    batch = iter(range(batches))
+
+    def bulk_create():
+        b = next(batch)
+        store.bulk_create_deals(
+            [
+                {"deal_id": f"BULK-{b:05d}-{i:05d}", "deal_name": "Bulk", "status": "Pending"}
+                for i in range(size)
+            ]
+        )
+
+    run(f"bulk_create_deals.{size}", bulk_create, batches)
+    batch = iter(range(batches))
+    run(
+        f"bulk_update_deals.{size}",
+        lambda: store.bulk_update_deals(
+            [
+                {"deal_id": f"BULK-{b:05d}-{i:05d}", "status": "Active"}
+                for b in [next(batch)]
+                for i in range(size)
+            ]
+        ),
+        batches,
+    )
+    batch = iter(range(batches))
+    run(
+        f"bulk_delete_deals.{size}",
+        lambda: store.bulk_delete_deals(
+            [f"BULK-{b:05d}-{i:05d}" for b in [next(batch)] for i in range(size)]
+        ),
+        batches,
+    )
+    store.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--preset", choices=PRESETS, default="10k")
+    parser.add_argument("--deals", type=int, help="overrides --preset")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--layout", choices=["rows", "columnar", "both"], default="both")
+    parser.add_argument("--count", type=int, default=2000, help="calls per read operation")
+    parser.add_argument("--write-count", type=int, default=100, help="calls per write operation")
+    parser.add_argument("--bulk-size", type=int, default=100)
+    parser.add_argument("--load-repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="write results here instead of stdout")
+    args = parser.parse_args()
+
+    deals = args.deals or PRESETS[args.preset]
+    data = generate(deals, args.seed)
+    layouts = ["rows", "columnar"] if args.layout == "both" else [args.layout]
+    results = []
+    root = Path(tempfile.mkdtemp())
+    try:
+        for layout in layouts:
+            results.extend(bench_layout(data, root / layout, layout, args))
+    finally:
+        shutil.rmtree(root)
+
+    params = {
+        "deals": deals,
+        "seed": args.seed,
+        "layouts": layouts,
+        "count": args.count,
+        "write_count": args.write_count,
+        "bulk_size": args.bulk_size,
+    }
+    emit(report("store", params, results), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Results are matched by name. A result regresses when the chosen latency
+metric grew by more than ``--threshold`` (a fraction: 0.10 is 10%) against
+the baseline. Exits with status 1 if anything regressed, so it can gate CI.
+
+Usage:
+    python -m benchmarks.compare baseline.json current.json --metric p50_s
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+METRICS = ("p50_s", "p90_s", "p99_s", "mean_s", "max_s")
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    metric: str = "p50_s",
+    threshold: float = 0.10,
+) -> List[Dict[str, Any]]:
+    """One row per result present in both runs, slowest relative change first."""
+    before = {r["name"]: r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        old = before.get(result["name"])
+        if old is None or not old[metric]:
+            continue
+        change = result[metric] / old[metric] - 1
+        rows.append(
+            {
+                "name": result["name"],
+                "baseline": old[metric],
+                "current": result[metric],
+                "change": change,
+                "regressed": change > threshold,
+            }
+        )
+    return sorted(rows, key=lambda row: row["change"], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument("--metric", choices=METRICS, default="p50_s")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text())
+    rows = compare(baseline, current, args.metric, args.threshold)
+    width = max((len(row["name"]) for row in rows), default=4)
+    print(f"{'name':<{width}}  {'baseline':>12}  {'current':>12}  change")
+    for row in rows:
+        flag = "  REGRESSED" if row["regressed"] else ""
+        print(
+            f"{row['name']:<{width}}  {row['baseline'] * 1e6:>10.1f}us"
+            f"  {row['current'] * 1e6:>10.1f}us  {row['change']:+.1%}{flag}"
+        )
+    regressed = [row["name"] for row in rows if row["regressed"]]
+    if regressed:
+        print(f"\n{len(regressed)} regression(s) above {args.threshold:.0%} on {args.metric}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
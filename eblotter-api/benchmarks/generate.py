@@ -0,0 +1,248 @@
+"""
+Deterministic synthetic data for benchmarks.
+
+Produces deals, brokers, portfolios and allocations shaped like the seed
+data in ``app/db/seed.py``. A few large clients and brokers carry most of
+the book, amounts are log-normal, dates spread over recent years and every
+deal is split into a few allocations. The same ``--seed`` always
+yields byte-identical files.
+
+Usage:
+    python -m benchmarks.generate --preset 100k --out /tmp/eblotter-100k
+"""
+
+import argparse
+import json
+import random
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+PRESETS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+STATUSES = (["Active"] * 5) + (["Pending"] * 3) + (["Completed"] * 2)
+ALLOCATION_TYPES = (["Pro Rata"] * 6) + (["Tiered"] * 2) + ["Priority", "Equal", "Custom"]
+RISK_PROFILES = ["Low", "Medium", "Medium", "High", "High", "Very High"]
+STRATEGIES = ["Growth", "Value", "Balanced", "Income", "Sector Focus", "Emerging Markets"]
+BENCHMARKS = ["S&P 500", "Russell 2000", "60/40 Mix", "Barclays Agg", "MSCI EM", "NASDAQ 100"]
+BANKS = [
+    "Goldman Sachs",
+    "Morgan Stanley",
+    "JP Morgan",
+    "Bank of America",
+    "Citigroup",
+    "Barclays",
+    "Deutsche Bank",
+    "UBS",
+    "Wells Fargo",
+    "BNP Paribas",
+    "HSBC",
+    "Nomura",
+]
+FIRST_NAMES = [
+    "John",
+    "Jane",
+    "Bob",
+    "Alice",
+    "Charlie",
+    "Diana",
+    "Sarah",
+    "Michael",
+    "Emily",
+    "David",
+    "Lisa",
+    "James",
+    "Priya",
+    "Wei",
+    "Olga",
+    "Carlos",
+]
+LAST_NAMES = [
+    "Smith",
+    "Doe",
+    "Johnson",
+    "Brown",
+    "Wilson",
+    "Prince",
+    "Chen",
+    "Rodriguez",
+    "Kim",
+    "Wang",
+    "Anderson",
+    "Patel",
+    "Ivanova",
+    "Garcia",
+    "Muller",
+    "Sato",
+]
+WORDS = [
+    "Alpha",
+    "Beta",
+    "Gamma",
+    "Delta",
+    "Epsilon",
+    "Zeta",
+    "Atlas",
+    "Orion",
+    "Phoenix",
+    "Summit",
+    "Harbor",
+    "Falcon",
+    "Granite",
+    "Meridian",
+    "Nova",
+    "Vertex",
+]
+CLIENT_SUFFIXES = ["Corp", "Inc", "Holdings", "Capital", "Partners", "Group", "Labs"]
+
+EPOCH = date(2022, 1, 1)
+STAMP = datetime(2024, 6, 1, 9, 0, 0)
+
+
+def sizes(deals: int) -> Dict[str, int]:
+    """Row counts per collection for a book of ``deals`` deals."""
+    return {
+        "deals": deals,
+        "brokers": max(5, min(500, deals // 200)),
+        "portfolios": max(6, deals // 100),
+        "allocations": deals * 3,
+    }
+
+
+def _skewed(rng: random.Random, items: List[Any]) -> Any:
+    """Pick from ``items`` with a long tail: the first few are far more common."""
+    return items[min(int(rng.paretovariate(1.2)) - 1, len(items) - 1)]
+
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _day(rng: random.Random, span_days: int = 4 * 365) -> date:
+    return EPOCH + timedelta(days=rng.randrange(span_days))
+
+
+def generate(deals: int, seed: int = 42) -> Dict[str, List[Dict[str, Any]]]:
+    """Records for every collection, keyed by collection name."""
+    rng = random.Random(seed)
+    counts = sizes(deals)
+    clients = [
+        f"{rng.choice(WORDS)} {rng.choice(CLIENT_SUFFIXES)} {i}"
+        for i in range(max(10, deals // 50))
+    ]
+    owners = [_person(rng) for _ in range(max(5, deals // 1000))]
+    traders = [_person(rng) for _ in range(max(5, deals // 2000))]
+
+    broker_rows = [
+        {
+            "id": i + 1,
+            "broker_id": f"BRK-{i + 1:05d}",
+            "broker_name": BANKS[i] if i < len(BANKS) else f"{rng.choice(WORDS)} Securities {i}",
+            "status": "Active" if rng.random() < 0.9 else "Inactive",
+            "created_at": STAMP.isoformat(),
+            "updated_at": STAMP.isoformat(),
+        }
+        for i in range(counts["brokers"])
+    ]
+    broker_names = [b["broker_name"] for b in broker_rows]
+
+    portfolio_rows = [
+        {
+            "id": i + 1,
+            "portfolio_id": f"PORT-{i + 1:06d}",
+            "portfolio_name": f"{rng.choice(WORDS)} {rng.choice(STRATEGIES)} Fund {i + 1}",
+            "manager": _person(rng),
+            "strategy": rng.choice(STRATEGIES),
+            "inception_date": (EPOCH - timedelta(days=rng.randrange(3650))).isoformat(),
+            "aum": round(rng.lognormvariate(17, 1.0), -3),
+            "benchmark": rng.choice(BENCHMARKS),
+            "risk_profile": rng.choice(RISK_PROFILES),
+            "performance": round(rng.gauss(8, 6), 2),
+            "created_at": STAMP.isoformat(),
+            "updated_at": STAMP.isoformat(),
+        }
+        for i in range(counts["portfolios"])
+    ]
+
+    deal_rows = []
+    for i in range(deals):
+        start = _day(rng)
+        deal_rows.append(
+            {
+                "id": i + 1,
+                "deal_id": f"DEAL-{i + 1:07d}",
+                "deal_name": f"Project {rng.choice(WORDS)} {i + 1}",
+                "client": _skewed(rng, clients),
+                "amount": round(rng.lognormvariate(13.5, 1.2), -3),
+                "status": rng.choice(STATUSES),
+                "start_date": start.isoformat(),
+                "end_date": (start + timedelta(days=rng.randrange(30, 730))).isoformat(),
+                "owner": _skewed(rng, owners),
+            }
+        )
+
+    allocation_rows = []
+    per_deal = counts["allocations"] // max(deals, 1)
+    for deal in deal_rows:
+        cusip = f"{rng.randrange(16 ** 8):08X}{rng.randrange(10)}"
+        circle_date = date.fromisoformat(deal["start_date"])
+        security = f"{deal['client']} {rng.choice(['Sr Notes', 'Term Loan B', 'Conv Bond'])}"
+        shares = [rng.random() for _ in range(per_deal)]
+        total = sum(shares)
+        for share in shares:
+            allocation_rows.append(
+                {
+                    "id": len(allocation_rows) + 1,
+                    "deal_circle": deal["deal_id"],
+                    "desc_of_security": security,
+                    "allocation_type": rng.choice(ALLOCATION_TYPES),
+                    "circle_date": circle_date.isoformat(),
+                    "is_add_on": rng.random() < 0.1,
+                    "circle_notes": None,
+                    "deal_allocation": round(deal["amount"] * share / total, 2),
+                    "allocation_date": (circle_date + timedelta(days=rng.randrange(5))).isoformat(),
+                    "allocation_rounding": 1000.0,
+                    "cusip": cusip,
+                    "trader": _skewed(rng, traders),
+                    "broker": _skewed(rng, broker_names),
+                    "execution_date": None,
+                    "execution_reason": None,
+                    "execution_notes": None,
+                    "created_at": STAMP.isoformat(),
+                    "updated_at": STAMP.isoformat(),
+                }
+            )
+
+    return {
+        "deals": deal_rows,
+        "brokers": broker_rows,
+        "portfolios": portfolio_rows,
+        "allocations": allocation_rows,
+    }
+
+
+def write(data: Dict[str, List[Dict[str, Any]]], out: Path):
+    """Write ``data`` as the JSON files a JSONStore data directory expects."""
+    out.mkdir(parents=True, exist_ok=True)
+    for name, records in data.items():
+        with open(out / f"{name}.json", "w") as f:
+            json.dump(records, f, separators=(",", ":"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--preset", choices=PRESETS)
+    group.add_argument("--deals", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, required=True)
+    args = parser.parse_args()
+
+    deals = PRESETS[args.preset] if args.preset else args.deals
+    data = generate(deals, args.seed)
+    write(data, args.out)
+    print(json.dumps({name: len(records) for name, records in data.items()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Machine-readable benchmark results.
+
+Every benchmark writes one JSON document::
+
+    {"benchmark": "store", "meta": {...}, "results": [{"name": ..., ...}]}
+
+``meta`` records what was measured (git commit, Python, platform and the
+benchmark's own parameters). Each result carries a ``name`` plus timings in
+seconds, so two runs can be lined up by name with ``benchmarks.compare``.
+"""
+
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def latency_summary(name: str, latencies: List[float], elapsed: float, **extra) -> Dict[str, Any]:
+    """Result entry for a run of ``latencies`` (seconds) lasting ``elapsed`` seconds."""
+    ordered = sorted(latencies)
+    return {
+        "name": name,
+        "count": len(ordered),
+        "ops_per_s": round(len(ordered) / elapsed, 1) if elapsed else None,
+        "mean_s": sum(ordered) / len(ordered) if ordered else 0.0,
+        "p50_s": percentile(ordered, 0.50),
+        "p90_s": percentile(ordered, 0.90),
+        "p99_s": percentile(ordered, 0.99),
+        "max_s": ordered[-1] if ordered else 0.0,
+        **extra,
+    }
+
+
+def measure(name: str, fn: Callable[[], Any], count: int, **extra) -> Dict[str, Any]:
+    """Call ``fn`` ``count`` times and summarise the per-call latencies."""
+    latencies = []
+    clock = time.perf_counter
+    started = clock()
+    for _ in range(count):
+        start = clock()
+        fn()
+        latencies.append(clock() - start)
+    return latency_summary(name, latencies, clock() - started, **extra)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(benchmark: str, params: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "benchmark": benchmark,
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            **params,
+        },
+        "results": results,
+    }
+
+
+def emit(document: Dict[str, Any], output: Optional[Path]):
+    """Write ``document`` to ``output``, or to stdout when none is given."""
+    text = json.dumps(document, indent=2)
+    if output is None:
+        sys.stdout.write(text + "\n")
+    else:
+        output.write_text(text + "\n")
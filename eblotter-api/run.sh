@@ -25,6 +25,12 @@ if [ ! -f ".env" ]; then
     echo "Please update .env with your configuration before running in production."
 fi
 
-# Start the server
-echo "Starting FastAPI server..."
-uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
+# Start the server; WORKERS > 1 runs one process per core on a shared store
+WORKERS=${WORKERS:-1}
+if [ "$WORKERS" -gt 1 ]; then
+    echo "Starting FastAPI server with $WORKERS workers..."
+    STORE_SHARED=true uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers "$WORKERS"
+else
+    echo "Starting FastAPI server..."
+    uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
+fi
@@ -0,0 +1,64 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.api.caching import response_cache
+from app.api.idempotency import idempotency_store
+from app.data.async_store import AsyncRepository, get_async_store
+from app.data.json_store import JSONStore
+from app.data.sql_store import SQLStore
+from app.db.base import build_engine
+from app.main import app
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "app" / "data"
+
+
+@pytest.fixture
+def json_store(tmp_path):
+    """A JSONStore backed by a scratch copy of the fixture data."""
+    for data_file in DATA_DIR.glob("*.json"):
+        shutil.copy(data_file, tmp_path / data_file.name)
+    return JSONStore(data_dir=tmp_path)
+
+
+@pytest.fixture
+def sql_store(tmp_path):
+    """A SQLStore on a scratch SQLite database seeded with the fixture data."""
+    engine = build_engine(f"sqlite:///{tmp_path / 'eblotter.db'}")
+    store = SQLStore(sessionmaker(bind=engine))
+    store.load_data()
+    with engine.begin() as connection:
+        for table in (store.deals, store.brokers, store.portfolios, store.allocations):
+            records = json.loads((DATA_DIR / f"{table.model.__tablename__}.json").read_text())
+            rows = [{**table.to_values(record), "id": record["id"]} for record in records]
+            if rows:
+                connection.execute(table.model.__table__.insert(), rows)
+    yield store
+    store.close()
+
+
+@pytest.fixture(params=["json", "sql"])
+def store(request):
+    """The repository under test; API tests run against both backends."""
+    return request.getfixturevalue(f"{request.param}_store")
+
+
+@pytest.fixture
+def client(store):
+    """A TestClient whose routers use the scratch store."""
+    async_store = AsyncRepository(store)
+
+    async def override():
+        return async_store
+
+    app.dependency_overrides[get_async_store] = override
+    response_cache.clear()
+    idempotency_store.clear()
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+
+from app.data.allocation_engine import allocate
+
+DEMANDS = [100.0, 50.0, 10.0, 0.0, 40.0]
+
+
+@pytest.mark.parametrize(
+    "method, options, expected",
+    [
+        ("Pro Rata", {}, [60, 30, 6, 0, 24]),
+        # The 10 is filled; the other three share what is left equally
+        ("Equal", {}, [110 / 3, 110 / 3, 10, 0, 110 / 3]),
+        # Tier weights scale the demands to 100, 50, 10, 0 and 10
+        ("Tiered", {"weights": [1, 1, 1, 1, 0.25]}, [120 / 170 * d for d in (100, 50, 10, 0, 10)]),
+        ("Custom", {"weights": [0, 1, 1, 1, 1]}, [0, 50, 10, 0, 40]),
+        # Level 1 is filled, level 2 shares the remaining 60 pro rata
+        ("Priority", {"priorities": [2, 1, 1, 3, 2]}, [60 * 100 / 140, 50, 10, 0, 60 * 40 / 140]),
+    ],
+)
+def test_methods_never_exceed_demand(method, options, expected):
+    result = allocate(method, 120, DEMANDS, **options)
+    assert result.amounts == pytest.approx(expected, abs=1e-4)
+    assert (result.amounts <= np.array(DEMANDS) + 1e-9).all()
+    assert result.allocated + result.unallocated == pytest.approx(120)
+
+
+def test_circle_larger_than_demand_fills_everyone():
+    result = allocate("Pro Rata", 1000, DEMANDS)
+    assert result.amounts.tolist() == DEMANDS
+    assert result.unallocated == 800
+
+
+def test_lot_rounding_hands_freed_lots_to_largest_remainders():
+    # Pro rata gives 60, 30, 6, 0, 24; whole lots of 25 free one lot
+    result = allocate("Pro Rata", 120, DEMANDS, lot=25)
+    assert result.amounts.tolist() == [50, 25, 0, 0, 25]
+    assert result.unallocated == 20
+
+    # Equal gives 8.33, 8.33, 8.33, 5. The last has the largest remainder, but
+    # a lot would take it past its demand; the others tie, so input order decides
+    result = allocate("Equal", 30, [10, 10, 10, 5], lot=2)
+    assert result.amounts.tolist() == [10, 8, 8, 4]
+    assert result.fill_rates.tolist() == [1.0, 0.8, 0.8, 0.8]
+
+
+def test_thousands_of_accounts_stay_within_the_circle():
+    rng = np.random.default_rng(7)
+    demands = rng.integers(1, 5000, 10_000) * 1000.0
+    size = demands.sum() / 3
+    for method in ("Pro Rata", "Equal"):
+        result = allocate(method, size, demands, lot=1000)
+        assert result.allocated <= size
+        assert result.unallocated < 1000 * 2
+        assert (result.amounts % 1000 == 0).all() and (result.amounts <= demands).all()
+
+
+def test_compute_endpoint_returns_a_plan_without_saving(client, store):
+    before = len(store.get_allocations())
+    response = client.post(
+        "/api/v1/allocations/compute",
+        json={
+            "deal_circle": "Circle A",
+            "circle_size": 120,
+            "allocation_type": "Pro Rata",
+            "allocation_rounding": 25,
+            "demands": [
+                {"portfolio_id": "PF-1", "demand": 100},
+                {"portfolio_id": "PF-2", "demand": 50},
+                {"portfolio_id": "PF-3", "demand": 40},
+            ],
+        },
+    )
+    assert response.status_code == 200
+    plan = response.json()
+    assert [(a["portfolio_id"], a["allocation"]) for a in plan["allocations"]] == [
+        ("PF-1", 50.0),
+        ("PF-2", 25.0),
+        ("PF-3", 25.0),
+    ]
+    assert (plan["allocated"], plan["unallocated"], plan["created"]) == (100.0, 20.0, [])
+    assert len(store.get_allocations()) == before
+
+
+def test_compute_endpoint_persists_non_zero_shares(client, store):
+    response = client.post(
+        "/api/v1/allocations/compute",
+        json={
+            "deal_circle": "Circle B",
+            "circle_size": 60,
+            "allocation_type": "Priority",
+            "demands": [
+                {"portfolio_id": "PF-1", "demand": 50, "priority": 1},
+                {"portfolio_id": "PF-2", "demand": 50, "priority": 2},
+                {"portfolio_id": "PF-3", "demand": 50, "priority": 3},
+            ],
+            "persist": True,
+            "template": {"cusip": "123456AB7", "trader": "Jordan"},
+        },
+    )
+    assert response.status_code == 201
+    created = response.json()["created"]
+    assert [(a["portfolio_id"], a["deal_allocation"]) for a in created] == [
+        ("PF-1", 50.0),
+        ("PF-2", 10.0),
+    ]
+    stored = store.get_allocation(created[0]["id"])
+    assert (stored["deal_circle"], stored["allocation_type"], stored["cusip"]) == (
+        "Circle B",
+        "Priority",
+        "123456AB7",
+    )
+
+
+@pytest.mark.parametrize("store", ["json"], indirect=True)
+@pytest.mark.parametrize(
+    "body",
+    [
+        {
+            "allocation_type": "Tiered",
+            "demands": [{"portfolio_id": "PF-1", "demand": 1, "tier": "A"}],
+        },
+        {"allocation_type": "Custom", "demands": [{"portfolio_id": "PF-1", "demand": 1}]},
+        {
+            "allocation_type": "Equal",
+            "demands": [
+                {"portfolio_id": "PF-1", "demand": 1},
+                {"portfolio_id": "PF-1", "demand": 2},
+            ],
+        },
+    ],
+)
+def test_compute_endpoint_rejects_incomplete_plans(client, body):
+    response = client.post("/api/v1/allocations/compute", json={"circle_size": 10, **body})
+    assert response.status_code == 422
+
+
+def test_persisted_plan_without_template_gets_allocation_defaults(client, store):
+    response = client.post(
+        "/api/v1/allocations/compute",
+        json={
+            "deal_circle": "Circle C",
+            "circle_size": 10,
+            "allocation_type": "Equal",
+            "demands": [{"portfolio_id": "PF-1", "demand": 10}],
+            "persist": True,
+        },
+    )
+    assert response.status_code == 201
+    stored = store.get_allocation(response.json()["created"][0]["id"])
+    assert stored["is_add_on"] is False
+    assert (stored["deal_circle"], stored["deal_allocation"]) == ("Circle C", 10.0)
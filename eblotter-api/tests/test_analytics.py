@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from app.data.analytics import aggregate_records, group_by
+from app.data.json_store import JSONStore
+
+
+def test_group_by_kernel():
+    codes = np.array([0, 1, 0, 2, 1])
+    values = np.array([1.0, 2.0, 3.0, np.nan, 4.0])
+    groups = group_by(codes, ["a", "b", None], values)
+    assert groups == [
+        {"group": "b", "count": 2, "total": 6.0, "mean": 3.0, "weight": None},
+        {"group": "a", "count": 2, "total": 4.0, "mean": 2.0, "weight": None},
+        {"group": None, "count": 1, "total": 0.0, "mean": None, "weight": None},
+    ]
+
+    weights = np.array([3.0, 1.0, 1.0, 5.0, np.nan])
+    weighted = {g["group"]: g for g in group_by(codes, ["a", "b", None], values, weights)}
+    assert weighted["a"]["mean"] == pytest.approx(1.5)
+    assert weighted["a"]["weight"] == 4.0
+    assert weighted["b"]["mean"] == 2.0
+
+
+def test_columnar_matches_rows(json_store):
+    columnar = JSONStore(data_dir=json_store.data_dir, layout="columnar")
+    for i in range(200):
+        allocation = {
+            "broker": None if i % 7 == 0 else f"Broker {i % 5}",
+            "deal_allocation": None if i % 11 == 0 else 250.0 * i,
+        }
+        columnar.create_allocation(dict(allocation))
+        json_store.create_allocation(dict(allocation))
+    columnar.update_allocation(1, {**columnar.get_allocation(1), "deal_allocation": 1})
+
+    expected = aggregate_records(columnar.get_allocations(), "broker", "deal_allocation")
+    assert columnar.aggregate("allocations", "broker", "deal_allocation") == expected
+    assert columnar.aggregate("deals", "status", "amount") == json_store.aggregate(
+        "deals", "status", "amount"
+    )
+
+
+def test_deal_totals(client):
+    response = client.get("/api/v1/analytics/deals", params={"by": "status"})
+    assert response.status_code == 200
+    assert [(g["group"], g["count"], g["total"]) for g in response.json()] == [
+        ("Pending", 2, 3500000.0),
+        ("Active", 3, 2507000.0),
+        ("Completed", 1, 2000000.0),
+    ]
+    etag = response.headers["ETag"]
+    assert (
+        client.get(
+            "/api/v1/analytics/deals", params={"by": "status"}, headers={"If-None-Match": etag}
+        ).status_code
+        == 304
+    )
+
+    deal = {"deal_id": "DEAL-NEW", "deal_name": "New", "status": "Active", "amount": 5.0}
+    client.post("/api/v1/deals/", json=deal)
+    active = client.get("/api/v1/analytics/deals").json()[1]
+    assert (active["group"], active["count"]) == ("Active", 4)
+    assert client.get("/api/v1/analytics/deals", params={"by": "amount"}).status_code == 422
+
+
+def test_aum_weighted_performance(client):
+    groups = {g["group"]: g for g in client.get("/api/v1/analytics/portfolios").json()}
+    high = groups["High"]
+    assert high["weight"] == 150000000.0
+    assert high["mean"] == pytest.approx((50 * 15.5 + 40 * 18.7 + 60 * 22.4) / 150)
+
+
+def test_allocation_totals(client):
+    for broker, amount in [("GS", 100.0), ("MS", 50.0), ("GS", 25.0), (None, 10.0)]:
+        client.post("/api/v1/allocations/", json={"broker": broker, "deal_allocation": amount})
+    groups = client.get("/api/v1/analytics/allocations", params={"by": "broker"}).json()
+    assert [(g["group"], g["total"]) for g in groups] == [("GS", 125.0), ("MS", 50.0), (None, 10.0)]
@@ -0,0 +1,91 @@
+import json
+from datetime import date
+
+import pytest
+
+from app.data.archive import Archive, main
+from app.data.json_store import JSONStore
+from app.data.repository import ArchivedError, BulkError
+
+
+def opened(path):
+    """An archive opened the way its collection does on load."""
+    archive = Archive(path, "deal_id")
+    archive.refresh()
+    return archive
+
+
+def test_archive_decodes_records_on_demand(tmp_path):
+    archive = opened(tmp_path / "deals.archive.ndjson")
+    assert archive.get("DEAL-001") is None and len(archive) == 0
+    archive.append([{"id": 1, "deal_id": "DEAL-001"}, {"id": 5, "deal_id": "DEAL-005"}])
+    archive.append([{"id": 1, "deal_id": "DEAL-001", "note": "newer"}])
+    assert archive.get("DEAL-001")["note"] == "newer"
+    assert archive.max_id == 5
+    assert [r["id"] for r in archive.values()] == [5, 1]
+
+    # A fresh reader uses the cached offset index, then rescans once it is stale
+    assert opened(archive.path).get("DEAL-005") == {"id": 5, "deal_id": "DEAL-005"}
+    with open(archive.path, "ab") as f:
+        f.write(b'{"id": 9, "deal_id": "DEAL-009"}\n{"id": 10, "deal_')  # torn last line
+    reopened = opened(archive.path)
+    assert reopened.get("DEAL-009")["id"] == 9 and "DEAL-010" not in reopened
+    reopened.append([{"id": 11, "deal_id": "DEAL-011"}])
+    assert opened(archive.path).get("DEAL-011")["id"] == 11
+
+
+def test_archived_deals_stay_readable(json_store):
+    assert json_store.archive_deals(date(2025, 1, 1)) == 4
+    assert [d["deal_id"] for d in json_store.get_deals()] == ["DEAL-005", "DEAL-006"]
+    assert [d["deal_id"] for d in json_store.query_deals(status="Active").items] == ["DEAL-005"]
+
+    archived = json_store.get_deal("DEAL-001")
+    assert archived["deal_name"] == "Project Alpha"
+    with pytest.raises(ArchivedError):
+        json_store.update_deal("DEAL-001", {**archived, "deal_name": "x"})
+    with pytest.raises(ArchivedError):
+        json_store.delete_deal("DEAL-001")
+    with pytest.raises(BulkError) as failure:
+        json_store.bulk_delete_deals(["DEAL-001", "DEAL-NOPE"])
+    assert [e["error"] for e in failure.value.errors] == ["archived", "not found"]
+    assert json_store.update_deal("DEAL-NOPE", {"deal_name": "x"}) is None
+    saved = json.loads((json_store.data_dir / "deals.json").read_text())
+    assert [d["deal_id"] for d in saved] == ["DEAL-005", "DEAL-006"]
+
+    # Keys and ids stay reserved across restarts
+    restarted = JSONStore(data_dir=json_store.data_dir)
+    assert restarted.get_deal("DEAL-001")["deal_name"] == "Project Alpha"
+    created = restarted.create_deal({"deal_id": "DEAL-NEW", "deal_name": "New"})
+    assert created["id"] == 7
+    assert [d["deal_id"] for d in restarted.get_deals()] == ["DEAL-005", "DEAL-006", "DEAL-NEW"]
+
+
+def test_archive_command(json_store, capsys):
+    main(["--before", "2024-12-31", "--data-dir", str(json_store.data_dir)])
+    assert "Archived 3 deal(s)" in capsys.readouterr().out
+    assert JSONStore(data_dir=json_store.data_dir).get_deal("DEAL-003")["id"] == 3
+
+
+@pytest.mark.parametrize("store", ["json"], indirect=True)
+def test_archived_deals_are_read_only_over_the_api(client, store):
+    store.archive_deals(date(2025, 1, 1))
+    assert client.get("/api/v1/deals/DEAL-001").status_code == 200
+    for response in (
+        client.put("/api/v1/deals/DEAL-001", json={"deal_name": "x"}),
+        client.delete("/api/v1/deals/DEAL-001"),
+    ):
+        assert response.status_code == 409
+        assert response.json()["detail"] == "Deal is archived and read-only"
+    assert client.delete("/api/v1/deals/DEAL-NOPE").status_code == 404
+
+
+def test_lookups_never_open_the_archive(json_store, monkeypatch):
+    """Reads run inline, so only loading may map the file or touch the index."""
+    json_store.archive_deals(date(2025, 1, 1))
+    archive = json_store.deals.archive
+    for name in ("_open", "_scan", "_read_index", "_write_index"):
+        monkeypatch.setattr(
+            archive, name, lambda *args, name=name: pytest.fail(f"{name} on a read")
+        )
+    assert json_store.get_deal("DEAL-001")["deal_name"] == "Project Alpha"
+    assert json_store.get_deal("DEAL-NOPE") is None
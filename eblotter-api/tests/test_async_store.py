@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from app.data.async_store import AsyncRepository
+from app.data.json_store import JSONStore
+from app.db.base import async_database_url, build_async_engine
+
+
+def _record_threads(store, names, threads):
+    for name in names:
+        method = getattr(store, name)
+
+        def traced(*args, _method=method, _name=name, **kwargs):
+            threads[_name] = threading.get_ident()
+            return _method(*args, **kwargs)
+
+        setattr(store, name, traced)
+
+
+async def test_reads_run_inline_and_blocking_writes_are_offloaded(json_store):
+    threads = {}
+    _record_threads(json_store, ["get_deal", "create_deal"], threads)
+    store = AsyncRepository(json_store)
+
+    assert (await store.get_deal("DEAL-001"))["deal_id"] == "DEAL-001"
+    created = await store.create_deal({"deal_id": "DEAL-ASYNC", "deal_name": "Async"})
+    assert created["id"] > 0
+    assert threads["get_deal"] == threading.get_ident()
+    assert threads["create_deal"] != threading.get_ident()
+
+
+async def test_batched_writes_stay_on_the_loop(json_store):
+    batched = JSONStore(data_dir=json_store.data_dir, flush_policy="count", flush_every=1000)
+    threads = {}
+    _record_threads(batched, ["create_broker"], threads)
+    store = AsyncRepository(batched)
+
+    await store.create_broker({"broker_id": "BRK-ASYNC", "broker_name": "Async"})
+    assert threads["create_broker"] == threading.get_ident()
+    batched.close()
+
+
+async def test_lazy_collections_load_off_the_loop(json_store):
+    lazy = JSONStore(data_dir=json_store.data_dir, lazy=True)
+    threads = {}
+    _record_threads(lazy, ["get_broker"], threads)
+    store = AsyncRepository(lazy)
+
+    await store.get_broker("BRK-001")
+    assert threads["get_broker"] != threading.get_ident()
+    assert lazy.brokers.loaded and not lazy.deals.loaded
+    await store.get_broker("BRK-001")
+    assert threads["get_broker"] == threading.get_ident()
+    assert not lazy.runs_inline("get_deal") and not lazy.runs_inline("version", "deals")
+    assert lazy.runs_inline("version", "brokers")
+
+
+async def test_async_engine(tmp_path):
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("greenlet")
+    assert async_database_url("sqlite:///./x.db") == "sqlite+aiosqlite:///./x.db"
+    assert async_database_url("postgresql://u@h/db") == "postgresql+asyncpg://u@h/db"
+
+    engine = build_async_engine(f"sqlite:///{tmp_path / 'async.db'}")
+    async with engine.connect() as connection:
+        assert (await connection.execute(text("select 1"))).scalar() == 1
+    await engine.dispose()
@@ -0,0 +1,36 @@
+from argparse import Namespace
+
+from app.data.json_store import JSONStore
+from benchmarks.bench_api import scenarios, uncovered_routes
+from benchmarks.compare import compare
+from benchmarks.generate import generate, sizes, write
+
+
+def test_generator_is_deterministic():
+    assert generate(200, seed=7) == generate(200, seed=7)
+    assert generate(200, seed=7) != generate(200, seed=8)
+
+
+def test_generated_data_loads_into_the_store(tmp_path):
+    data = generate(300)
+    write(data, tmp_path)
+    store = JSONStore(data_dir=tmp_path)
+    store.load_data()
+    assert {name: len(records) for name, records in data.items()} == sizes(300)
+    deal = data["deals"][42]
+    assert store.get_deal(deal["deal_id"]) == deal
+    assert store.query_deals(client=deal["client"]).items
+    assert store.create_deal({"deal_id": "DEAL-NEW", "deal_name": "New"})["id"] == 301
+
+
+def test_api_scenarios_cover_every_route():
+    args = Namespace(seed=1, requests=10, write_requests=10, bulk_size=5)
+    assert uncovered_routes(scenarios(generate(50), args)) == []
+
+
+def test_compare_flags_regressions():
+    def run(**timings):
+        return {"results": [{"name": name, "p50_s": value} for name, value in timings.items()]}
+
+    rows = compare(run(a=1.0, b=1.0, gone=1.0), run(a=1.5, b=1.05, new=1.0), threshold=0.10)
+    assert [(row["name"], row["regressed"]) for row in rows] == [("a", True), ("b", False)]
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize("store", ["json"], indirect=True)
+def test_bulk_create_allocations_persists_once(client, store, monkeypatch):
+    saves = []
+    original = store._save_json
+    monkeypatch.setattr(store, "_save_json", lambda *args: saves.append(args[0]) or original(*args))
+
+    payload = [{"cusip": f"C{i}", "deal_allocation": float(i)} for i in range(50)]
+    response = client.post("/api/v1/allocations/bulk", json=payload)
+    assert response.status_code == 201
+    assert [a["cusip"] for a in response.json()] == [f"C{i}" for i in range(50)]
+    assert saves == ["allocations.json"]
+    saved = json.loads((store.data_dir / "allocations.json").read_text())
+    assert len(saved) == 50
+
+
+def test_bulk_create_is_all_or_nothing(client, store):
+    before = len(store.get_brokers())
+    payload = [
+        {"broker_id": "BRK-NEW", "broker_name": "New"},
+        {"broker_id": "BRK-001", "broker_name": "Existing"},
+        {"broker_id": "BRK-NEW", "broker_name": "Repeated"},
+    ]
+    response = client.post("/api/v1/brokers/bulk", json=payload)
+    assert response.status_code == 400
+    assert [(e["index"], e["error"]) for e in response.json()["detail"]] == [
+        (1, "already exists"),
+        (2, "already exists"),
+    ]
+    assert len(store.get_brokers()) == before
+    assert store.get_broker("BRK-NEW") is None
+
+
+def test_bulk_patch_deals_merges_fields(client, store):
+    deals = store.get_deals()[:2]
+    payload = [{"deal_id": d["deal_id"], "status": "Closed"} for d in deals]
+    response = client.patch("/api/v1/deals/bulk", json=payload)
+    assert response.status_code == 200
+    assert [d["status"] for d in response.json()] == ["Closed", "Closed"]
+    for deal in deals:
+        stored = store.get_deal(deal["deal_id"])
+        assert stored["status"] == "Closed"
+        assert stored["deal_name"] == deal["deal_name"]
+
+
+def test_bulk_patch_reports_missing_keys(client, store):
+    payload = [{"portfolio_id": "PORT-001", "manager": "X"}, {"portfolio_id": "nope"}]
+    response = client.patch("/api/v1/portfolios/bulk", json=payload)
+    assert response.status_code == 400
+    assert response.json()["detail"] == [{"index": 1, "key": "nope", "error": "not found"}]
+    assert store.get_portfolio("PORT-001")["manager"] != "X"
+
+
+def test_bulk_delete(client, store):
+    ids = [a["id"] for a in store.bulk_create_allocations([{"cusip": "A"}, {"cusip": "B"}])]
+    assert client.post("/api/v1/allocations/bulk/delete", json=ids + [999]).status_code == 400
+    assert len(store.get_allocations()) == 2
+    assert client.post("/api/v1/allocations/bulk/delete", json=ids).status_code == 204
+    assert store.get_allocations() == []
@@ -0,0 +1,58 @@
+from app.api.caching import etag_matches
+
+
+def test_conditional_get_returns_304_until_collection_changes(client):
+    first = client.get("/api/v1/brokers/")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    cached = client.get("/api/v1/brokers/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    client.post("/api/v1/brokers/", json={"broker_id": "BRK-NEW", "broker_name": "New"})
+    changed = client.get("/api/v1/brokers/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert "BRK-NEW" in {b["broker_id"] for b in changed.json()}
+
+
+def test_repeat_reads_skip_the_store(client, store, monkeypatch):
+    calls = []
+    original = store.get_deal
+    monkeypatch.setattr(store, "get_deal", lambda key: calls.append(key) or original(key))
+
+    first = client.get("/api/v1/deals/DEAL-001")
+    second = client.get("/api/v1/deals/DEAL-001")
+    assert second.content == first.content
+    assert calls == ["DEAL-001"]
+
+    client.put("/api/v1/deals/DEAL-001", json={"deal_name": "Renamed"})
+    assert client.get("/api/v1/deals/DEAL-001").json()["dealName"] == "Renamed"
+    assert len(calls) == 3  # the update itself reads once too
+
+
+def test_cached_list_keeps_cursor_header(client):
+    first = client.get("/api/v1/deals/", params={"limit": 2})
+    again = client.get("/api/v1/deals/", params={"limit": 2})
+    assert again.headers["x-next-cursor"] == first.headers["x-next-cursor"]
+    assert client.get("/api/v1/deals/missing").status_code == 404
+
+
+def test_etag_matching():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+def test_sql_version_counts_committed_writes(sql_store):
+    brokers, deals = sql_store.version("brokers"), sql_store.version("deals")
+    sql_store.create_broker({"broker_id": "BRK-V", "broker_name": "Versioned"})
+    sql_store.update_broker("BRK-V", {"broker_name": "Renamed"})
+    sql_store.bulk_update_brokers([{"broker_id": "BRK-V", "status": "Inactive"}])
+    sql_store.delete_broker("BRK-V")
+    assert not sql_store.delete_broker("BRK-V")  # nothing written, nothing counted
+    assert sql_store.version("brokers") == brokers + 4
+    assert sql_store.version("deals") == deals
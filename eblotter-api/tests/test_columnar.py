@@ -0,0 +1,107 @@
+import json
+import tracemalloc
+from datetime import datetime
+
+from app.data.columnar import ColumnarTable
+from app.data.json_store import ALLOCATION_COLUMNS, JSONStore
+
+
+def _allocation(i):
+    return {
+        "id": i,
+        "deal_circle": f"CIRCLE-{i % 50}",
+        "allocation_type": ["Pro Rata", "Tiered", "Priority"][i % 3],
+        "deal_allocation": 1000.0 * (i % 97),
+        "allocation_date": "2024-03-01",
+        "is_add_on": i % 2 == 0,
+        "cusip": f"{i % 200:09d}",
+        "trader": f"Trader {i % 20}",
+        "broker": f"Broker {i % 10}",
+        "execution_notes": None,
+        "created_at": datetime(2024, 3, 1, 9, 30, i % 60, i).isoformat(),
+        "updated_at": datetime(2024, 3, 1, 9, 30, i % 60, i).isoformat(),
+    }
+
+
+def test_values_round_trip_exactly():
+    table = ColumnarTable(ALLOCATION_COLUMNS)
+    odd = {
+        "id": 1,
+        "deal_allocation": 5,  # int in a float column
+        "allocation_date": "2024-3-1",  # not canonical ISO
+        "circle_date": None,
+        "created_at": "2024-03-01T09:30:00+00:00",  # aware timestamp
+        "updated_at": "2024-03-01T09:30:00.000001",
+        "is_add_on": True,
+        "custom": {"nested": [1, 2]},
+    }
+    table[1] = odd
+    table[2] = _allocation(2)
+    assert dict(table[1]) == odd
+    assert list(table[1]) == [f for f in ALLOCATION_COLUMNS if f in odd] + ["custom"]
+    assert "trader" not in table[1] and table[1].get("trader") is None
+    assert dict(table[2]) == _allocation(2)
+    assert json.loads(json.dumps(table.to_dicts())) == [odd, _allocation(2)]
+
+
+def test_views_keep_the_record_they_were_read_as():
+    table = ColumnarTable(ALLOCATION_COLUMNS)
+    table[1] = _allocation(1)
+    before = table[1]
+    table[1] = {**before, "broker": "Someone Else"}
+    assert before["broker"] == "Broker 1"
+    assert table[1]["broker"] == "Someone Else"
+    assert table.pop(1)["broker"] == "Someone Else"
+    assert 1 not in table and table.get(1) is None
+
+
+def test_retired_rows_are_rebuilt_away():
+    table = ColumnarTable(ALLOCATION_COLUMNS)
+    for i in range(10):
+        table[i] = _allocation(i)
+    for n in range(3000):
+        table[n % 10] = _allocation(n % 10)
+    assert len(table.segment) < 3000
+    assert list(table) == list(range(10))
+    assert [dict(r) for r in table.values()] == [_allocation(i) for i in range(10)]
+
+
+def _allocated(build):
+    tracemalloc.start()
+    try:
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return size
+
+
+def test_columns_use_a_fraction_of_the_memory():
+    count = 5000
+    source = [json.dumps(_allocation(i)) for i in range(count)]
+
+    def rows():
+        return {i: json.loads(line) for i, line in enumerate(source)}
+
+    def columns():
+        table = ColumnarTable(ALLOCATION_COLUMNS)
+        for i, line in enumerate(source):
+            table[i] = json.loads(line)
+        return table
+
+    assert _allocated(columns) * 3 < _allocated(rows)
+
+
+def test_columnar_store(json_store):
+    store = JSONStore(data_dir=json_store.data_dir, layout="columnar")
+    created = store.create_allocation(_allocation(0))
+    store.update_allocation(created["id"], {**created, "trader": "Trader X"})
+    assert store.get_allocation(created["id"])["trader"] == "Trader X"
+    query = {"status": "Active", "min_amount": 1.0, "sort": "-amount"}
+    assert store.query_deals(**query).items == json_store.query_deals(**query).items
+
+    saved = json.loads((store.data_dir / "allocations.json").read_text())
+    assert saved[-1]["trader"] == "Trader X"
+    reloaded = JSONStore(data_dir=store.data_dir)
+    assert reloaded.get_allocation(created["id"]) == store.get_allocation(created["id"])
@@ -0,0 +1,65 @@
+from app.schemas.deal import DealResponse, deal_response_dict
+
+DEALS_URL = "/api/v1/deals/"
+
+
+def _ids(response):
+    assert response.status_code == 200
+    return [deal["id"] for deal in response.json()]
+
+
+def test_filter_by_status_and_owner(client, store):
+    """Categorical filters go through the hash indexes."""
+    expected = [d["deal_id"] for d in store.get_deals() if d["status"] == "Active"]
+    assert _ids(client.get(DEALS_URL, params={"status": "Active"})) == expected
+    assert _ids(client.get(DEALS_URL, params={"status": "Nope"})) == []
+
+
+def test_amount_range_and_sort(client, store):
+    """Range filters and sorting go through the sorted indexes."""
+    deals = [d for d in store.get_deals() if 500000 <= d["amount"] <= 2000000]
+    expected = [d["deal_id"] for d in sorted(deals, key=lambda d: (-d["amount"], -d["id"]))]
+    response = client.get(
+        DEALS_URL, params={"min_amount": 500000, "max_amount": 2000000, "sort": "-amount"}
+    )
+    assert _ids(response) == expected
+
+
+def test_date_range_with_pagination(client, store):
+    """Date ranges combine with skip/limit and default to insertion order."""
+    expected = [d["deal_id"] for d in store.get_deals() if d["start_date"] >= "2024-02-01"]
+    params = {"start_date_from": "2024-02-01", "skip": 1, "limit": 2}
+    assert _ids(client.get(DEALS_URL, params=params)) == expected[1:3]
+
+
+def test_index_tracks_created_deal(client):
+    """Deals created through the API are visible to filtered queries."""
+    payload = {
+        "deal_id": "DEAL-IDX",
+        "deal_name": "Indexed",
+        "status": "Closed",
+        "amount": 1.0,
+        "start_date": "2030-01-01",
+    }
+    assert client.post(DEALS_URL, json=payload).status_code == 201
+    assert _ids(client.get(DEALS_URL, params={"status": "Closed"})) == ["DEAL-IDX"]
+    assert _ids(client.get(DEALS_URL, params={"start_date_from": "2030-01-01"})) == ["DEAL-IDX"]
+    assert _ids(client.get(DEALS_URL, params={"sort": "amount", "limit": 1})) == ["DEAL-IDX"]
+
+
+def test_rejects_unknown_sort_field(client):
+    assert client.get(DEALS_URL, params={"sort": "client"}).status_code == 422
+
+
+def test_fast_projection_matches_response_model(store):
+    """The direct projection produces exactly what DealResponse would."""
+    for deal in store.get_deals():
+        projected = deal_response_dict(deal)
+        assert DealResponse(**projected).model_dump() == projected
+
+
+def test_item_routes_use_wire_format(client, store):
+    deal = store.get_deals()[0]
+    response = client.get(f"{DEALS_URL}{deal['deal_id']}")
+    assert response.status_code == 200
+    assert response.json() == deal_response_dict(deal)
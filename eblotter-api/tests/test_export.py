@@ -0,0 +1,32 @@
+import csv
+import io
+import json
+
+from app.api import export
+
+
+def test_deals_ndjson_streams_every_row(client, store, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_CHUNK_SIZE", 2)
+    response = client.get("/api/v1/deals/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["id"] for r in rows] == [d["deal_id"] for d in store.get_deals()]
+    assert rows[0]["dealName"] == store.get_deals()[0]["deal_name"]
+
+
+def test_allocations_csv_export(client, store, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_CHUNK_SIZE", 2)
+    for i in range(5):
+        store.create_allocation({"cusip": f"C{i}", "deal_allocation": i * 10.0})
+    response = client.get("/api/v1/allocations/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [r["cusip"] for r in rows] == [f"C{i}" for i in range(5)]
+    assert rows[4]["deal_allocation"] == "40.0"
+
+
+def test_empty_csv_export_has_header(client):
+    response = client.get("/api/v1/allocations/export", params={"format": "csv"})
+    assert response.text.splitlines()[0].startswith("deal_circle,")
@@ -0,0 +1,56 @@
+import time
+
+from app.api.idempotency import IdempotencyStore, StoredResponse, _fingerprint, idempotency_store
+
+
+def test_retries_replay_the_first_response(client):
+    headers = {"Idempotency-Key": "alloc-1"}
+    payload = {"cusip": "123456AB7", "deal_allocation": 100.0}
+    first = client.post("/api/v1/allocations/", json=payload, headers=headers)
+    retry = client.post("/api/v1/allocations/", json=payload, headers=headers)
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+
+    cusips = [a["cusip"] for a in client.get("/api/v1/allocations/").json()]
+    assert cusips.count("123456AB7") == 1
+
+    # Without a key every request runs
+    client.post("/api/v1/allocations/", json=payload)
+    cusips = [a["cusip"] for a in client.get("/api/v1/allocations/").json()]
+    assert cusips.count("123456AB7") == 2
+
+
+def test_key_reuse_and_concurrent_retries_are_rejected(client):
+    headers = {"Idempotency-Key": "deal-1"}
+    deal = {"deal_id": "DEAL-IDEM", "deal_name": "Idempotent"}
+    assert client.post("/api/v1/deals/", json=deal, headers=headers).status_code == 201
+    reused = client.post("/api/v1/deals/", json={**deal, "deal_name": "Other"}, headers=headers)
+    assert reused.status_code == 422
+
+    # Client errors are replayed too
+    invalid = client.post("/api/v1/deals/", json={}, headers={"Idempotency-Key": "bad"})
+    assert client.post("/api/v1/deals/", json={}, headers={"Idempotency-Key": "bad"}).json() == (
+        invalid.json()
+    )
+
+    scope = {"method": "DELETE", "path": "/api/v1/deals/DEAL-IDEM", "query_string": b""}
+    idempotency_store.begin(("DELETE", scope["path"], b"del-1"), _fingerprint(scope, b""))
+    in_flight = client.delete(scope["path"], headers={"Idempotency-Key": "del-1"})
+    assert in_flight.status_code == 409
+    assert client.get("/api/v1/deals/DEAL-IDEM").status_code == 200
+
+
+def test_store_expires_and_bounds_entries(monkeypatch):
+    store = IdempotencyStore(ttl=10, max_entries=2)
+    response = StoredResponse(201, [], b"{}")
+    for key in "abc":
+        store.begin(key, b"fp")
+        store.complete(key, response)
+    assert store.get("a") is None
+    assert store.get("c").response == response
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert store.get("c") is None
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from app.db.importer import ImportFailed, import_file, import_records
+
+
+@pytest.fixture
+def engine(sql_store):
+    """The engine behind ``sql_store``, so imports land in the same database."""
+    with sql_store.session_factory() as session:
+        return session.get_bind()
+
+
+def allocations_csv(path, rows):
+    lines = ["cusip,deal_allocation,allocation_date,is_add_on"]
+    lines += [",".join(row) for row in rows]
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_csv_import_is_visible_through_the_store(sql_store, engine, tmp_path):
+    before = len(sql_store.get_allocations())
+    path = allocations_csv(
+        tmp_path / "book.csv",
+        [
+            ("IMP1", "1500.5", "2024-03-01", "true"),
+            ("IMP2", "", "", "false"),
+        ],
+    )
+    result = import_file(engine, "allocations", path, batch_size=1)
+    assert (result.rows, result.skipped) == (2, 0)
+
+    imported = {a["cusip"]: a for a in sql_store.get_allocations()[before:]}
+    assert imported["IMP1"]["deal_allocation"] == 1500.5
+    assert imported["IMP1"]["allocation_date"] == "2024-03-01"
+    assert imported["IMP1"]["is_add_on"] is True
+    assert imported["IMP2"]["deal_allocation"] is None
+
+
+def test_ndjson_import_reports_progress_per_commit(sql_store, engine, tmp_path):
+    path = tmp_path / "deals.ndjson"
+    path.write_text(
+        "".join(
+            json.dumps({"deal_id": f"DEAL-IMP-{i}", "deal_name": f"Imported {i}"}) + "\n"
+            for i in range(25)
+        )
+    )
+    progress = []
+    result = import_file(
+        engine,
+        "deals",
+        path,
+        batch_size=4,
+        commit_every=10,
+        progress=lambda rows, seconds: progress.append(rows),
+    )
+    assert result.rows == 25
+    assert progress == [12, 24]
+    assert sql_store.get_deal("DEAL-IMP-24")["deal_name"] == "Imported 24"
+
+
+def test_invalid_row_stops_the_import_after_earlier_commits(sql_store, engine):
+    records = [{"cusip": f"OK{i}", "deal_allocation": i} for i in range(6)]
+    records[4] = {"cusip": "BAD", "deal_allocation": "lots"}
+    before = len(sql_store.get_allocations())
+
+    with pytest.raises(ImportFailed, match="Row 5: deal_allocation") as failure:
+        import_records(engine, "allocations", records, batch_size=2, commit_every=2)
+    assert failure.value.committed == 4
+    assert len(sql_store.get_allocations()) == before + 4
+
+
+def test_skip_invalid_drops_bad_rows(sql_store, engine):
+    records = [
+        {"cusip": "OK1", "deal_allocation": 1},
+        {"cusip": "BAD", "circle_date": "someday"},
+        {"cusip": "OK2", "deal_allocation": 2},
+    ]
+    result = import_records(engine, "allocations", records, skip_invalid=True)
+    assert (result.rows, result.skipped) == (2, 1)
+    cusips = {a["cusip"] for a in sql_store.get_allocations()}
+    assert {"OK1", "OK2"} <= cusips and "BAD" not in cusips
+
+
+def test_import_moves_the_table_version(sql_store, engine):
+    before = sql_store.version("allocations")
+    records = [{"cusip": f"V{i}"} for i in range(5)]
+    import_records(engine, "allocations", records, batch_size=2, commit_every=2)
+    # One bump per transaction: two full ones and the remainder
+    assert sql_store.version("allocations") == before + 3
@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+
+from app.data.indexes import SortedIndex
+from app.data.json_store import JSONStore
+
+
+def test_lookup_by_natural_key(json_store):
+    """Point lookups resolve through the key index."""
+    deal = json_store.get_deals()[0]
+    assert json_store.get_deal(deal["deal_id"]) is deal
+    assert json_store.get_deal("missing") is None
+
+
+def test_index_follows_mutations(json_store):
+    """Create, update and delete keep the index and the file in sync."""
+    created = json_store.create_deal({"deal_id": "DEAL-NEW", "deal_name": "New"})
+    assert json_store.get_deal("DEAL-NEW") is created
+
+    updated = json_store.update_deal("DEAL-NEW", {**created, "deal_name": "Renamed"})
+    assert updated["id"] == created["id"]
+    assert json_store.get_deal("DEAL-NEW")["deal_name"] == "Renamed"
+    assert json_store.get_deals()[-1] is updated
+
+    assert json_store.delete_deal("DEAL-NEW") is True
+    assert json_store.get_deal("DEAL-NEW") is None
+    assert json_store.delete_deal("DEAL-NEW") is False
+
+    saved = json.loads((json_store.data_dir / "deals.json").read_text())
+    assert "DEAL-NEW" not in {d["deal_id"] for d in saved}
+
+
+def test_allocation_ids_are_indexed(json_store):
+    """Allocations are keyed by their generated integer id."""
+    first = json_store.create_allocation({"cusip": "123456AB7"})
+    second = json_store.create_allocation({"cusip": "987654CD3"})
+    assert second["id"] == first["id"] + 1
+    assert json_store.get_allocation(second["id"]) is second
+    assert json_store.delete_allocation(first["id"]) is True
+    assert json_store.get_allocation(first["id"]) is None
+
+
+def test_journal_mode_replays_after_restart(json_store):
+    """Journal mode appends one line per mutation and replays it on load."""
+    journaled = JSONStore(data_dir=json_store.data_dir, persistence="journal", compact_every=100)
+    journaled.create_broker({"broker_id": "BRK-NEW", "broker_name": "New"})
+    journaled.update_broker("BRK-NEW", {"broker_name": "Renamed"})
+    journaled.delete_broker("BRK-001")
+    journaled.close()
+
+    log_lines = (json_store.data_dir / "brokers.log").read_text().splitlines()
+    assert len(log_lines) == 3
+    snapshot = json.loads((json_store.data_dir / "brokers.json").read_text())
+    assert "BRK-NEW" not in {b["broker_id"] for b in snapshot}
+
+    reloaded = JSONStore(data_dir=json_store.data_dir, persistence="journal")
+    assert reloaded.get_broker("BRK-NEW")["broker_name"] == "Renamed"
+    assert reloaded.get_broker("BRK-001") is None
+
+
+def test_journal_ignores_torn_tail_and_compacts(json_store):
+    """A partial trailing entry is dropped and compaction empties the log."""
+    journaled = JSONStore(data_dir=json_store.data_dir, persistence="journal", compact_every=2)
+    journaled.create_allocation({"cusip": "A"})
+    journaled.close()
+    with open(json_store.data_dir / "allocations.log", "a") as f:
+        f.write('{"op":"put","record":{"id"')
+
+    reloaded = JSONStore(data_dir=json_store.data_dir, persistence="journal", compact_every=2)
+    assert len(reloaded.get_allocations()) == 1
+    reloaded.create_allocation({"cusip": "B"})
+    assert (json_store.data_dir / "allocations.log").read_text() == ""
+    snapshot = json.loads((json_store.data_dir / "allocations.json").read_text())
+    assert [a["cusip"] for a in snapshot] == ["A", "B"]
+
+
+def test_count_policy_batches_writes(json_store):
+    """The count policy defers writes until enough mutations are pending."""
+    batched = JSONStore(
+        data_dir=json_store.data_dir, persistence="journal", flush_policy="count", flush_every=1000
+    )
+    for i in range(5):
+        batched.create_allocation({"cusip": f"C{i}"})
+    assert not (json_store.data_dir / "allocations.log").exists()
+
+    batched.close()
+    assert len((json_store.data_dir / "allocations.log").read_text().splitlines()) == 5
+
+
+def test_interval_policy_flushes_in_background(json_store):
+    """The interval policy persists pending mutations without an explicit flush."""
+    batched = JSONStore(data_dir=json_store.data_dir, flush_policy="interval", flush_interval_ms=10)
+    batched.create_deal({"deal_id": "DEAL-BG", "deal_name": "Background"})
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        saved = json.loads((json_store.data_dir / "deals.json").read_text())
+        if "DEAL-BG" in {d["deal_id"] for d in saved}:
+            break
+        time.sleep(0.01)
+    else:
+        raise AssertionError("deal was not flushed")
+    batched.close()
+
+
+def test_writes_do_not_wait_for_the_flusher_to_encode(json_store, monkeypatch):
+    """Batched writes run on the event loop, so they must not queue behind encoding."""
+    batched = JSONStore(
+        data_dir=json_store.data_dir, layout="columnar", flush_policy="count", flush_every=1000
+    )
+    assert "create_deal" in batched.inline_methods
+    batched.create_deal({"deal_id": "DEAL-ENC", "deal_name": "Encoding"})
+    encoding, release = threading.Event(), threading.Event()
+    to_dicts = batched.deals.to_dicts
+
+    def slow_to_dicts(*args):
+        encoding.set()
+        release.wait(5)
+        return to_dicts(*args)
+
+    monkeypatch.setattr(batched.deals, "to_dicts", slow_to_dicts)
+    flusher = threading.Thread(target=batched.flush)
+    flusher.start()
+    assert encoding.wait(5)
+    start = time.monotonic()
+    batched.create_deal({"deal_id": "DEAL-ENC-2", "deal_name": "Meanwhile"})
+    assert time.monotonic() - start < 1
+    release.set()
+    flusher.join()
+    batched.close()
+    saved = {d["deal_id"] for d in json.loads((json_store.data_dir / "deals.json").read_text())}
+    assert {"DEAL-ENC", "DEAL-ENC-2"} <= saved
+
+    # Pickling a snapshot needs the lock throughout, so those writes go to a thread
+    snapshotting = JSONStore(data_dir=json_store.data_dir, flush_policy="count", snapshots=True)
+    assert "create_deal" not in snapshotting.inline_methods
+
+
+def test_secondary_indexes_follow_updates(json_store):
+    """Updating or deleting a deal moves it between secondary index buckets."""
+    deal = json_store.get_deals()[0]
+    json_store.update_deal(deal["deal_id"], {**deal, "status": "Archived", "amount": 1.0})
+    archived = json_store.query_deals(status="Archived").items
+    assert [d["deal_id"] for d in archived] == [deal["deal_id"]]
+    previous = json_store.query_deals(status=deal["status"]).items
+    assert deal["deal_id"] not in {d["deal_id"] for d in previous}
+    assert json_store.query_deals(sort="amount", limit=1).items[0]["deal_id"] == deal["deal_id"]
+
+    json_store.delete_deal(deal["deal_id"])
+    assert json_store.query_deals(status="Archived").items == []
+    assert json_store.query_deals(max_amount=1.0).items == []
+
+
+def test_load_builds_sorted_indexes_in_bulk(tmp_path, monkeypatch):
+    """Loading 100k deals sorts each index once instead of inserting row by row."""
+
+    def refuse(*args, **kwargs):
+        raise AssertionError("row-by-row index insert during load")
+
+    deals = [
+        {
+            "id": i,
+            "deal_id": f"DEAL-{i:06d}",
+            "deal_name": f"Deal {i % 997}",
+            "amount": float((i * 7919) % 100_003),
+            "status": "Active",
+            "start_date": f"2024-{i % 12 + 1:02d}-01",
+        }
+        for i in range(1, 100_001)
+    ]
+    (tmp_path / "deals.json").write_text(json.dumps(deals))
+    store = JSONStore(data_dir=tmp_path)
+    monkeypatch.setattr(SortedIndex, "add", refuse)
+    start = time.perf_counter()
+    store.load_data()
+    elapsed = time.perf_counter() - start
+
+    top = store.query_deals(sort="-amount", limit=3).items
+    expected = sorted(deals, key=lambda d: (d["amount"], d["id"]), reverse=True)[:3]
+    assert [d["deal_id"] for d in top] == [d["deal_id"] for d in expected]
+    # Row-by-row inserts took well over ten seconds at this size
+    assert elapsed < 10
@@ -0,0 +1,94 @@
+import re
+
+import pytest
+
+from app.core.metrics import Histogram, registry
+
+
+def sample(text: str, name: str, **labels) -> float:
+    """Value of the exposition line for ``name`` carrying at least ``labels``."""
+    for line in text.splitlines():
+        match = re.fullmatch(r"(\w+)(?:\{(.*)\})? (\S+)", line)
+        if not match or match[1] != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match[2] or ""))
+        if labels.items() <= found.items():
+            return float(match[3])
+    return 0.0
+
+
+def test_requests_are_timed_by_route_template(client):
+    before = client.get("/metrics").text
+    route = "/api/v1/deals/{deal_id}"
+    client.get("/api/v1/deals/DEAL-001")
+    client.get("/api/v1/deals/DEAL-002")
+    client.get("/api/v1/deals/nope")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    for status, count in (("200", 2), ("404", 1)):
+        labels = {"method": "GET", "route": route, "status": status}
+        name = "http_request_duration_seconds_count"
+        assert sample(text, name, **labels) - sample(before, name, **labels) == count
+    # The scrape itself is in flight while the metrics are rendered
+    assert sample(text, "http_requests_in_flight", method="GET") == 1
+    assert "/api/v1/deals/DEAL-001" not in text
+
+
+def test_idempotent_replays_keep_their_route(client):
+    headers = {"Idempotency-Key": "metrics-1"}
+    payload = {"broker_id": "BRK-MET", "broker_name": "Metrics"}
+    client.post("/api/v1/brokers/", json=payload, headers=headers)
+    client.post("/api/v1/brokers/", json=payload, headers=headers)
+    text = client.get("/metrics").text
+    labels = {"method": "POST", "route": "/api/v1/brokers/", "status": "201"}
+    assert sample(text, "http_request_duration_seconds_count", **labels) >= 2
+    assert 'route="unmatched",status="201"' not in text
+
+
+def test_unknown_paths_are_unmatched(client):
+    client.get("/api/v1/nowhere/1")
+    client.get("/api/v1/nowhere/2")
+    text = client.get("/metrics").text
+    labels = {"method": "GET", "route": "unmatched", "status": "404"}
+    assert sample(text, "http_request_duration_seconds_count", **labels) >= 2
+    assert "/api/v1/nowhere" not in text
+
+
+def test_store_operations_and_sizes(client, store):
+    client.post("/api/v1/deals/", json={"deal_id": "DEAL-MET", "deal_name": "Metrics"})
+    text = client.get("/metrics").text
+    assert (
+        sample(
+            text, "store_operation_duration_seconds_count", operation="create_deal", kind="mutate"
+        )
+        >= 1
+    )
+    assert sample(text, "store_collection_records", collection="deals") == len(store.get_deals())
+
+
+@pytest.mark.parametrize("store", ["json"], indirect=True)
+def test_json_store_persist_phases(store):
+    def count(phase):
+        name = "store_persist_duration_seconds_count"
+        return sample(registry.render(), name, collection="deals", phase=phase)
+
+    before = {phase: count(phase) for phase in ("encode", "write")}
+    store.create_deal({"deal_id": "DEAL-PERSIST", "deal_name": "Persisted"})
+    assert {phase: count(phase) - before[phase] for phase in before} == {"encode": 1, "write": 1}
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_histogram_seconds", "Test.", ["case"], buckets=(0.1, 1.0))
+    series = histogram.labels("a")
+    for value in (0.05, 0.1, 0.5, 2.0):
+        series.observe(value)
+    text = registry.render()
+    assert [
+        sample(text, "test_histogram_seconds_bucket", case="a", le=le)
+        for le in ("0.1", "1.0", "+Inf")
+    ] == [2, 3, 4]
+    assert sample(text, "test_histogram_seconds_sum", case="a") == pytest.approx(2.65)
+    histogram.clear()
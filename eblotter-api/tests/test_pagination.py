@@ -0,0 +1,110 @@
+import base64
+import json
+
+import pytest
+
+from app.api.pagination import NEXT_CURSOR_HEADER
+
+
+def _walk(client, url, **params):
+    """Follow X-Next-Cursor until the last page and return every page."""
+    pages = []
+    cursor = None
+    while True:
+        response = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize(
+    "url, key",
+    [
+        ("/api/v1/brokers/", "broker_id"),
+        ("/api/v1/portfolios/", "portfolio_id"),
+        ("/api/v1/deals/", "id"),
+    ],
+)
+def test_cursor_walks_every_row_once(client, url, key):
+    everything = client.get(url, params={"limit": 1000}).json()
+    pages = _walk(client, url, limit=2)
+    assert all(len(page) <= 2 for page in pages)
+    assert [row[key] for page in pages for row in page] == [row[key] for row in everything]
+
+
+def test_cursor_is_stable_when_rows_are_deleted(client, store):
+    """Deleting an already-seen row does not shift the next page."""
+    for i in range(6):
+        store.create_allocation({"cusip": f"C{i}"})
+    first = client.get("/api/v1/allocations/", params={"limit": 3})
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    store.delete_allocation(first.json()[0]["id"])
+
+    second = client.get("/api/v1/allocations/", params={"limit": 3, "cursor": cursor})
+    assert [a["cusip"] for a in second.json()] == ["C3", "C4", "C5"]
+    assert NEXT_CURSOR_HEADER not in second.headers
+
+
+def test_cursor_follows_sorted_deals(client, store):
+    expected = [
+        d["deal_id"] for d in sorted(store.get_deals(), key=lambda d: (-d["amount"], -d["id"]))
+    ]
+    pages = _walk(client, "/api/v1/deals/", limit=3, sort="-amount")
+    assert [d["id"] for page in pages for d in page] == expected
+
+
+def test_rejects_bad_cursors(client):
+    response = client.get("/api/v1/deals/", params={"limit": 1})
+    cursor = response.headers[NEXT_CURSOR_HEADER]
+    assert (
+        client.get("/api/v1/deals/", params={"cursor": cursor, "sort": "amount"}).status_code == 400
+    )
+    assert client.get("/api/v1/brokers/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+@pytest.mark.parametrize("url", ["/api/v1/deals/", "/api/v1/brokers/", "/api/v1/allocations/"])
+def test_empty_pages_and_out_of_range_paging(client, store, url):
+    store.create_allocation({"cusip": "C0"})
+    response = client.get(url, params={"limit": 0})
+    assert response.status_code == 200
+    assert response.json() == [] and NEXT_CURSOR_HEADER not in response.headers
+    assert client.get(url, params={"skip": -5}).status_code == 422
+    assert client.get(url, params={"limit": -1}).status_code == 422
+
+
+def test_repository_returns_an_empty_page_for_limit_zero(store):
+    page = store.query_deals(sort="amount", limit=0)
+    assert (page.items, page.next_position) == ([], None)
+
+
+def _tampered(*position):
+    payload = json.dumps(list(position)).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "url, sort, position",
+    [
+        ("/api/v1/deals/", None, [None, False, "x", 1]),
+        ("/api/v1/deals/", "amount", ["amount", False, [1], 1]),
+        ("/api/v1/deals/", "-start_date", ["-start_date", False, 5, 1]),
+        ("/api/v1/deals/", "amount", ["amount", 1, 0.0, 1]),
+        ("/api/v1/brokers/", None, [None, False, {"a": 1}, 1]),
+        ("/api/v1/brokers/", None, [None, False, 1, "1"]),
+    ],
+)
+def test_rejects_tampered_cursors(client, url, sort, position):
+    params = {"cursor": _tampered(*position), **({"sort": sort} if sort else {})}
+    response = client.get(url, params=params)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_cursor_on_a_missing_value_ignores_the_value(client, store):
+    store.create_deal({"deal_id": "DEAL-NOAMT", "deal_name": "No amount"})
+    cursor = _tampered("amount", True, None, 0)
+    response = client.get("/api/v1/deals/", params={"cursor": cursor, "sort": "amount"})
+    assert response.status_code == 200
+    assert [d["id"] for d in response.json()] == ["DEAL-NOAMT"]
@@ -0,0 +1,88 @@
+import marshal
+
+import pytest
+from pydantic import ValidationError
+
+from app.api.profiling import profile_store
+from app.core.config import Settings, settings
+
+TOKEN = "profile-secret"
+
+
+@pytest.fixture
+def profiling_client(client, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", TOKEN)
+    profile_store.clear()
+    return client
+
+
+def fetch(client, profile_id, **params):
+    return client.get(f"/profiles/{profile_id}", params=params, headers={"X-Profile-Token": TOKEN})
+
+
+@pytest.mark.parametrize("store", ["json"], indirect=True)
+def test_cprofile_includes_store_work_on_worker_threads(profiling_client):
+    headers = {"X-Profile": "cprofile", "X-Profile-Token": TOKEN}
+    deal = {"deal_id": "DEAL-PROF", "deal_name": "Profiled"}
+    response = profiling_client.post("/api/v1/deals/", json=deal, headers=headers)
+    assert response.status_code == 201
+
+    report = fetch(profiling_client, response.headers["X-Profile-Id"])
+    assert report.status_code == 200
+    assert report.text.startswith("# cprofile POST /api/v1/deals/ -> 201")
+    raw = fetch(profiling_client, response.headers["X-Profile-Id"], format="pstats")
+    functions = {name for _, _, name in marshal.loads(raw.content)}
+    # create_deal runs on a worker thread when writes flush immediately
+    assert {"create_deal", "_save_json"} <= functions
+
+
+@pytest.mark.parametrize("mode", ["sample", "tracemalloc"])
+def test_query_flag_modes(profiling_client, mode):
+    response = profiling_client.get(
+        f"/api/v1/deals/?profile={mode}", headers={"X-Profile-Token": TOKEN}
+    )
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    report = fetch(profiling_client, profile_id)
+    assert report.text.startswith(f"# {mode} GET /api/v1/deals/ -> 200")
+    assert fetch(profiling_client, profile_id, format="pstats").status_code == 400
+
+
+def test_profiling_needs_the_token(profiling_client, monkeypatch):
+    response = profiling_client.get("/api/v1/deals/?profile=cprofile")
+    assert "X-Profile-Id" not in response.headers
+    response = profiling_client.get(
+        "/api/v1/deals/", headers={"X-Profile": "cprofile", "X-Profile-Token": "wrong"}
+    )
+    assert "X-Profile-Id" not in response.headers
+    assert profiling_client.get("/profiles/").status_code == 404
+    # Non-ASCII tokens are refused rather than failing the comparison
+    response = profiling_client.get("/profiles/", headers={"X-Profile-Token": "sécret".encode()})
+    assert response.status_code == 404
+    assert profile_store.list() == []
+
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", None)
+    response = profiling_client.get(
+        "/api/v1/deals/", headers={"X-Profile": "cprofile", "X-Profile-Token": TOKEN}
+    )
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_sampled_requests_are_stored(profiling_client, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_MODE", "cprofile")
+    profiling_client.get("/api/v1/brokers/")
+    profiles = profiling_client.get("/profiles/", headers={"X-Profile-Token": TOKEN}).json()
+    # The listing request is sampled too, newest first
+    assert [(p["method"], p["path"]) for p in profiles][-1] == ("GET", "/api/v1/brokers/")
+
+
+def test_unknown_sample_mode_is_rejected_at_startup():
+    with pytest.raises(ValidationError, match="PROFILING_SAMPLE_MODE"):
+        Settings(PROFILING_SAMPLE_MODE="pyinstrument")
+
+
+def test_sampling_without_a_token_is_rejected_at_startup():
+    with pytest.raises(ValidationError, match="needs PROFILING_TOKEN"):
+        Settings(PROFILING_SAMPLE_RATE=0.01)
+    assert Settings(PROFILING_SAMPLE_RATE=0.01, PROFILING_TOKEN=TOKEN).PROFILING_SAMPLE_RATE == 0.01
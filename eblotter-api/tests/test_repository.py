@@ -0,0 +1,55 @@
+import pytest
+
+from app.core.config import Settings
+
+
+def test_database_url_selects_backend():
+    assert Settings(DATABASE_URL="json://").uses_json_store
+    assert Settings(DATABASE_URL="json://").json_data_dir is None
+    assert Settings(DATABASE_URL="json:///srv/blotter").json_data_dir == "/srv/blotter"
+
+    sql = Settings(DATABASE_URL="postgresql://user@db/eblotter")
+    assert not sql.uses_json_store
+    assert sql.sql_database_url == "postgresql://user@db/eblotter"
+
+
+def test_backends_agree_on_missing_values(store):
+    """Deals without an amount sort last ascending and first descending."""
+    created = store.create_deal({"deal_id": "DEAL-NOAMT", "deal_name": "No amount"})
+
+    ascending = store.query_deals(sort="amount").items
+    descending = store.query_deals(sort="-amount").items
+    assert ascending[-1]["deal_id"] == "DEAL-NOAMT"
+    assert descending[0]["deal_id"] == "DEAL-NOAMT"
+    assert [d["id"] for d in descending] == [d["id"] for d in reversed(ascending)]
+
+    page = store.query_deals(sort="-amount", limit=1)
+    assert page.next_position == (True, 0.0, created["id"])
+    rest = store.query_deals(sort="-amount", after=page.next_position).items
+    assert [d["id"] for d in rest] == [d["id"] for d in descending[1:]]
+
+
+@pytest.mark.parametrize(
+    "collection, record_id",
+    [
+        ("broker", "BRK-001"),
+        ("portfolio", "PORT-001"),
+        ("allocation", None),
+    ],
+)
+def test_update_of_a_record_deleted_meanwhile_is_404(
+    client, store, monkeypatch, collection, record_id
+):
+    """A record deleted between the route's read and its update is not found."""
+    if record_id is None:
+        # The fixture data has no allocations
+        record_id = store.create_allocation({"cusip": "123456AB7"})["id"]
+    update = getattr(store, f"update_{collection}")
+
+    def delete_then_update(key, data):
+        getattr(store, f"delete_{collection}")(key)
+        return update(key, data)
+
+    monkeypatch.setattr(store, f"update_{collection}", delete_then_update)
+    response = client.put(f"/api/v1/{collection}s/{record_id}", json={})
+    assert response.status_code == 404
@@ -0,0 +1,57 @@
+from app.data.indexes import TextIndex
+
+
+def test_text_index_ranks_prefix_matches():
+    index = TextIndex({"name": 2.0, "client": 1.0})
+    index.add("a", {"name": "Project Alpha", "client": "Acme Corp"})
+    index.add("b", {"name": "Alphabet Soup", "client": "Beta"})
+    index.add("c", {"name": "Gamma", "client": "Alpha Holdings"})
+
+    # Exact words outrank longer completions; fields scale by their weight
+    assert [key for _, key in index.search(["alpha"], 10)] == ["a", "b", "c"]
+    assert [key for _, key in index.search(["alp", "proj"], 10)] == ["a"]
+    assert len(index.search(["alp"], 2)) == 2
+
+    index.remove("a", {"name": "Project Alpha", "client": "Acme Corp"})
+    assert index.search(["proj"], 10) == []
+
+
+def test_bulk_build_matches_incremental_adds(monkeypatch):
+    records = [
+        (i, {"name": f"Deal {i % 3001} w{i}", "client": f"Client {i % 97}"}) for i in range(100_000)
+    ]
+    incremental = TextIndex({"name": 2.0, "client": 1.0})
+    for key, record in records[:2000]:
+        incremental.add(key, record)
+
+    bulk = TextIndex({"name": 2.0, "client": 1.0})
+    # Every new word used to be insorted, which made loading quadratic
+    monkeypatch.setattr("app.data.indexes.insort", None)
+    bulk.build(records)
+    assert len(bulk.search(["w99999"], 5)) == 1
+
+    bulk.build(records[:2000])
+    assert bulk._words == incremental._words
+    assert bulk.search(["client", "4"], 50) == incremental.search(["client", "4"], 50)
+
+
+def test_search_spans_collections(client):
+    response = client.get("/api/v1/search/", params={"q": "gold"})
+    assert response.status_code == 200
+    hits = response.json()
+    assert hits[0]["type"] == "broker"
+    assert hits[0]["key"] == "BRK-001"
+    assert hits[0]["label"] == "Goldman Sachs"
+
+    deals = client.get("/api/v1/search/", params={"q": "project"}).json()
+    assert {hit["type"] for hit in deals} == {"deal"}
+    assert len(client.get("/api/v1/search/", params={"q": "project", "limit": 2}).json()) == 2
+
+
+def test_search_follows_mutations(client):
+    client.post("/api/v1/deals/", json={"deal_id": "DEAL-ZZ", "deal_name": "Zephyr Refinancing"})
+    hits = client.get("/api/v1/search/", params={"q": "zeph ref"}).json()
+    assert [hit["key"] for hit in hits] == ["DEAL-ZZ"]
+
+    client.delete("/api/v1/deals/DEAL-ZZ")
+    assert client.get("/api/v1/search/", params={"q": "zeph"}).json() == []
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import multiprocessing
+from datetime import date
+
+import pytest
+
+from app.data.events import ChangeFeed
+from app.data.json_store import JSONStore
+
+
+def _create_brokers(data_dir, prefix, count):
+    store = JSONStore(data_dir=data_dir, shared=True, feed=ChangeFeed())
+    for i in range(count):
+        store.create_broker({"broker_id": f"{prefix}-{i}", "broker_name": prefix})
+
+
+@pytest.fixture
+def workers(json_store):
+    """Two stores standing in for two worker processes on one data directory."""
+    data_dir = json_store.data_dir
+    stores = (
+        JSONStore(data_dir=data_dir, shared=True, feed=ChangeFeed()),
+        JSONStore(data_dir=data_dir, shared=True, feed=ChangeFeed()),
+    )
+    yield stores
+    for store in stores:
+        store.close()
+
+
+def test_writes_are_visible_to_other_workers(workers):
+    first, second = workers
+    version = second.version("deals")
+
+    first.create_deal({"deal_id": "DEAL-SHARED", "deal_name": "Shared"})
+    assert second.version("deals") != version
+    assert second.get_deal("DEAL-SHARED")["deal_name"] == "Shared"
+
+    second.update_deal("DEAL-SHARED", {"deal_id": "DEAL-SHARED", "deal_name": "Renamed"})
+    assert first.get_deal("DEAL-SHARED")["deal_name"] == "Renamed"
+    assert second.delete_deal("DEAL-SHARED") is True
+    assert first.get_deal("DEAL-SHARED") is None
+
+
+def test_writers_start_from_the_latest_data(workers):
+    first, second = workers
+    a = first.create_allocation({"cusip": "AAA"})
+    b = second.create_allocation({"cusip": "BBB"})
+    assert b["id"] == a["id"] + 1
+
+    generations = json.loads((first.data_dir / ".generation").read_text())
+    assert generations == {"allocations": 2}
+
+
+def test_untouched_collections_are_not_reloaded(workers):
+    first, second = workers
+    deals = second.get_deals()
+    first.create_broker({"broker_id": "BRK-SHARED", "broker_name": "Shared"})
+    assert second.get_broker("BRK-SHARED") is not None
+    assert second.get_deals()[0] is deals[0]
+
+
+async def test_reloads_are_announced(workers):
+    first, second = workers
+    second.load_data()
+    subscription = second.feed.subscribe()
+    first.create_broker({"broker_id": "BRK-SHARED", "broker_name": "Shared"})
+    second.get_brokers()
+    events, _ = await subscription.next_batch(1)
+    assert [(e.collection, e.op) for e in events] == [("brokers", "reload")]
+
+
+async def test_idle_workers_announce_reloads(json_store):
+    writer = JSONStore(data_dir=json_store.data_dir, shared=True, feed=ChangeFeed())
+    idle = JSONStore(
+        data_dir=json_store.data_dir, shared=True, shared_poll_ms=10, feed=ChangeFeed()
+    )
+    idle.load_data()
+    # Reads may lock files and reload, so none of them run on the event loop
+    assert idle.inline_methods == frozenset()
+    subscription = idle.feed.subscribe()
+    try:
+        writer.create_broker({"broker_id": "BRK-IDLE", "broker_name": "Idle"})
+        events, _ = await asyncio.wait_for(subscription.next_batch(1), timeout=5)
+        assert [(e.collection, e.op) for e in events] == [("brokers", "reload")]
+    finally:
+        idle.close()
+        writer.close()
+
+
+def test_shared_mode_needs_immediate_flushes(tmp_path):
+    with pytest.raises(ValueError):
+        JSONStore(data_dir=tmp_path, shared=True, flush_policy="count")
+
+
+def test_concurrent_processes(json_store):
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=_create_brokers, args=(json_store.data_dir, f"P{n}", 20))
+        for n in range(3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    saved = json.loads((json_store.data_dir / "brokers.json").read_text())
+    created = [b for b in saved if b["broker_id"].startswith("P")]
+    assert len(created) == 60
+    assert len({b["id"] for b in saved}) == len(saved)
+
+
+def test_deals_archived_by_another_worker_are_found(workers):
+    first, second = workers
+    assert second.get_deal("DEAL-001")["id"] == 1
+    first.archive_deals(date(2025, 1, 1))
+    # The reload reopens the archive under the write lock; the read only decodes
+    assert [d["deal_id"] for d in second.get_deals()] == ["DEAL-005", "DEAL-006"]
+    assert second.get_deal("DEAL-001")["deal_name"] == "Project Alpha"
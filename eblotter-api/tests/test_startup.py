@@ -0,0 +1,81 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.data.json_store import JSONStore
+from app.main import app
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Names of the JSON files parsed by any store."""
+    files = []
+    load_json = JSONStore._load_json
+
+    def tracked(self, filename):
+        files.append(filename)
+        return load_json(self, filename)
+
+    monkeypatch.setattr(JSONStore, "_load_json", tracked)
+    return files
+
+
+def test_files_are_parsed_once(json_store, parsed):
+    store = JSONStore(data_dir=json_store.data_dir)
+    assert parsed == []
+    store.load_data()
+    store.load_data()
+    assert store.get_deal("DEAL-001") is not None
+    assert sorted(parsed) == ["allocations.json", "brokers.json", "deals.json", "portfolios.json"]
+
+
+def test_app_startup_loads_once(parsed):
+    with TestClient(app) as client:
+        assert client.get("/api/v1/deals/").status_code == 200
+    assert len(parsed) == len(set(parsed))
+
+
+def test_lazy_collections_load_on_first_use(json_store, parsed):
+    store = JSONStore(data_dir=json_store.data_dir, lazy=True)
+    store.load_data()
+    assert parsed == []
+    assert store.get_broker("BRK-001") is not None
+    assert parsed == ["brokers.json"]
+    assert not store.deals.loaded
+
+
+@pytest.mark.parametrize("layout", ["rows", "columnar"])
+def test_snapshots_skip_json_parsing(json_store, parsed, layout):
+    data_dir = json_store.data_dir
+    first = JSONStore(data_dir=data_dir, snapshots=True, layout=layout)
+    first.load_data()
+    assert (data_dir / "deals.snapshot").exists()
+    first.create_deal({"deal_id": "DEAL-SNAP", "deal_name": "Snapshot", "status": "Active"})
+
+    parsed.clear()
+    second = JSONStore(data_dir=data_dir, snapshots=True, layout=layout)
+    second.load_data()
+    assert parsed == []
+    assert second.get_deal("DEAL-SNAP")["deal_name"] == "Snapshot"
+    assert [dict(d) for d in second.get_deals()] == [dict(d) for d in first.get_deals()]
+    assert second.query_deals(status="Active").items[-1]["deal_id"] == "DEAL-SNAP"
+    assert second.search("snapshot")[0]["key"] == "DEAL-SNAP"
+    assert second.create_deal({"deal_id": "DEAL-NEXT", "deal_name": "Next"})["id"] == 8
+
+
+def test_stale_or_damaged_snapshots_are_ignored(json_store, parsed):
+    data_dir = json_store.data_dir
+    JSONStore(data_dir=data_dir, snapshots=True).load_data()
+
+    brokers = json.loads((data_dir / "brokers.json").read_text())
+    brokers[0]["broker_name"] = "Edited By Hand"
+    (data_dir / "brokers.json").write_text(json.dumps(brokers))
+    (data_dir / "deals.snapshot").write_bytes(b"not a pickle")
+
+    parsed.clear()
+    store = JSONStore(data_dir=data_dir, snapshots=True)
+    store.load_data()
+    assert sorted(parsed) == ["brokers.json", "deals.json"]
+    assert store.get_broker("BRK-001")["broker_name"] == "Edited By Hand"
+    assert store.get_deal("DEAL-001") is not None
@@ -0,0 +1,63 @@
+import json
+
+from app.api.stream import RESYNC_FRAME, event_frames
+from app.data.events import ChangeFeed
+
+
+class _Request:
+    async def is_disconnected(self):
+        return True
+
+
+async def test_feed_fans_out_and_resumes():
+    feed = ChangeFeed(backlog=3, max_queue=2)
+    fast = feed.subscribe()
+    brokers_only = feed.subscribe(collections={"brokers"})
+
+    feed.publish("deals", "create", "D1", {"deal_id": "D1"})
+    feed.publish("brokers", "delete", "B1")
+    events, resync = await fast.next_batch(1)
+    assert [(e.op, e.key) for e in events] == [("create", "D1"), ("delete", "B1")]
+    assert events[1].seq == events[0].seq + 1
+    assert not resync
+    assert [e.key for e in (await brokers_only.next_batch(1))[0]] == ["B1"]
+
+    # A subscriber that falls behind is told to resync instead of blocking writers
+    for i in range(3):
+        feed.publish("deals", "update", f"D{i}", {})
+    events, resync = await fast.next_batch(1)
+    assert resync and len(events) < 3
+
+    # Resuming replays what is still in the backlog, or asks for a resync
+    resumed = feed.subscribe(after=feed.seq - 2)
+    assert [e.key for e in (await resumed.next_batch(1))[0]] == ["D1", "D2"]
+    stale = feed.subscribe(after=feed.seq - 10)
+    assert (await stale.next_batch(1)) == ([], True)
+
+
+async def test_store_mutations_reach_the_stream(store):
+    subscription = store.feed.subscribe(collections={"deals"})
+    frames = event_frames(_Request(), subscription, heartbeat=1)
+
+    store.create_deal({"deal_id": "DEAL-SSE", "deal_name": "Streamed"})
+    store.delete_deal("DEAL-SSE")
+    store.create_broker({"broker_id": "BRK-SSE", "broker_name": "Ignored"})
+
+    chunk = await frames.__anext__()
+    assert chunk != RESYNC_FRAME
+    events = [
+        json.loads(line[len(b"data: ") :])
+        for line in chunk.splitlines()
+        if line.startswith(b"data: ")
+    ]
+    assert [(e["op"], e["key"]) for e in events] == [("create", "DEAL-SSE"), ("delete", "DEAL-SSE")]
+    assert events[0]["record"]["dealName"] == "Streamed"
+
+    # Nothing further for deals: the stream checks the connection and ends
+    assert [chunk async for chunk in frames] == []
+    assert subscription not in store.feed._subscriptions
+
+
+def test_rejects_unknown_collections(client):
+    response = client.get("/api/v1/stream/", params={"collections": "deals,trades"})
+    assert response.status_code == 400
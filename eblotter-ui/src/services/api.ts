@@ -12,6 +12,19 @@ const apiClient: AxiosInstance = axios.create({
   },
 });
 
+// crypto.randomUUID only exists in secure contexts (HTTPS or localhost), so a UI
+// served over plain HTTP builds the same kind of v4 UUID from getRandomValues
+const newIdempotencyKey = (): string | undefined => {
+  if (typeof crypto === 'undefined') return undefined;
+  if (typeof crypto.randomUUID === 'function') return crypto.randomUUID();
+  if (typeof crypto.getRandomValues !== 'function') return undefined;
+  const bytes = crypto.getRandomValues(new Uint8Array(16));
+  bytes[6] = (bytes[6] & 0x0f) | 0x40; // version 4
+  bytes[8] = (bytes[8] & 0x3f) | 0x80; // RFC 4122 variant
+  const hex = Array.from(bytes, (b) => b.toString(16).padStart(2, '0')).join('');
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+};
+
 // Request interceptor for adding auth tokens if needed
 apiClient.interceptors.request.use(
   (config) => {
@@ -20,6 +33,15 @@ apiClient.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Tag writes with an idempotency key; retries of the same request config
+    // reuse it, so the API replays the first response instead of writing twice
+    const method = (config.method || 'get').toLowerCase();
+    if (['post', 'put', 'patch', 'delete'].includes(method) && !config.headers['Idempotency-Key']) {
+      const key = newIdempotencyKey();
+      if (key) {
+        config.headers['Idempotency-Key'] = key;
+      }
+    }
     return config;
   },
   (error) => {